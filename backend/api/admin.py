@@ -1,6 +1,16 @@
 from django.contrib import admin
-from .models import UserProfile, Booking, PaymentTransaction
+from .models import (
+    UserProfile, Booking, BookingDraft, PaymentTransaction, WalletLedgerEntry, TrainRun, Coach, Seat,
+    PaymentCallbackReceipt, PaymentJob,
+)
 
 admin.site.register(UserProfile)
 admin.site.register(Booking)
 admin.site.register(PaymentTransaction)
+admin.site.register(WalletLedgerEntry)
+admin.site.register(TrainRun)
+admin.site.register(Coach)
+admin.site.register(Seat)
+admin.site.register(PaymentCallbackReceipt)
+admin.site.register(PaymentJob)
+admin.site.register(BookingDraft)
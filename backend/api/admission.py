@@ -0,0 +1,302 @@
+"""
+Admission control for the Tatkal booking endpoints.
+
+Every booking request passes two token buckets before it touches the
+database. The per-client bucket is keyed by the client address, read from
+X-Forwarded-For only as deep as the configured trusted proxies; the request
+body is never trusted for it. The global bucket caps admitted bookings per
+second for this process. A request that passes its user bucket but finds the
+global bucket empty is put in a bounded FIFO waiting room instead of hanging
+on a connection. It gets 503 with a ticket, its queue position and an ETA,
+and retries with the ticket in the X-Queue-Ticket header. A ticket is
+admitted once the global bucket holds a token for it and for every ticket
+ahead of it, so the first N in line get in as soon as N tokens have refilled
+and the line drains at the global rate, whichever order its holders retry
+in. New arrivals wait behind the line on the same terms. A ticket that has
+not retried within HEAD_GRACE seconds of its Retry-After is dropped when it
+reaches the front, so an abandoned ticket cannot hold up the line. Requests
+over their user rate, or arriving when the waiting room is full, are shed
+at once with 429.
+
+State is per process: the configured global rate is this worker's share.
+Settings live in settings.TATKAL_ADMISSION.
+"""
+import math
+import secrets
+from bisect import bisect_left, insort
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status as drf_status
+from rest_framework.response import Response
+
+from .caching import LocalLRU
+
+TICKET_HEADER = "X-Queue-Ticket"
+
+DEFAULTS = {
+    "ENABLED": True,
+    "GLOBAL_RATE": 200.0,  # admitted bookings per second, per process
+    "GLOBAL_BURST": 400,
+    "USER_RATE": 1.0,  # booking attempts per second, per client address
+    "USER_BURST": 5,
+    "TRUSTED_PROXIES": 0,  # reverse proxies in front of this server that append to X-Forwarded-For
+    "WAITING_ROOM": 5000,  # queued requests before new arrivals are shed
+    "TICKET_TTL": 30.0,  # seconds a ticket survives without a retry
+    "HEAD_GRACE": 2.0,  # seconds a ticket may overrun its Retry-After and keep its place
+}
+
+ADMITTED = "admitted"
+QUEUED = "queued"
+REJECTED = "rejected"
+
+
+# PUBLIC_INTERFACE
+class TokenBucket:
+    """Thread-safe token bucket refilling `rate` tokens per second up to `burst`."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # PUBLIC_INTERFACE
+    def try_acquire(self, tokens=1, reserve=0) -> bool:
+        """Take `tokens` if available with `reserve` more left over (held for others). Never blocks."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens + reserve:
+                self._tokens -= tokens
+                return True
+            return False
+
+    # PUBLIC_INTERFACE
+    def wait_time(self, tokens=1) -> float:
+        """Seconds until `tokens` will be available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+
+# PUBLIC_INTERFACE
+@dataclass
+class Decision:
+    """Outcome of an admission check."""
+    outcome: str
+    reason: str = ""
+    ticket: str = ""
+    position: int = 0
+    eta: float = 0.0
+    retry_after: float = 0.0
+
+    @property
+    def admitted(self):
+        return self.outcome == ADMITTED
+
+
+# PUBLIC_INTERFACE
+class AdmissionController:
+    """Per-user and global token buckets in front of a bounded FIFO waiting room."""
+
+    def __init__(self, global_rate, global_burst, user_rate, user_burst, waiting_room, ticket_ttl,
+                 head_grace=DEFAULTS["HEAD_GRACE"], clock=time.monotonic, max_users=100000):
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.capacity = waiting_room
+        self.ticket_ttl = ticket_ttl
+        self.head_grace = head_grace
+        self._clock = clock
+        # Idle users' buckets are full again after burst / rate seconds, so they can be dropped then.
+        self._users = LocalLRU(max_users, ttl=user_burst / user_rate)
+        # ticket -> (sequence number, time by which its holder must retry), in arrival order.
+        # Tickets behind the head can leave too; their sequence numbers are kept in _left until
+        # the head passes them, so position = seq - head seq + 1 - (tickets in _left before seq).
+        # _left holds at most GLOBAL_BURST entries: only that far back can a ticket be admitted.
+        self._queue = OrderedDict()
+        self._left = []
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self._counters = {ADMITTED: 0, QUEUED: 0, REJECTED: 0}
+
+    @classmethod
+    def from_settings(cls):
+        conf = {**DEFAULTS, **getattr(settings, "TATKAL_ADMISSION", {})}
+        return cls(
+            conf["GLOBAL_RATE"], conf["GLOBAL_BURST"], conf["USER_RATE"], conf["USER_BURST"],
+            conf["WAITING_ROOM"], conf["TICKET_TTL"], conf["HEAD_GRACE"],
+        )
+
+    def _user_bucket(self, user_key):
+        with self._lock:
+            bucket = self._users.get(user_key)
+            if bucket is None:
+                bucket = TokenBucket(self.user_rate, self.user_burst, self._clock)
+            self._users.set(user_key, bucket)  # refreshes the idle expiry
+            return bucket
+
+    def _head_seq(self):
+        return next(iter(self._queue.values()))[0]
+
+    def _position(self, seq):
+        return seq - self._head_seq() + 1 - bisect_left(self._left, seq)
+
+    def _remove(self, ticket):
+        seq, _ = self._queue.pop(ticket)
+        if not self._queue:
+            self._left.clear()
+            return
+        head = self._head_seq()
+        if seq > head:
+            insort(self._left, seq)
+        else:
+            del self._left[:bisect_left(self._left, head)]
+
+    def _expire_tickets(self, now):
+        while self._queue:
+            ticket, (_, deadline) = next(iter(self._queue.items()))
+            if now <= deadline:
+                return
+            self._remove(ticket)
+
+    def _queued(self, ticket, seq, now):
+        self._queue[ticket] = (seq, now)  # a retry keeps its place; a new ticket joins the back
+        position = self._position(seq)
+        eta = position / self.global_bucket.rate
+        # Poll about when the turn comes, but at least once per second and no less often than every 5s.
+        retry_after = min(max(eta, 1.0), 5.0)
+        # Clients wait the whole seconds of Retry-After; past that plus the grace, the place is forfeit.
+        self._queue[ticket] = (seq, now + min(math.ceil(retry_after) + self.head_grace, self.ticket_ttl))
+        return Decision(QUEUED, "waiting room", ticket, position, eta, retry_after)
+
+    def _count(self, decision):
+        self._counters[decision.outcome] += 1
+        return decision
+
+    # PUBLIC_INTERFACE
+    def admit(self, user_key, ticket=None) -> Decision:
+        """Decide whether a request from `user_key` (holding waiting-room `ticket`, if any) may proceed."""
+        now = self._clock()
+        with self._lock:
+            self._expire_tickets(now)
+            if ticket and ticket in self._queue:
+                seq, _ = self._queue[ticket]
+                # Tokens for everyone ahead stay in the bucket, so the line drains in order at the refill rate.
+                if self.global_bucket.try_acquire(reserve=self._position(seq) - 1):
+                    self._remove(ticket)
+                    return self._count(Decision(ADMITTED))
+                return self._count(self._queued(ticket, seq, now))
+        bucket = self._user_bucket(user_key)
+        if not bucket.try_acquire():
+            with self._lock:
+                return self._count(Decision(REJECTED, "user rate limit", retry_after=bucket.wait_time()))
+        with self._lock:
+            if self.global_bucket.try_acquire(reserve=len(self._queue)):
+                return self._count(Decision(ADMITTED))
+            if len(self._queue) >= self.capacity:
+                return self._count(Decision(REJECTED, "waiting room full", retry_after=self.ticket_ttl))
+            ticket = secrets.token_urlsafe(16)
+            seq, self._next_seq = self._next_seq, self._next_seq + 1
+            return self._count(self._queued(ticket, seq, now))
+
+    # PUBLIC_INTERFACE
+    def stats(self):
+        """Decision counters since process start and the current waiting-room depth."""
+        with self._lock:
+            return {**self._counters, "waiting": len(self._queue), "capacity": self.capacity}
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+# PUBLIC_INTERFACE
+def get_controller() -> AdmissionController:
+    """This process's AdmissionController, built from settings on first use."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController.from_settings()
+    return _controller
+
+
+# PUBLIC_INTERFACE
+def reset_controller():
+    """Drop the process controller so the next request rebuilds it from settings."""
+    global _controller
+    with _controller_lock:
+        _controller = None
+
+
+@receiver(setting_changed)
+def _rebuild_on_settings_change(setting, **kwargs):
+    if setting == "TATKAL_ADMISSION":
+        reset_controller()
+
+
+# PUBLIC_INTERFACE
+def admission_enabled() -> bool:
+    """Whether settings.TATKAL_ADMISSION turns admission control on."""
+    return {**DEFAULTS, **getattr(settings, "TATKAL_ADMISSION", {})}["ENABLED"]
+
+
+# PUBLIC_INTERFACE
+def client_key_for(meta) -> str:
+    """
+    Rate-limit key for a booking request: the client address. With TRUSTED_PROXIES = n, it is
+    the n-th X-Forwarded-For entry from the right, the one the outermost trusted proxy wrote;
+    entries left of it come from the client. The user_profile_id in the body is unauthenticated,
+    so it is not used: keyed on it, anyone could drain another traveller's bucket.
+    """
+    proxies = {**DEFAULTS, **getattr(settings, "TATKAL_ADMISSION", {})}["TRUSTED_PROXIES"]
+    address = meta.get("REMOTE_ADDR", "")
+    if proxies:
+        hops = [hop.strip() for hop in meta.get("HTTP_X_FORWARDED_FOR", "").split(",") if hop.strip()]
+        if hops:
+            address = hops[-min(proxies, len(hops))]
+    return f"ip:{address}"
+
+
+# PUBLIC_INTERFACE
+def decision_response(decision):
+    """(body, status, headers) for a request that was not admitted."""
+    headers = {"Retry-After": str(math.ceil(decision.retry_after))}
+    if decision.outcome == QUEUED:
+        headers[TICKET_HEADER] = decision.ticket
+        body = {
+            "queued": True, "ticket": decision.ticket, "position": decision.position,
+            "eta_seconds": round(decision.eta, 1),
+        }
+        return body, drf_status.HTTP_503_SERVICE_UNAVAILABLE, headers
+    return {"error": f"Too many requests: {decision.reason}."}, drf_status.HTTP_429_TOO_MANY_REQUESTS, headers
+
+
+# PUBLIC_INTERFACE
+def admission_controlled(view):
+    """Put a DRF function view behind the process AdmissionController (place it under @api_view)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if admission_enabled():
+            decision = get_controller().admit(
+                client_key_for(request.META), request.headers.get(TICKET_HEADER)
+            )
+            if not decision.admitted:
+                body, status, headers = decision_response(decision)
+                return Response(body, status=status, headers=headers)
+        return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,289 @@
+"""
+ASGI-native variants of the hot booking and payment endpoints.
+
+Under an ASGI server these run on the event loop: single-statement reads and
+writes use the async ORM (aget/acreate), and only multi-statement transactional
+work is handed to a worker thread with `sync_to_async`. Request and response
+bodies match the DRF views they mirror. Under WSGI they still work (Django runs
+them with async_to_sync), so the URLs are always routed.
+
+Booking status can also be pushed instead of polled: a long poll on
+/api/async/bookings/<id>/status/?wait=N, or server-sent events from
+/api/async/bookings/<id>/events/. Waiting connections are woken through
+api/events.py when the booking changes.
+
+An idle waiter costs memory, not a thread. Django's ASGIHandler gives every
+request a ThreadSensitiveContext, and the first sync hop in it (the
+request_started receivers, CSRF's process_view) starts a thread that lives
+until the response finishes. PushASGIHandler, the ASGI application in
+config/asgi.py, serves views marked with @holds_connection without one:
+their few short sync hops share asgiref's process-wide sync thread, and
+their status re-reads run on the bounded pool in api/status_poll.py.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import Resolver404, resolve, reverse
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST, require_safe
+from rest_framework.utils.encoders import JSONEncoder
+
+from .admission import TICKET_HEADER, admission_enabled, client_key_for, decision_response, get_controller
+from .events import BROKER
+from .inventory import NoBerthAvailable
+from .models import Booking, PaymentTransaction, UserProfile
+from .serializers import BookingCreateSerializer, BookingSerializer, DepositWalletSerializer
+from .services import (
+    astored_callback_response, callback_idempotency_key, create_and_pay_booking, submit_payment_callback,
+)
+from .status_poll import aread_booking_status, body_etag, status_response
+from .wallet import aavailable_balance, acredit_wallet
+
+
+def _json(data, status=200):
+    # DRF's encoder, so Decimals and dates render exactly as the sync views render them.
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def _body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _validate_and_book(data):
+    serializer = BookingCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return None, None, serializer.errors
+    booking, paid = create_and_pay_booking(serializer)
+    return booking, paid, None
+
+
+# PUBLIC_INTERFACE
+@csrf_exempt
+@require_POST
+async def create_booking(request):
+    """Async create_booking: same body and responses (including admission control) as POST /api/create_booking/."""
+    data = _body(request)
+    if data is None:
+        return _json({"error": "Request body must be a JSON object."}, status=400)
+    if admission_enabled():
+        decision = get_controller().admit(client_key_for(request.META), request.headers.get(TICKET_HEADER))
+        if not decision.admitted:
+            body, status, headers = decision_response(decision)
+            response = _json(body, status=status)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+    try:
+        # Validation looks up the profile and booking is one transaction: one thread hop for both.
+        booking, paid, errors = await sync_to_async(_validate_and_book)(data)
+    except NoBerthAvailable as exc:
+        return _json({"error": str(exc)}, status=409)
+    if errors:
+        return _json(errors, status=400)
+    booking = await BookingSerializer.setup_eager_loading(Booking.objects.all(), with_profile=True).aget(pk=booking.pk)
+    data = dict(BookingSerializer(booking).data)
+    data["wallet_auto_debited"] = paid
+    if not paid:
+        data["error"] = "Booking created, but insufficient funds for auto payment. Please recharge wallet."
+    return _json(data, status=201)
+
+
+# PUBLIC_INTERFACE
+@require_GET
+async def tatkal_booking_status(request, booking_id):
+    """Async tatkal_booking_status: same response as GET /api/bookings/<id>/."""
+    try:
+        booking = await BookingSerializer.setup_eager_loading(Booking.objects.all(), with_profile=True).aget(id=booking_id)
+    except Booking.DoesNotExist:
+        return _json({"error": "Booking not found."}, status=404)
+    return _json(BookingSerializer(booking).data)
+
+
+# Statuses after which a booking's status no longer changes on its own.
+FINAL_STATUSES = {"booked", "failed", "cancelled"}
+LONG_POLL_MAX_WAIT = 30.0
+SSE_HEARTBEAT = 15.0  # comment line sent on idle streams so proxies keep them open
+SSE_RESYNC = 60.0  # re-read even without a notification (covers changes on other workers)
+SSE_MAX_AGE = 300.0  # then the stream ends and EventSource reconnects
+SSE_RETRY_MS = 3000
+
+
+def holds_connection(view):
+    """Mark an async view that keeps its connection open; see PushASGIHandler."""
+    view.holds_connection = True
+    return view
+
+
+# PUBLIC_INTERFACE
+class PushASGIHandler(ASGIHandler):
+    """
+    ASGIHandler that runs views marked with @holds_connection outside a per-request
+    ThreadSensitiveContext, so an open long poll or event stream does not keep a thread.
+    Their sync hops (signal receivers, sync middleware hooks) go to asgiref's shared sync
+    thread instead; they are short, and these views do no other thread-sensitive work.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self._holds_connection(scope):
+            await self.handle(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def _holds_connection(scope):
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        try:
+            return getattr(resolve(path).func, "holds_connection", False)
+        except Resolver404:
+            return False
+
+
+def _wait_seconds(request):
+    try:
+        return min(max(float(request.GET.get("wait", 0)), 0.0), LONG_POLL_MAX_WAIT)
+    except ValueError:
+        return 0.0
+
+
+# PUBLIC_INTERFACE
+@holds_connection
+@require_safe
+async def tatkal_booking_poll(request, booking_id):
+    """
+    Async tatkal_booking_poll: same response as GET /api/bookings/<id>/status/. With
+    ?wait=N (up to 30s) and an If-None-Match that is still current, it is a long poll:
+    the response is held until the booking changes (200) or N seconds pass (304).
+    """
+    wait = _wait_seconds(request)
+    if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    # Subscribe before reading, so a change committed in between still wakes us.
+    with BROKER.subscribe(booking_id) as subscription:
+        found = await aread_booking_status(booking_id)
+        if found is None:
+            return _json({"error": "Booking not found."}, status=404)
+        body, booking_status = found
+        if wait and body_etag(body) in if_none_match and booking_status not in FINAL_STATUSES:
+            if await subscription.wait(wait):
+                found = await aread_booking_status(booking_id)
+                body = found[0] if found else body
+    return status_response(request, body)
+
+
+def _sse_event(body):
+    return b"id: %s\nevent: status\ndata: %s\n\n" % (body_etag(body).strip('"').encode(), body)
+
+
+async def _status_stream(booking_id, last_event_id):
+    loop = asyncio.get_running_loop()
+    sent = last_event_id
+    # Subscribed inside the generator so a response that is never iterated holds nothing,
+    # and before the first read so a change committed in between still wakes us.
+    with BROKER.subscribe(booking_id) as subscription:
+        yield b"retry: %d\n\n" % SSE_RETRY_MS
+        started = loop.time()
+        while True:
+            found = await aread_booking_status(booking_id)
+            last_read = loop.time()
+            if found is None:
+                return
+            body, booking_status = found
+            event_id = body_etag(body).strip('"')
+            if event_id != sent:
+                yield _sse_event(body)
+                sent = event_id
+            if booking_status in FINAL_STATUSES:
+                return
+            while True:
+                remaining = started + SSE_MAX_AGE - loop.time()
+                if remaining <= 0:
+                    return
+                if await subscription.wait(min(SSE_HEARTBEAT, remaining)):
+                    break
+                yield b": keepalive\n\n"
+                if loop.time() - last_read >= SSE_RESYNC:
+                    break
+
+
+# PUBLIC_INTERFACE
+@holds_connection
+@require_safe
+async def booking_events(request, booking_id):
+    """
+    Server-sent events for one booking: an event with the compact status body (as in
+    GET /api/bookings/<id>/status/) now and on every change. The stream ends once the
+    booking is booked, failed or cancelled. A Last-Event-ID that matches the current
+    state skips the first event on reconnect.
+    """
+    if await aread_booking_status(booking_id) is None:
+        return _json({"error": "Booking not found."}, status=404)
+    response = StreamingHttpResponse(
+        _status_stream(booking_id, request.headers.get("Last-Event-ID")), content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the stream
+    return response
+
+
+# PUBLIC_INTERFACE
+@csrf_exempt
+@require_POST
+async def payment_callback(request):
+    """Async payment_callback: same body and responses as POST /api/payment/callback/."""
+    data = _body(request)
+    if data is None:
+        return _json({"error": "Request body must be a JSON object."}, status=400)
+    # Gateway retries are answered from the stored receipt without leaving the event loop.
+    stored = await astored_callback_response(
+        callback_idempotency_key(data.get("payment_transaction_id"), data.get("payment_id"))
+    )
+    if stored is not None:
+        return _json(stored)
+    try:
+        stored, job = await sync_to_async(submit_payment_callback)(
+            data.get("payment_transaction_id"), data.get("payment_id"), data.get("status", "success")
+        )
+    except PaymentTransaction.DoesNotExist:
+        return _json({"error": "Payment transaction not found."}, status=404)
+    if stored is not None:
+        return _json(stored)
+    return _json({
+        "status": job.status,
+        "payment_transaction_id": job.payment_transaction_id,
+        "status_url": reverse("payment_status", args=[job.payment_transaction_id]),
+    }, status=202)
+
+
+# PUBLIC_INTERFACE
+@csrf_exempt
+@require_POST
+async def deposit_wallet(request):
+    """Async deposit_wallet: one ledger INSERT and one balance read, both on the async ORM."""
+    data = _body(request)
+    if data is None:
+        return _json({"error": "Request body must be a JSON object."}, status=400)
+    serializer = DepositWalletSerializer(data=data)
+    if not serializer.is_valid():
+        return _json(serializer.errors, status=400)
+    try:
+        profile_id = await UserProfile.objects.filter(user_id=data.get("user_id")).values_list(
+            "id", flat=True
+        ).aget()
+    except (UserProfile.DoesNotExist, ValueError, TypeError):
+        return _json({"error": "User not found."}, status=404)
+    amount = serializer.validated_data["amount"]
+    await acredit_wallet(profile_id, amount)
+    return _json({
+        "wallet_balance": await aavailable_balance(profile_id),
+        "deposited": f"{amount}",
+    })
@@ -0,0 +1,49 @@
+"""
+Authentication backend that verifies passwords on the hashing pool (api/hashing.py)
+instead of on the request thread.
+
+When the pool is at capacity, DRF authentication gets HashingBusy (a 503 with
+Retry-After). Any other caller, such as the admin login form, gets
+PermissionDenied. Django's authenticate() turns that into a failed login
+instead of a 500.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from rest_framework.request import Request
+
+from .hashing import HashingBusy, check_password, hash_password
+
+UserModel = get_user_model()
+
+
+# PUBLIC_INTERFACE
+class PooledPasswordBackend(ModelBackend):
+    """ModelBackend with password verification (and hash upgrades) run on the hashing pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        try:
+            return self._authenticate(username, password, **kwargs)
+        except HashingBusy:
+            if isinstance(request, Request):
+                raise
+            raise PermissionDenied("Password hashing is at capacity; retry shortly.")
+
+    def _authenticate(self, username, password, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so an unknown username takes as long as a wrong password.
+            hash_password(password)
+            return None
+        correct, must_update = check_password(password, user.password)
+        if not correct:
+            return None
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,56 @@
+"""
+Small helpers shared by the benchmark management commands.
+
+Benchmarks run against the configured database inside a transaction that is
+rolled back at the end, so they never leave seeded rows behind.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+# PUBLIC_INTERFACE
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction and discard everything it wrote."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+# PUBLIC_INTERFACE
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples (pct in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+# PUBLIC_INTERFACE
+def timed(fn, *args, **kwargs):
+    """Call fn and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# PUBLIC_INTERFACE
+def summarize(label, samples):
+    """One-line latency summary in milliseconds."""
+    total = sum(samples)
+    rate = len(samples) / total if total else 0.0
+    return (
+        f"{label}: n={len(samples)} p50={percentile(samples, 50) * 1000:.2f}ms "
+        f"p95={percentile(samples, 95) * 1000:.2f}ms p99={percentile(samples, 99) * 1000:.2f}ms "
+        f"throughput={rate:.1f}/s"
+    )
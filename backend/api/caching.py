@@ -0,0 +1,203 @@
+"""
+Two-tier read-through cache.
+
+A bounded per-process LRU (with TTL) sits in front of a shared Django cache
+alias. Hot keys are served from process memory without a network or pickle
+round trip. The shared tier lets workers reuse each other's loads. Writes
+invalidate both tiers in this process; other processes' local copies expire
+within the (short) local TTL.
+
+A load that was in flight when its key was invalidated is returned to its
+caller but not stored, so an invalidation is never undone by a fill of the
+value read before it. Each key has its own generation, so invalidating one key
+never discards a concurrent fill of another. With `tombstone_ttl` set, invalidation also leaves a
+short-lived marker in the shared tier that blocks such fills from other
+processes.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+_MISSING = object()
+# Shared-tier marker left by invalidate() when tombstones are enabled; reads treat it as a miss.
+_TOMBSTONE = "<invalidated>"
+
+
+# PUBLIC_INTERFACE
+class LocalLRU:
+    """Thread-safe, size-bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# PUBLIC_INTERFACE
+class TieredCache:
+    """
+    Read-through cache: local LRU -> shared Django cache alias -> loader.
+    `shared_alias=None` disables the shared tier. `tombstone_ttl` (seconds) makes invalidations
+    block shared-tier fills for that long; fills then use add() instead of set_many().
+    """
+
+    def __init__(self, prefix, max_size=10000, local_ttl=2.0, shared_ttl=30, shared_alias="shared",
+                 tombstone_ttl=None):
+        self.prefix = prefix
+        self.local = LocalLRU(max_size, local_ttl)
+        self.shared_ttl = shared_ttl
+        self.shared_alias = shared_alias
+        self.tombstone_ttl = tombstone_ttl
+        # Per-key generations: invalidate() gives each key a new one, and a fill is only stored for keys
+        # whose generation did not change during its read. Bounded like the LRU; keys dropped from it read
+        # as the highest generation dropped, so a fill racing a dropped key is discarded, never stored.
+        self._generations = OrderedDict()
+        self._generation_floor = 0
+        self._last_generation = 0
+        self._generation_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._counters[name] += amount
+
+    # PUBLIC_INTERFACE
+    def get_many(self, keys, loader):
+        """
+        Return {key: value} for `keys`. Keys missing from both tiers are passed (as a list)
+        to `loader`, which must return a dict of values for them; results fill both tiers.
+        """
+        generations = self._generations_of(keys)
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(self._key(key), _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._count("local_hits", len(found))
+        if missing and self.shared is not None:
+            shared_found = self.shared.get_many([self._key(key) for key in missing])
+            for key in list(missing):
+                full_key = self._key(key)
+                if full_key in shared_found and shared_found[full_key] != _TOMBSTONE:
+                    found[key] = shared_found[full_key]
+                    self._fill_local({key: found[key]}, generations)
+                    missing.remove(key)
+                    self._count("shared_hits")
+        if missing:
+            self._count("misses", len(missing))
+            loaded = loader(missing)
+            current = self._fill_local(loaded, generations)
+            if current and self.shared is not None:
+                self._fill_shared(current)
+            found.update((key, loaded[key]) for key in missing if key in loaded)
+        return found
+
+    def _generations_of(self, keys):
+        with self._generation_lock:
+            return {key: self._generations.get(key, self._generation_floor) for key in keys}
+
+    def _fill_local(self, values, generations):
+        """Store the values whose key was not invalidated since `generations` was read; returns them."""
+        with self._generation_lock:
+            current = {
+                key: value for key, value in values.items()
+                if self._generations.get(key, self._generation_floor) == generations.get(key)
+            }
+            for key, value in current.items():
+                self.local.set(self._key(key), value)
+        return current
+
+    def _fill_shared(self, loaded):
+        if self.tombstone_ttl:
+            for key, value in loaded.items():
+                self.shared.add(self._key(key), value, self.shared_ttl)
+        else:
+            self.shared.set_many({self._key(key): value for key, value in loaded.items()}, self.shared_ttl)
+
+    # PUBLIC_INTERFACE
+    def get(self, key, loader):
+        """Single-key read-through; `loader` takes no arguments and returns the value."""
+        return self.get_many([key], lambda missing: {key: loader()})[key]
+
+    # PUBLIC_INTERFACE
+    def invalidate(self, keys):
+        """Drop `keys` from the local tier and the shared tier."""
+        full_keys = [self._key(key) for key in keys]
+        # Shared tier first: a read that starts after the generation bump must not find the old value there.
+        if self.shared is not None:
+            if self.tombstone_ttl:
+                self.shared.set_many(dict.fromkeys(full_keys, _TOMBSTONE), self.tombstone_ttl)
+            else:
+                self.shared.delete_many(full_keys)
+        with self._generation_lock:
+            for key, full_key in zip(keys, full_keys):
+                self._last_generation += 1
+                self._generations[key] = self._last_generation
+                self._generations.move_to_end(key)
+                self.local.delete(full_key)
+            while len(self._generations) > self.local.max_size:
+                _, dropped = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, dropped)
+        self._count("invalidations", len(full_keys))
+
+    # PUBLIC_INTERFACE
+    def clear_local(self):
+        """Empty this process's LRU tier (the shared tier is left alone)."""
+        self.local.clear()
+
+    # PUBLIC_INTERFACE
+    def stats(self):
+        """Hit/miss/eviction counters since process start."""
+        with self._stats_lock:
+            counters = dict(self._counters)
+        counters["evictions"] = self.local.evictions
+        counters["local_size"] = len(self.local)
+        lookups = counters["local_hits"] + counters["shared_hits"] + counters["misses"]
+        counters["hit_ratio"] = (counters["local_hits"] + counters["shared_hits"]) / lookups if lookups else 0.0
+        return counters
@@ -0,0 +1,114 @@
+"""
+Booking drafts: stage a booking before a Tatkal window opens, confirm it with one call when it does.
+
+create_booking validates the whole request (every passenger and journey
+field, the profile lookup) at the moment everyone else is booking too. A
+draft moves that work ahead of the window. BookingDraftSerializer validates
+it once when it is staged, and the draft row keeps the validated fields.
+Confirming reads that row and claims it with a conditional UPDATE. It INSERTs
+the bookings straight from the stored fields, allocates their berths and
+debits the wallet once for all passengers, in one transaction. No serializer
+runs on the confirm path. The response is built from one values_list()
+query.
+
+There is no fare table in this tree; as with create_booking, the fare comes
+from the client. The confirm call may carry the per-passenger fare quoted
+at window open, and a fare above the draft's ceiling is refused. Without one
+the ceiling is charged.
+
+Confirming is idempotent. Confirming an already confirmed draft again (a
+client retry, or two devices at once) returns its bookings and books nothing.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import allocate_berth
+from .models import Booking, BookingDraft
+from .status_poll import compile_row_builder
+from .wallet import pay_bookings_via_wallet
+
+DRAFT_COLUMNS = ("user_profile_id", "source", "destination", "journey_date", "passengers", "fare_ceiling", "status")
+
+# Response key, column, converter: one entry per booking of a confirmed draft.
+CONFIRMATION_FIELDS = (
+    ("id", "id", None),
+    ("passenger_name", "passenger_name", None),
+    ("booking_status", "booking_status", None),
+    ("paid", "paid", None),
+    ("fare", "fare", str),
+    ("coach", "seat__coach__code", None),
+    ("berth_number", "seat__number", None),
+    ("berth_type", "seat__berth_type", None),
+)
+_build_confirmation = compile_row_builder(CONFIRMATION_FIELDS)
+
+
+# PUBLIC_INTERFACE
+class DraftNotConfirmable(Exception):
+    """The draft was cancelled, or the fare is above its ceiling. Nothing was booked."""
+
+
+# PUBLIC_INTERFACE
+def confirmed_bookings(draft_id) -> list:
+    """The confirmation rows (see CONFIRMATION_FIELDS) of the bookings made from `draft_id`."""
+    rows = Booking.objects.filter(draft_id=draft_id).order_by("id").values_list(
+        *(column for _, column, _ in CONFIRMATION_FIELDS)
+    )
+    return [_build_confirmation(row) for row in rows]
+
+
+def _replay(draft_id):
+    bookings = confirmed_bookings(draft_id)
+    return bookings, all(booking["paid"] for booking in bookings), False
+
+
+# PUBLIC_INTERFACE
+def confirm_draft(draft_id, fare=None, profile_id=None):
+    """
+    Book every passenger of staged draft `draft_id`, allocate berths and pay the combined fare
+    from the wallet, in one transaction. `fare` is the per-passenger fare (default: the ceiling).
+    With `profile_id`, a draft of another profile counts as not found.
+
+    Returns (bookings, paid, created): the confirmation rows, whether the wallet paid, and False
+    when the draft had already been confirmed (nothing new was booked). Raises
+    BookingDraft.DoesNotExist, DraftNotConfirmable, or NoBerthAvailable (the draft stays staged).
+    """
+    with transaction.atomic():
+        row = BookingDraft.objects.filter(pk=draft_id).values_list(*DRAFT_COLUMNS).first()
+        if row is None or profile_id not in (None, row[0]):
+            raise BookingDraft.DoesNotExist("Booking draft not found.")
+        profile_id, source, destination, journey_date, passengers, fare_ceiling, status = row
+        if status == BookingDraft.STATUS_CONFIRMED:
+            return _replay(draft_id)
+        if status != BookingDraft.STATUS_STAGED:
+            raise DraftNotConfirmable("This draft was cancelled.")
+        fare = fare_ceiling if fare is None else fare
+        if fare > fare_ceiling:
+            raise DraftNotConfirmable(f"Fare {fare} is above this draft's fare ceiling of {fare_ceiling}.")
+        claimed = BookingDraft.objects.filter(pk=draft_id, status=BookingDraft.STATUS_STAGED).update(
+            status=BookingDraft.STATUS_CONFIRMED, confirmed_at=timezone.now()
+        )
+        if not claimed:  # Confirmed by a concurrent call since the read above.
+            return _replay(draft_id)
+        bookings = Booking.objects.bulk_create(
+            Booking(
+                user_profile_id=profile_id, source=source, destination=destination, journey_date=journey_date,
+                fare=fare, draft_id=draft_id, **passenger,
+            )
+            for passenger in passengers
+        )
+        for booking in bookings:
+            allocate_berth(booking)
+        if len(bookings) == 1:
+            paid = bookings[0].try_pay_via_wallet()  # Same debit as create_booking, linked to the booking.
+        else:
+            paid = pay_bookings_via_wallet(profile_id, bookings)
+    return confirmed_bookings(draft_id), paid, True
+
+
+# PUBLIC_INTERFACE
+def cancel_draft(draft_id) -> bool:
+    """Cancel a staged draft. Returns False if it is not staged (confirmed, cancelled or absent)."""
+    return BookingDraft.objects.filter(pk=draft_id, status=BookingDraft.STATUS_STAGED).update(
+        status=BookingDraft.STATUS_CANCELLED
+    ) == 1
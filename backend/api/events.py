@@ -0,0 +1,156 @@
+"""
+Booking status push: in-process pub/sub between the code that changes a
+booking and the connections waiting on it.
+
+Status-changing code calls notify_booking_changed(). That publishes the
+booking ids once the transaction commits. Waiters are SSE or long-poll
+connections on the ASGI event loop (see async_views). Each one holds a
+Subscription and re-reads the booking when woken, so only ids cross the
+wire, never state. Waiters hold no thread while idle (see async_views).
+
+Publishing goes through a fan-out backend (settings.BOOKING_EVENTS_FANOUT).
+LocalFanout delivers to this process only. With several workers behind a
+load balancer, configure a backend that forwards ids to every process,
+such as Redis pub/sub or Postgres LISTEN/NOTIFY, and calls deliver()
+there. Until then, a waiter on another worker sees the change at its
+next periodic re-read. That is within a minute for SSE, and at the end
+of the wait for a long poll.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+# PUBLIC_INTERFACE
+class Subscription:
+    """One waiter on one booking, bound to the event loop that created it."""
+
+    __slots__ = ("booking_id", "_loop", "_future", "_changed", "_broker")
+
+    def __init__(self, broker, booking_id, loop):
+        self.booking_id = booking_id
+        self._broker = broker
+        self._loop = loop
+        self._future = None
+        self._changed = False
+
+    def _wake(self):
+        self._changed = True
+        if self._future is not None and not self._future.done():
+            self._future.set_result(None)
+
+    # PUBLIC_INTERFACE
+    async def wait(self, timeout) -> bool:
+        """Wait up to `timeout` seconds for a change. True if one was published since the last wait."""
+        if not self._changed:
+            self._future = self._loop.create_future()
+            try:
+                await asyncio.wait_for(self._future, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._future = None
+        changed, self._changed = self._changed, False
+        return changed
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# PUBLIC_INTERFACE
+class BookingEventBroker:
+    """Thread-safe registry of waiters by booking id. deliver() may be called from any thread."""
+
+    def __init__(self):
+        self._subscribers = {}  # booking_id -> set of Subscription
+        self._lock = threading.Lock()
+        # Bumped on every delivery, so readers can tell whether a change was published since
+        # a read started (see status_poll.aread_booking_status).
+        self.epoch = 0
+
+    # PUBLIC_INTERFACE
+    def subscribe(self, booking_id) -> Subscription:
+        """Register a waiter for `booking_id` on the running event loop."""
+        subscription = Subscription(self, booking_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(booking_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            waiters = self._subscribers.get(subscription.booking_id)
+            if waiters is not None:
+                waiters.discard(subscription)
+                if not waiters:
+                    del self._subscribers[subscription.booking_id]
+
+    # PUBLIC_INTERFACE
+    def deliver(self, booking_ids):
+        """Wake every waiter on any of `booking_ids`, each on its own loop."""
+        with self._lock:
+            self.epoch += 1
+            woken = [sub for booking_id in booking_ids for sub in self._subscribers.get(booking_id, ())]
+        for subscription in woken:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._wake)
+            except RuntimeError:  # its loop has closed; the connection is gone
+                self.unsubscribe(subscription)
+        return len(woken)
+
+    def subscriber_count(self, booking_id=None):
+        with self._lock:
+            if booking_id is not None:
+                return len(self._subscribers.get(booking_id, ()))
+            return sum(len(waiters) for waiters in self._subscribers.values())
+
+
+BROKER = BookingEventBroker()
+
+
+# PUBLIC_INTERFACE
+class LocalFanout:
+    """Fan-out within this process only: the stand-in for a cross-worker channel."""
+
+    def __init__(self, broker=BROKER):
+        self.broker = broker
+
+    def publish(self, booking_ids):
+        self.broker.deliver(booking_ids)
+
+
+_fanout = None
+
+
+# PUBLIC_INTERFACE
+def get_fanout():
+    """The configured fan-out backend (settings.BOOKING_EVENTS_FANOUT), built on first use."""
+    global _fanout
+    if _fanout is None:
+        _fanout = import_string(getattr(settings, "BOOKING_EVENTS_FANOUT", "api.events.LocalFanout"))()
+    return _fanout
+
+
+@receiver(setting_changed)
+def _reset_fanout(setting, **kwargs):
+    global _fanout
+    if setting == "BOOKING_EVENTS_FANOUT":
+        _fanout = None
+
+
+# PUBLIC_INTERFACE
+def notify_booking_changed(*booking_ids):
+    """Publish that these bookings changed, once the current transaction (if any) commits."""
+    ids = tuple(booking_ids)
+    if ids:
+        transaction.on_commit(lambda: get_fanout().publish(ids))
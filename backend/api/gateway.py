@@ -0,0 +1,44 @@
+"""
+Payment gateway clients used by the payment job handlers.
+
+settings.PAYMENT_GATEWAY names the client class. The default MockGateway
+stands in for Razorpay locally: it never leaves the process and approves
+whatever the callback reported.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .ids import new_order_id
+
+# Dummy Razorpay setup (Replace with real integration, fetch keys from env)
+RAZORPAY_MOCK_KEY = "rzp_test_mocked"
+RAZORPAY_MOCK_SECRET = "secret_key_mocked"
+
+
+# PUBLIC_INTERFACE
+class GatewayError(Exception):
+    """A transient gateway failure (timeout, 5xx); the job that hit it is retried with backoff."""
+
+
+# PUBLIC_INTERFACE
+class MockGateway:
+    """In-process stand-in for the Razorpay API."""
+
+    key_id = RAZORPAY_MOCK_KEY
+
+    def create_order(self, payment):
+        """Create a gateway order for `payment`. Returns {"order_id", "payment_url"}."""
+        order_id = new_order_id()
+        # This would be replaced by a real Razorpay payment_url
+        payment_url = f"https://checkout.razorpay.com/v1/checkout.js?order_id={order_id}&key_id={self.key_id}"
+        return {"order_id": order_id, "payment_url": payment_url}
+
+    def verify_payment(self, order_id, payment_id, status):
+        """Confirm a callback's outcome with the gateway. Returns "success" or "failed"."""
+        return "success" if status == "success" else "failed"
+
+
+# PUBLIC_INTERFACE
+def get_gateway():
+    """An instance of the configured gateway client (settings.PAYMENT_GATEWAY)."""
+    return import_string(getattr(settings, "PAYMENT_GATEWAY", "api.gateway.MockGateway"))()
@@ -0,0 +1,194 @@
+"""
+Password hashing and verification on a bounded process pool.
+
+Django's default hasher (PBKDF2) spends a couple of hundred milliseconds
+of CPU per password. hashlib releases the GIL while it runs, but nothing
+bounds how many hashes run at once. A burst of sign-ups before Tatkal
+season takes every core the request workers have, and booking traffic
+queues behind it. Here hashing runs on a fixed number of worker processes,
+so it can never take more than that share. The pool belongs to one web
+worker process; settings split a per-host budget (half the CPUs by default)
+across WEB_CONCURRENCY web workers to size it.
+
+The queue in front of the pool is bounded too. At most
+PASSWORD_HASHING_MAX_PENDING passwords are queued or being hashed at
+once. A caller that cannot get a slot within PASSWORD_HASHING_WAIT
+seconds gets HashingBusy, a 503 with Retry-After, so a spike sheds load
+instead of piling up. Batch imports wait for slots instead.
+
+Hasher instances are resolved in the calling process and pickled to the
+workers, so the workers never read settings.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, is_password_usable, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status as drf_status
+from rest_framework.exceptions import APIException
+
+
+# PUBLIC_INTERFACE
+class HashingBusy(APIException):
+    """
+    No hashing slot freed up in time. Raised inside a DRF view (including from authentication)
+    it becomes a 503 with Retry-After: `wait` seconds.
+    """
+    status_code = drf_status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Password hashing is at capacity; retry shortly."
+    default_code = "hashing_busy"
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+def _encode(hasher, password):
+    return make_password(password, hasher=hasher)
+
+
+def _encode_many(hasher, passwords):
+    return [make_password(password, hasher=hasher) for password in passwords]
+
+
+def _verify(hasher, password, encoded, harden):
+    correct = hasher.verify(password, encoded)
+    if not correct and harden:
+        # Same work as a verify that upgrades, so timing does not tell the two apart.
+        hasher.harden_runtime(password, encoded)
+    return correct
+
+
+# PUBLIC_INTERFACE
+class HashingPool:
+    """A process pool with at most `max_pending` tasks queued or running. `workers=0` runs inline."""
+
+    def __init__(self, workers, max_pending, wait):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _submit(self, fn, *args, wait):
+        if not self._slots.acquire(timeout=wait):
+            raise HashingBusy(wait=max(1, round(wait)))
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    # PUBLIC_INTERFACE
+    def run(self, fn, *args):
+        """fn(*args) on a worker process, waiting up to `wait` seconds for a slot (else HashingBusy)."""
+        if not self.workers:
+            return fn(*args)
+        return self._submit(fn, *args, wait=self.wait).result()
+
+    # PUBLIC_INTERFACE
+    def map_batches(self, fn, batches):
+        """
+        [fn(batch) for batch in batches], in order, on the pool. Waits for slots however long it
+        takes, and keeps at most one batch per worker in flight so interactive callers still get slots.
+        """
+        if not self.workers:
+            return [fn(batch) for batch in batches]
+        results, in_flight = [], deque()
+        for batch in batches:
+            if len(in_flight) >= self.workers:
+                results.append(in_flight.popleft().result())
+            in_flight.append(self._submit(fn, batch, wait=None))
+        results.extend(future.result() for future in in_flight)
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# PUBLIC_INTERFACE
+def get_hashing_pool() -> HashingPool:
+    """
+    This process's hashing pool, configured from settings.PASSWORD_HASHING_*; workers start on first use.
+    Every web worker process has its own, so a host runs WEB_CONCURRENCY of them.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    workers=settings.PASSWORD_HASHING_WORKERS,
+                    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+                    wait=settings.PASSWORD_HASHING_WAIT,
+                )
+    return _pool
+
+
+@receiver(setting_changed)
+def _reset_pool(setting, **kwargs):
+    global _pool
+    if setting.startswith("PASSWORD_HASHING_"):
+        with _pool_lock:
+            pool, _pool = _pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+# PUBLIC_INTERFACE
+def hash_password(password, pool=None) -> str:
+    """Encode `password` with the default hasher on the hashing pool; None gives an unusable password."""
+    if password is None:
+        return make_password(None)
+    return (pool or get_hashing_pool()).run(_encode, get_hasher(), password)
+
+
+# PUBLIC_INTERFACE
+def hash_passwords(passwords, pool=None) -> list:
+    """Encode each of `passwords` (None: unusable), spread over the pool's workers in batches."""
+    passwords = list(passwords)
+    pool = pool or get_hashing_pool()
+    size = max(1, len(passwords) // (max(pool.workers, 1) * 4))
+    batches = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    return [encoded for batch in pool.map_batches(partial(_encode_many, get_hasher()), batches) for encoded in batch]
+
+
+# PUBLIC_INTERFACE
+def check_password(password, encoded, pool=None):
+    """
+    Verify `password` against `encoded` on the hashing pool, like django.contrib.auth's
+    check_password. Returns (is_correct, must_update); must_update means the hash should be
+    re-encoded with the preferred hasher.
+    """
+    if password is None or not is_password_usable(encoded):
+        return False, False
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, False
+    preferred = get_hasher()
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    harden = not hasher_changed and must_update
+    correct = (pool or get_hashing_pool()).run(_verify, hasher, password, encoded, harden)
+    return correct, must_update
@@ -0,0 +1,143 @@
+"""
+Snowflake-style identifiers for PNRs and payment order ids.
+
+An id is a 63-bit integer: milliseconds since ID_EPOCH (41 bits, ~69 years),
+then the worker id (10 bits), then a per-millisecond sequence (12 bits). Ids
+from one worker are strictly increasing. Ids from different workers cannot
+collide only while every process writing to the database has a distinct
+worker id; given that, no database round trip or retry loop is needed.
+Rendered ids are fixed width, which keeps them sortable as strings too.
+
+Each process needs its own worker id. Set ID_WORKER_ID (0-1023) per process
+in deployment; settings refuse to load without it when DEBUG is off. In
+development the worker id falls back to the process id modulo 1024, with a
+warning. Two processes whose pids agree modulo 1024 then share a worker id,
+and their ids can collide.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+ID_EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+PNR_DIGITS = 19  # 2**63 - 1 has 19 decimal digits
+ORDER_ID_PREFIX = "order_"
+ORDER_ID_WIDTH = 13  # 2**63 - 1 has 13 base-36 digits
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+# PUBLIC_INTERFACE
+class SnowflakeGenerator:
+    """Thread-safe generator of (timestamp, worker, sequence) ids for one worker id."""
+
+    def __init__(self, worker_id, clock=time.time_ns):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}, got {worker_id}.")
+        self.worker_id = worker_id
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    # PUBLIC_INTERFACE
+    def next_id(self) -> int:
+        """
+        Next id. If the sequence runs out within a millisecond, or the wall clock steps back,
+        the generator keeps counting on its own last timestamp instead of waiting, so ids stay
+        monotonic and the call never blocks.
+        """
+        now = self._clock() // 1_000_000 - ID_EPOCH_MS
+        with self._lock:
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    self._last_ms += 1
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+
+# PUBLIC_INTERFACE
+def parse_id(value):
+    """Split an id into (unix milliseconds, worker id, sequence)."""
+    return (
+        (value >> (WORKER_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS,
+        (value >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        value & MAX_SEQUENCE,
+    )
+
+
+# PUBLIC_INTERFACE
+def configured_worker_id() -> int:
+    """
+    settings.ID_WORKER_ID when set, else this process's pid modulo 1024 (with a warning: not unique).
+    Raises ImproperlyConfigured if the setting is not an integer from 0 to 1023.
+    """
+    worker_id = getattr(settings, "ID_WORKER_ID", None)
+    if worker_id in (None, ""):
+        fallback = os.getpid() % (MAX_WORKER_ID + 1)
+        logger.warning(
+            "ID_WORKER_ID is not set; using worker id %s from the pid. PNRs and order ids can collide with "
+            "another process that has the same pid modulo %s.", fallback, MAX_WORKER_ID + 1,
+        )
+        return fallback
+    try:
+        value = int(worker_id)
+    except (TypeError, ValueError):
+        value = -1
+    if not 0 <= value <= MAX_WORKER_ID:
+        raise ImproperlyConfigured(f"ID_WORKER_ID must be an integer from 0 to {MAX_WORKER_ID}, not {worker_id!r}.")
+    return value
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _generator, _generator_lock
+    _generator = None
+    _generator_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# PUBLIC_INTERFACE
+def next_id() -> int:
+    """Next id from this process's generator (created on first use, and again after a fork)."""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = SnowflakeGenerator(configured_worker_id())
+    return _generator.next_id()
+
+
+# PUBLIC_INTERFACE
+def new_pnr() -> str:
+    """A new PNR: the id as 19 zero-padded digits."""
+    return str(next_id()).zfill(PNR_DIGITS)
+
+
+# PUBLIC_INTERFACE
+def new_order_id() -> str:
+    """A new payment order id: "order_" plus the id in 13 zero-padded base-36 digits."""
+    value = next_id()
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(_BASE36[remainder])
+    return ORDER_ID_PREFIX + "".join(reversed(digits)).rjust(ORDER_ID_WIDTH, "0")
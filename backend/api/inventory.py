@@ -0,0 +1,183 @@
+"""
+Seat inventory and berth allocation.
+
+A berth is claimed by picking the first unsold seat of the wanted type from a
+partial index over unsold seats and assigning the booking to it in the same
+transaction. On PostgreSQL the pick uses `SELECT ... FOR UPDATE SKIP LOCKED`,
+so concurrent requesters each get a different seat and never wait on each
+other's uncommitted claims. SQLite, which serializes writers, gets the same
+guarantee from IMMEDIATE transactions.
+
+Segment availability reads go through a two-tier cache keyed by
+(source, destination, journey_date, berth type), invalidated when a claim or
+release commits.
+"""
+from urllib.parse import quote
+
+from django.db import transaction
+from django.db.models import Count
+
+from .caching import TieredCache
+from .models import Coach, Seat, TrainRun
+
+BERTHS_PER_COACH = 72
+
+# Sleeper bay of eight berths, repeated nine times per 72-berth coach.
+BAY_LAYOUT = ("lower", "middle", "upper", "lower", "middle", "upper", "side_lower", "side_upper")
+
+# Berth types tried, in order, for each preference when the preferred type is sold out.
+PREFERENCE_ORDER = {
+    "lower": ("lower", "side_lower", "middle", "upper", "side_upper"),
+    "middle": ("middle", "lower", "upper", "side_lower", "side_upper"),
+    "upper": ("upper", "middle", "side_upper", "lower", "side_lower"),
+    "side_lower": ("side_lower", "lower", "side_upper", "middle", "upper"),
+    "side_upper": ("side_upper", "upper", "side_lower", "middle", "lower"),
+    "any": ("lower", "middle", "upper", "side_lower", "side_upper"),
+}
+BERTH_TYPES = PREFERENCE_ORDER["any"]
+
+AVAILABILITY_CACHE = TieredCache(
+    "availability", max_size=20000, local_ttl=2.0, shared_ttl=60,
+    # Longer than the grouped count query takes, so a count read before a booking commits cannot refill
+    # the shared tier after that booking's invalidation, in any process.
+    tombstone_ttl=5,
+)
+
+
+# PUBLIC_INTERFACE
+class NoBerthAvailable(Exception):
+    """Raised when a run with inventory has no unsold berth left for a booking."""
+
+
+# PUBLIC_INTERFACE
+def berth_type_for(number) -> str:
+    """Berth type of seat `number` (1-based) in a sleeper coach."""
+    return BAY_LAYOUT[(number - 1) % len(BAY_LAYOUT)]
+
+
+# PUBLIC_INTERFACE
+def create_train_run(train_number, source, destination, journey_date, coaches=20,
+                     berths_per_coach=BERTHS_PER_COACH) -> TrainRun:
+    """Create a run with `coaches` sleeper coaches (S1..Sn) and all their berths, in bulk."""
+    with transaction.atomic():
+        run = TrainRun.objects.create(
+            train_number=train_number, source=source, destination=destination, journey_date=journey_date
+        )
+        coach_rows = Coach.objects.bulk_create(Coach(run=run, code=f"S{i}") for i in range(1, coaches + 1))
+        Seat.objects.bulk_create(
+            (
+                Seat(run=run, coach=coach, number=number, berth_type=berth_type_for(number))
+                for coach in coach_rows
+                for number in range(1, berths_per_coach + 1)
+            ),
+            batch_size=2000,
+        )
+        transaction.on_commit(lambda: invalidate_segment(source, destination, journey_date))
+    return run
+
+
+# PUBLIC_INTERFACE
+def runs_for(source, destination, journey_date):
+    """Train runs serving a segment on a date, oldest first."""
+    return TrainRun.objects.filter(source=source, destination=destination, journey_date=journey_date).order_by("id")
+
+
+# PUBLIC_INTERFACE
+def allocate_berth(booking):
+    """
+    Assign a berth to `booking`, honouring its preferred berth where possible.
+
+    Returns the Seat, or None if no train run exists for the booking's segment (inventory not managed).
+    Raises NoBerthAvailable if runs exist but every berth is sold.
+    """
+    run_ids = list(runs_for(booking.source, booking.destination, booking.journey_date).values_list("id", flat=True))
+    if not run_ids:
+        return None
+    order = PREFERENCE_ORDER.get(booking.preferred_berth, PREFERENCE_ORDER["any"])
+    for run_id in run_ids:
+        for berth_type in order:
+            seat = _claim(run_id, berth_type, booking)
+            if seat is not None:
+                _invalidate_on_commit(booking)
+                return seat
+    raise NoBerthAvailable(f"No berths available for {booking.source}->{booking.destination} on {booking.journey_date}.")
+
+
+# PUBLIC_INTERFACE
+def release_berth(booking) -> bool:
+    """Return the booking's berth to the pool. Returns True if a berth was released."""
+    released = Seat.objects.filter(booking=booking).update(booking=None) == 1
+    if released:
+        _invalidate_on_commit(booking)
+    return released
+
+
+# PUBLIC_INTERFACE
+def availability(run_id):
+    """Map berth type -> unsold berth count for one run (served from the partial free-berth index)."""
+    rows = (
+        Seat.objects.filter(run_id=run_id, booking__isnull=True)
+        .order_by()
+        .values("berth_type")
+        .annotate(free=Count("id"))
+    )
+    counts = {berth_type: 0 for berth_type in BERTH_TYPES}
+    counts.update({row["berth_type"]: row["free"] for row in rows})
+    return counts
+
+
+# PUBLIC_INTERFACE
+def segment_availability(source, destination, journey_date, berth_types=BERTH_TYPES):
+    """
+    Map berth type -> unsold berths across all runs of a segment on a date, read through
+    AVAILABILITY_CACHE. Cache misses for a segment are filled with one grouped query.
+    """
+    keys = [_availability_key(source, destination, journey_date, berth_type) for berth_type in berth_types]
+
+    def load(missing):
+        rows = (
+            Seat.objects.filter(
+                run__source=source, run__destination=destination, run__journey_date=journey_date,
+                booking__isnull=True,
+            )
+            .order_by()
+            .values("berth_type")
+            .annotate(free=Count("id"))
+        )
+        free = {row["berth_type"]: row["free"] for row in rows}
+        return {key: free.get(key.rsplit("|", 1)[1], 0) for key in missing}
+
+    found = AVAILABILITY_CACHE.get_many(keys, load)
+    return {berth_type: found[key] for berth_type, key in zip(berth_types, keys)}
+
+
+# PUBLIC_INTERFACE
+def invalidate_segment(source, destination, journey_date):
+    """Drop every cached berth count of a segment (both cache tiers)."""
+    AVAILABILITY_CACHE.invalidate(
+        [_availability_key(source, destination, journey_date, berth_type) for berth_type in BERTH_TYPES]
+    )
+
+
+def _availability_key(source, destination, journey_date, berth_type):
+    return "|".join((quote(source), quote(destination), str(journey_date), berth_type))
+
+
+def _invalidate_on_commit(booking):
+    segment = (booking.source, booking.destination, booking.journey_date)
+    transaction.on_commit(lambda: invalidate_segment(*segment))
+
+
+def _claim(run_id, berth_type, booking):
+    with transaction.atomic():
+        seat = (
+            Seat.objects.select_for_update(skip_locked=True)
+            .filter(run_id=run_id, berth_type=berth_type, booking__isnull=True)
+            .order_by("coach", "number")
+            .first()
+        )
+        if seat is None:
+            return None
+        seat.booking = booking
+        seat.save(update_fields=["booking"])
+    return seat
@@ -0,0 +1,141 @@
+"""
+Database-backed job queue for payment gateway work.
+
+Requests enqueue a PaymentJob row in their own transaction and return; the
+`run_payment_workers` command polls for due jobs and runs them on a thread or
+process pool. A worker claims a batch with `SELECT ... FOR UPDATE SKIP LOCKED`
+and leases it for LEASE seconds, so a job held by a crashed worker becomes
+claimable again when the lease runs out. Handlers must therefore be
+idempotent. A failed attempt is retried after an exponential backoff with
+jitter until the job runs out of attempts.
+"""
+import datetime
+import logging
+import random
+import traceback
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PaymentJob
+
+logger = logging.getLogger(__name__)
+
+LEASE = datetime.timedelta(seconds=60)
+BACKOFF_BASE = 1.0  # seconds before the first retry
+BACKOFF_MAX = 300.0
+
+_HANDLERS = {}
+
+
+# PUBLIC_INTERFACE
+def job_handler(kind, on_exhausted=None):
+    """
+    Register the decorated function as the handler for jobs of `kind`. It is called with the
+    PaymentJob and returns a JSON-serializable result. `on_exhausted(job)` runs, if given,
+    when the job fails for the last time.
+    """
+    def register(func):
+        _HANDLERS[kind] = (func, on_exhausted)
+        return func
+    return register
+
+
+# PUBLIC_INTERFACE
+def enqueue(kind, payment_transaction_id, payload=None, dedupe_key=None, max_attempts=5):
+    """
+    Queue a job. With `dedupe_key`, enqueueing the same key again returns the existing job,
+    re-queued with fresh attempts if it had failed for good. Returns (job, created).
+    """
+    defaults = {
+        "kind": kind, "payment_transaction_id": payment_transaction_id,
+        "payload": payload or {}, "max_attempts": max_attempts,
+    }
+    if dedupe_key is None:
+        return PaymentJob.objects.create(**defaults), True
+    job, created = PaymentJob.objects.get_or_create(dedupe_key=dedupe_key, defaults=defaults)
+    if not created and job.status == PaymentJob.STATUS_FAILED:
+        requeued = PaymentJob.objects.filter(pk=job.pk, status=PaymentJob.STATUS_FAILED).update(
+            status=PaymentJob.STATUS_QUEUED, attempts=0, run_after=timezone.now()
+        )
+        if requeued:
+            job.status, job.attempts = PaymentJob.STATUS_QUEUED, 0
+    return job, created
+
+
+# PUBLIC_INTERFACE
+def backoff_delay(attempt) -> float:
+    """Seconds to wait before retrying after failed attempt number `attempt` (1-based)."""
+    delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+# PUBLIC_INTERFACE
+def claim_jobs(worker, limit=10):
+    """Lease up to `limit` due jobs to `worker` and return them, oldest first."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            PaymentJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=PaymentJob.STATUS_QUEUED, run_after__lte=now)
+                | Q(status=PaymentJob.STATUS_RUNNING, locked_until__lt=now)
+            )
+            .order_by("run_after", "id")[:limit]
+        )
+        if jobs:
+            PaymentJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=PaymentJob.STATUS_RUNNING, attempts=F("attempts") + 1,
+                locked_by=worker, locked_until=now + LEASE,
+            )
+    for job in jobs:
+        job.status, job.attempts, job.locked_by = PaymentJob.STATUS_RUNNING, job.attempts + 1, worker
+    return jobs
+
+
+# PUBLIC_INTERFACE
+def run_job(job):
+    """Run one claimed job and record its outcome. Returns the job's new status."""
+    handler, on_exhausted = _HANDLERS.get(job.kind, (None, None))
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}.")
+        result = handler(job)
+    except Exception as exc:
+        job.last_error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+        job.locked_by, job.locked_until = "", None
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = PaymentJob.STATUS_QUEUED
+            job.run_after = timezone.now() + datetime.timedelta(seconds=backoff_delay(job.attempts))
+        else:
+            job.status = PaymentJob.STATUS_FAILED
+            logger.exception("Payment job %s (%s) failed permanently", job.pk, job.kind)
+        job.save(update_fields=["status", "run_after", "last_error", "locked_by", "locked_until", "updated_at"])
+        if job.status == PaymentJob.STATUS_FAILED and on_exhausted is not None:
+            on_exhausted(job)
+        return job.status
+    job.status, job.result = PaymentJob.STATUS_DONE, result
+    job.locked_by, job.locked_until = "", None
+    job.save(update_fields=["status", "result", "locked_by", "locked_until", "updated_at"])
+    return job.status
+
+
+# PUBLIC_INTERFACE
+def run_pending(worker="local", limit=10) -> int:
+    """Claim and run one batch of due jobs. Returns how many ran (0 means the queue had none due)."""
+    jobs = claim_jobs(worker, limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+# PUBLIC_INTERFACE
+def drain(worker="local", limit=10) -> int:
+    """Run due jobs until none are left. Returns how many ran. Meant for tests and one-shot runs."""
+    total = 0
+    while True:
+        ran = run_pending(worker, limit)
+        if not ran:
+            return total
+        total += ran
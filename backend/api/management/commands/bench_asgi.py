@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.factories import load_dataset, seed, teardown
+from benchmarks.runner import RATE_METRIC, RESULT_VERSION, environment, run_scenario, server_transport, write_results
+from benchmarks.scenarios import SCENARIOS
+
+# (sync DRF route, its /api/async/ variant) for the endpoints api/async_views.py mirrors.
+HOT_ROUTES = (
+    ("create_booking", "async_create_booking"),
+    ("tatkal_booking_status", "async_tatkal_booking_status"),
+    ("payment_callback", "async_payment_callback"),
+    ("deposit_wallet", "async_deposit_wallet"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the hot booking and payment endpoints over real HTTP: the sync DRF routes on Django's "
+        "threaded WSGI server against their /api/async/ variants on uvicorn serving config.asgi, at the "
+        "same concurrency. Reports requests/sec, p50/p95/p99 latency and error responses per route, and "
+        "fails if any route returned an error. Needs uvicorn. Runs against the configured database: point "
+        "DB_* at a scratch one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Recorded requests per route.")
+        parser.add_argument("--warmup", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--tag", default="asgi", help="Dataset tag; an existing dataset with it is reused.")
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--bookings", type=int, default=50000)
+        parser.add_argument("--payments", type=int, default=20000)
+        parser.add_argument("--output", help="Also write the results as JSON for compare_benchmarks.")
+        parser.add_argument("--teardown", action="store_true", help="Delete the dataset afterwards.")
+
+    def handle(self, *args, **options):
+        scenarios = {scenario.route: scenario for scenario in SCENARIOS}
+        dataset = load_dataset(options["tag"])
+        if dataset is None:
+            self.stdout.write(f"Seeding dataset {options['tag']!r}...")
+            dataset = seed(
+                options["tag"], users=options["users"], bookings=options["bookings"], payments=options["payments"],
+                log=self.stdout.write,
+            )
+        # Both payment_callback routes take a fresh pending payment for every request.
+        needed = 2 * (options["warmup"] + options["requests"])
+        if len(dataset.pools["pending_payments"]) < needed:
+            raise CommandError(
+                f"Dataset {options['tag']!r} has {len(dataset.pools['pending_payments'])} pending payments left; "
+                f"this run needs {needed}. Seed a larger one (--payments) under a new --tag."
+            )
+
+        results = {}
+        try:
+            # Both servers start before any load, so a missing uvicorn fails the run straight away.
+            with server_transport("asgi") as asgi, server_transport("wsgi") as wsgi:
+                for sync, async_ in HOT_ROUTES:
+                    for route, transport in ((sync, wsgi), (async_, asgi)):
+                        results[route] = run_scenario(
+                            scenarios[route], dataset, transport, requests=options["requests"],
+                            warmup=options["warmup"], concurrency=options["concurrency"],
+                        )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if options["teardown"]:
+                teardown(options["tag"])
+
+        self.stdout.write(f"{options['requests']} requests per route at concurrency {options['concurrency']}")
+        for sync, async_ in HOT_ROUTES:
+            for label, route in ((f"WSGI {sync}", sync), (f"ASGI {async_}", async_)):
+                result = results[route]
+                self.stdout.write(
+                    f"{label:<38} {result[RATE_METRIC]:>9.1f} req/s  p50={result['p50_ms']:.2f}ms "
+                    f"p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms errors={result['errors']}"
+                )
+        if options["output"]:
+            write_results({"version": RESULT_VERSION, "meta": environment(dataset), "results": {
+                f"{result['transport']}/{route}": result for route, result in results.items()
+            }}, options["output"])
+        failing = {route: result["error_statuses"] for route, result in results.items() if result["errors"]}
+        if failing:
+            raise CommandError(f"Routes answered with error statuses: {failing}")
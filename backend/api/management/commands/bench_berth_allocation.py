@@ -0,0 +1,81 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from api.bench import summarize
+from api.inventory import PREFERENCE_ORDER, NoBerthAvailable, allocate_berth, create_train_run
+from api.models import Booking, Seat, UserProfile
+
+
+class Command(BaseCommand):
+    help = "Sell out a full train run with many concurrent requesters and check no berth is sold twice."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--coaches", type=int, default=20)
+        parser.add_argument("--berths", type=int, default=72)
+        parser.add_argument("--requesters", type=int, default=500)
+
+    def handle(self, *args, **options):
+        journey_date = datetime.date.today() + datetime.timedelta(days=1)
+        stamp = int(time.time())
+        run = create_train_run(
+            f"B{stamp % 100000}", "BENCH_SRC", "BENCH_DST", journey_date,
+            coaches=options["coaches"], berths_per_coach=options["berths"],
+        )
+        user = User.objects.create_user(username=f"bench_berths_{stamp}", password="bench")
+        profile = UserProfile.objects.create(user=user, full_name="Bench", age=35, address="Bench")
+        preferences = list(PREFERENCE_ORDER)
+        lock = threading.Lock()
+        errors = []
+
+        def requester(worker):
+            latencies = []
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            booking = Booking.objects.create(
+                                user_profile_id=profile.pk, source=run.source, destination=run.destination,
+                                journey_date=journey_date, passenger_name=f"R{worker}", passenger_age=30,
+                                passenger_sex="M", fare=Decimal("1.00"),
+                                preferred_berth=preferences[worker % len(preferences)],
+                            )
+                            allocate_berth(booking)
+                    except NoBerthAvailable:
+                        return latencies
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["requesters"]) as pool:
+                results = list(pool.map(requester, range(options["requesters"])))
+            elapsed = time.perf_counter() - started
+
+            total = options["coaches"] * options["berths"]
+            sold = Seat.objects.filter(run=run, booking__isnull=False).count()
+            distinct = Seat.objects.filter(run=run, booking__isnull=False).values("booking").distinct().count()
+            latencies = [sample for worker in results for sample in worker]
+            self.stdout.write(
+                f"{total} berths, {options['requesters']} concurrent requesters, "
+                f"sold out in {elapsed:.2f}s ({total / elapsed:.1f} berths/s)"
+            )
+            self.stdout.write(summarize("allocation", latencies))
+            self.stdout.write(f"Sold: {sold}/{total}, lock errors: {len(errors)}")
+            if sold != total or distinct != sold or len(latencies) != sold:
+                raise CommandError("Inventory mismatch: a berth was lost or sold twice.")
+        finally:
+            run.delete()
+            user.delete()
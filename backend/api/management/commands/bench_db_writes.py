@@ -0,0 +1,74 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from api.bench import summarize
+from api.models import Booking, UserProfile
+from api.wallet import credit_wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent write load test against the configured database. "
+        "Run once per DB_ENGINE/DB_POOL setting to compare writes per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--seconds", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        mode = settings_dict["ENGINE"].rsplit(".", 1)[-1]
+        if settings_dict["OPTIONS"].get("pool"):
+            mode += " (pooled)"
+        elif settings_dict.get("CONN_MAX_AGE"):
+            mode += f" (persistent, CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']})"
+
+        user = User.objects.create_user(username=f"bench_db_writes_{int(time.time())}", password="bench")
+        profile = UserProfile.objects.create(user=user, full_name="Bench", age=35, address="Bench")
+        deadline = time.perf_counter() + options["seconds"]
+        errors = []
+        lock = threading.Lock()
+
+        def writer(worker):
+            latencies = []
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        booking = Booking.objects.create(
+                            user_profile_id=profile.pk, source="NDLS", destination="BCT",
+                            journey_date=datetime.date.today(), passenger_name=f"W{worker}",
+                            passenger_age=30, passenger_sex="M", fare=Decimal("1.00"),
+                        )
+                        credit_wallet(profile.pk, Decimal("1.00"))
+                        booking.try_pay_via_wallet()
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            return latencies
+
+        try:
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                results = list(pool.map(writer, range(options["threads"])))
+        finally:
+            user.delete()
+
+        latencies = [sample for worker in results for sample in worker]
+        # Each iteration is three committed write transactions: booking insert, deposit, wallet payment.
+        writes = len(latencies) * 3
+        self.stdout.write(f"Database: {mode}, {options['threads']} threads, {options['seconds']}s")
+        self.stdout.write(summarize("booking+deposit+payment", latencies))
+        self.stdout.write(f"Writes/sec: {writes / options['seconds']:.1f}")
+        self.stdout.write(f"Lock errors: {len(errors)}" + (f" (first: {errors[0]})" if errors else ""))
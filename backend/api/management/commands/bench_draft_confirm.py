@@ -0,0 +1,87 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.bench import percentile, rolled_back, summarize
+from api.inventory import BERTHS_PER_COACH, create_train_run
+from api.models import BookingDraft, UserProfile
+
+SOURCE, DESTINATION = "DRAFT_SRC", "DRAFT_DST"
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end latency of booking at window open: POST /api/create_booking/ with every "
+        "passenger and journey field, against POST /api/drafts/<id>/confirm/ for a draft staged "
+        "beforehand. Both allocate a berth and pay from the wallet. Requests alternate so both "
+        "see the same inventory state. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=500, help="Bookings made by each path.")
+
+    def handle(self, *args, **options):
+        count = options["bookings"]
+        admission = {**settings.TATKAL_ADMISSION, "ENABLED": False}  # Measure the booking path, not the limiter.
+        with override_settings(TATKAL_ADMISSION=admission), rolled_back():
+            profile, journey_date = self._seed(count)
+            client = APIClient()
+            staged = []
+            stage_samples = []
+            for i in range(count):
+                start = time.perf_counter()
+                response = client.post(reverse("booking_draft_list_create"), {
+                    "user_profile_id": profile.pk, "source": SOURCE, "destination": DESTINATION,
+                    "journey_date": str(journey_date), "fare_ceiling": "600.00",
+                    "passengers": [{"passenger_name": f"Draft {i}", "passenger_age": 30, "passenger_sex": "F",
+                                    "preferred_berth": "lower"}],
+                }, format="json")
+                stage_samples.append(time.perf_counter() - start)
+                assert response.status_code == 201, response.content
+                staged.append(response.data["id"])
+
+            create_samples, confirm_samples = [], []
+            for i, draft_id in enumerate(staged):
+                start = time.perf_counter()
+                response = client.post(reverse("create_booking"), {
+                    "user_profile_id": profile.pk, "source": SOURCE, "destination": DESTINATION,
+                    "journey_date": str(journey_date), "passenger_name": f"Direct {i}", "passenger_age": 30,
+                    "passenger_sex": "F", "preferred_berth": "lower", "fare": "500.00",
+                }, format="json")
+                create_samples.append(time.perf_counter() - start)
+                assert response.status_code == 201 and response.data["wallet_auto_debited"], response.content
+
+                start = time.perf_counter()
+                response = client.post(reverse("booking_draft_confirm", args=[draft_id]),
+                                       {"user_profile_id": profile.pk, "fare": "500.00"},
+                                       format="json")
+                confirm_samples.append(time.perf_counter() - start)
+                assert response.status_code == 201 and response.data["wallet_auto_debited"], response.content
+            confirmed = BookingDraft.objects.filter(pk__in=staged, status=BookingDraft.STATUS_CONFIRMED).count()
+
+        self.stdout.write(f"{count} single-passenger bookings per path; berth allocated and wallet debited")
+        self.stdout.write("  " + summarize("stage draft (ahead of the window)", stage_samples))
+        self.stdout.write("  " + summarize("create_booking (at window open)   ", create_samples))
+        self.stdout.write("  " + summarize("confirm draft (at window open)    ", confirm_samples))
+        self.stdout.write(
+            f"  confirm vs create_booking: p50 {percentile(create_samples, 50) / percentile(confirm_samples, 50):.2f}x "
+            f"faster, p99 {percentile(create_samples, 99) / percentile(confirm_samples, 99):.2f}x faster; "
+            f"{confirmed}/{count} drafts confirmed"
+        )
+
+    @staticmethod
+    def _seed(count):
+        journey_date = datetime.date.today() + datetime.timedelta(days=1)
+        coaches = -(-2 * count // BERTHS_PER_COACH)
+        create_train_run("DRAFT1", SOURCE, DESTINATION, journey_date, coaches=coaches)
+        user = User.objects.create(username=f"bench_draft_{time.time_ns()}")
+        profile = UserProfile.objects.create(user=user, full_name="Draft", age=35, address="Draft")
+        profile.deposit_wallet(Decimal("500.00") * 2 * count)
+        return profile, journey_date
@@ -0,0 +1,55 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from api.bench import rolled_back, summarize, timed
+from api.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Compare one create_group_booking call against N sequential create_booking calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--passengers", type=int, default=4)
+        parser.add_argument("--rounds", type=int, default=200)
+
+    def handle(self, *args, **options):
+        passengers = options["passengers"]
+        rounds = options["rounds"]
+        client = APIClient()
+        with rolled_back():
+            user = User.objects.create_user(username="bench_group_booking", password="bench")
+            profile = UserProfile.objects.create(user=user, full_name="Bench", age=35, address="Bench")
+            profile.deposit_wallet(Decimal("100.00") * passengers * rounds * 2)
+            journey = {
+                "user_profile_id": profile.pk,
+                "source": "NDLS",
+                "destination": "BCT",
+                "journey_date": (datetime.date.today() + datetime.timedelta(days=1)).isoformat(),
+            }
+            party = [
+                {"passenger_name": f"Passenger {i}", "passenger_age": 30 + i, "passenger_sex": "F",
+                 "preferred_berth": "lower", "fare": "100.00"}
+                for i in range(passengers)
+            ]
+
+            sequential = []
+            for _ in range(rounds):
+                _, elapsed = timed(lambda: [
+                    client.post("/api/create_booking/", {**journey, **p}, format="json") for p in party
+                ])
+                sequential.append(elapsed)
+
+            grouped = []
+            for _ in range(rounds):
+                _, elapsed = timed(
+                    client.post, "/api/create_group_booking/", {**journey, "passengers": party}, format="json"
+                )
+                grouped.append(elapsed)
+
+        self.stdout.write(summarize(f"{passengers} x create_booking", sequential))
+        self.stdout.write(summarize("1 x create_group_booking", grouped))
+        self.stdout.write(f"Speedup: {sum(sequential) / sum(grouped):.2f}x")
@@ -0,0 +1,51 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ids
+
+
+def _generate(args):
+    worker_id, count = args
+    settings.ID_WORKER_ID = worker_id
+    start = time.perf_counter()
+    pnrs = [ids.new_pnr() for _ in range(count)]
+    return pnrs, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure PNR/order-id generation throughput in one process, then generate ids in several "
+        "forked worker processes (one worker id each) and check they are all distinct."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1_000_000)
+        parser.add_argument("--processes", type=int, default=4)
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        for label, make in (("next_id", ids.next_id), ("new_pnr", ids.new_pnr), ("new_order_id", ids.new_order_id)):
+            start = time.perf_counter()
+            for _ in range(count):
+                make()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label}: {count / elapsed:,.0f} ids/s")
+
+        processes = options["processes"]
+        start = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.map(_generate, [(worker, count) for worker in range(processes)])
+        elapsed = time.perf_counter() - start
+        generated = [pnr for pnrs, _ in results for pnr in pnrs]
+        self.stdout.write(
+            f"{processes} processes: {len(generated):,} PNRs in {elapsed:.2f}s "
+            f"({len(generated) / elapsed:,.0f} ids/s aggregate)"
+        )
+        if len(set(generated)) != len(generated):
+            raise CommandError("Duplicate PNRs generated across worker processes.")
+        if any(pnrs != sorted(pnrs) for pnrs, _ in results):
+            raise CommandError("PNRs from one worker were not monotonic.")
+        self.stdout.write("All PNRs distinct and monotonic per worker.")
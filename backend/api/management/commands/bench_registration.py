@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.bench import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Registrations per second per core, with password hashing inline on the request thread versus "
+        "on the hashing process pool. A probe thread requests /api/health/ throughout to show what a "
+        "registration burst does to other traffic on the same worker. Registered users are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--registrations", type=int, default=32)
+        parser.add_argument("--concurrency", type=int, default=8, help="Threads registering at once.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Hashing pool processes.")
+
+    def handle(self, *args, **options):
+        cpus = os.cpu_count()
+        workers = options["workers"]
+        self.stdout.write(
+            f"{options['registrations']} registrations, {options['concurrency']} concurrent, "
+            f"hasher={settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1]}, {cpus} CPUs"
+        )
+        for label, pool_workers, cores in (("inline", 0, 1), (f"pool x{workers}", workers, min(workers, cpus))):
+            rate, probe = self._run(pool_workers, options["registrations"], options["concurrency"])
+            self.stdout.write(
+                f"  {label:<10} {rate:7.2f} registrations/s  {rate / cores:7.2f}/s per core  "
+                f"health during burst: p50={percentile(probe, 50) * 1000:.1f}ms "
+                f"p99={percentile(probe, 99) * 1000:.1f}ms (n={len(probe)})"
+            )
+
+    def _run(self, workers, registrations, concurrency):
+        prefix = f"bench_reg_{time.time_ns()}_"
+        done = threading.Event()
+        probe = []
+
+        def register(i):
+            try:
+                response = APIClient().post("/api/register_user/", {
+                    "username": f"{prefix}{i}", "password": "bench-password-123", "full_name": "Bench",
+                    "age": 30, "address": "1 Benchmark Rd", "preferred_berth": "any",
+                }, format="json")
+                assert response.status_code == 201, response.content
+            finally:
+                connection.close()
+
+        def health():
+            client = APIClient()
+            while not done.is_set():
+                start = time.perf_counter()
+                client.get("/api/health/")
+                probe.append(time.perf_counter() - start)
+                time.sleep(0.01)
+
+        with override_settings(PASSWORD_HASHING_WORKERS=workers):
+            register(-1)  # start the pool's processes outside the timed run
+            prober = threading.Thread(target=health)
+            prober.start()
+            start = time.perf_counter()
+            try:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(register, range(registrations)))
+                elapsed = time.perf_counter() - start
+            finally:
+                done.set()
+                prober.join()
+                User.objects.filter(username__startswith=prefix).delete()
+        return registrations / elapsed, probe
@@ -0,0 +1,85 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.bench import rolled_back
+from api.inventory import allocate_berth, create_train_run
+from api.models import Booking, UserProfile
+from api.serializers import BookingSerializer
+from api.status_poll import booking_status_body
+
+
+def _serializer_body(booking_id):
+    booking = BookingSerializer.setup_eager_loading(Booking.objects.all()).get(id=booking_id)
+    return JSONRenderer().render(BookingSerializer(booking).data)
+
+
+def _cpu_per_call(fn, iterations):
+    """(CPU microseconds, wall microseconds) per call, after a short warmup."""
+    for _ in range(min(iterations, 50)):
+        fn()
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (
+        (time.process_time() - cpu) / iterations * 1e6,
+        (time.perf_counter() - wall) / iterations * 1e6,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request CPU for booking-status polling. Measures the full BookingSerializer "
+        "path (GET /api/bookings/<id>/) against the compact values()-based path "
+        "(GET /api/bookings/<id>/status/), both in isolation and through the request stack, "
+        "including 304 revalidation. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        with rolled_back():
+            booking = self._seed()
+            client = Client()
+            full_url = reverse("tatkal_booking_status", args=[booking.pk])
+            poll_url = reverse("tatkal_booking_poll", args=[booking.pk])
+            etag = client.get(poll_url)["ETag"]
+            cases = (
+                ("serializer: fetch + BookingSerializer + render", lambda: _serializer_body(booking.pk)),
+                ("fast path: values_list + row builder", lambda: booking_status_body(booking.pk)),
+                (f"GET {full_url}", lambda: client.get(full_url)),
+                (f"GET {poll_url}", lambda: client.get(poll_url)),
+                (f"GET {poll_url} (If-None-Match, 304)", lambda: client.get(poll_url, headers={"if-none-match": etag})),
+            )
+            results = [(label, *_cpu_per_call(fn, iterations)) for label, fn in cases]
+            sizes = (len(client.get(full_url).content), len(client.get(poll_url).content))
+        self.stdout.write(f"{iterations} calls each; microseconds per call")
+        for label, cpu, wall in results:
+            self.stdout.write(f"  {label:<62} cpu={cpu:8.1f}us  wall={wall:8.1f}us")
+        self.stdout.write(f"  CPU saved per call, in isolation: {results[0][1] / results[1][1]:.1f}x")
+        self.stdout.write(f"  CPU saved per request over HTTP: {results[2][1] / results[3][1]:.1f}x "
+                          f"({results[2][1] / results[4][1]:.1f}x when unchanged)")
+        self.stdout.write(f"  body bytes: full={sizes[0]} poll={sizes[1]} (304: 0)")
+
+    @staticmethod
+    def _seed():
+        journey_date = datetime.date.today() + datetime.timedelta(days=1)
+        run = create_train_run("POLL1", "POLL_SRC", "POLL_DST", journey_date, coaches=1)
+        user = User.objects.create(username=f"bench_poll_{time.time_ns()}")
+        profile = UserProfile.objects.create(user=user, full_name="Poll", age=35, address="Poll")
+        booking = Booking.objects.create(
+            user_profile=profile, source=run.source, destination=run.destination, journey_date=journey_date,
+            passenger_name="Poll", passenger_age=35, passenger_sex="F", fare=Decimal("500.00"),
+            booking_status="booked", pnr="1234567890123456789", paid=True, payment_time=timezone.now(),
+        )
+        allocate_berth(booking)
+        return booking
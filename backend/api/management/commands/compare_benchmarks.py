@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import compare, read_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare two run_benchmarks result files and fail if any route's throughput or latency "
+        "percentile got worse than the baseline by more than --threshold percent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("baseline")
+        parser.add_argument("current")
+        parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression, in percent.")
+        parser.add_argument("--all", action="store_true", help="Show every metric, not just regressions.")
+
+    def handle(self, *args, **options):
+        try:
+            baseline, current = read_results(options["baseline"]), read_results(options["current"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        for label, document in (("baseline", baseline), ("current", current)):
+            meta = document["meta"]
+            self.stdout.write(f"{label}: {meta['timestamp']} commit={meta['git_commit'] or '?'} db={meta['database']}")
+        if baseline["meta"].get("dataset") != current["meta"].get("dataset"):
+            self.stdout.write(self.style.WARNING("Datasets differ between the runs; results may not be comparable."))
+
+        rows = compare(baseline, current, options["threshold"])
+        regressions = [row for row in rows if row[5]]
+        for key, metric, old, new, change, regressed in rows:
+            if regressed or options["all"]:
+                line = f"{key:<45} {metric:<15} {old:>10} -> {new:>10} ({change:+.1f}%)"
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION") if regressed else line)
+        only_one = set(baseline["results"]) ^ set(current["results"])
+        if only_one:
+            self.stdout.write(f"Not compared (present in one run only): {', '.join(sorted(only_one))}")
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} metric(s) regressed by more than {options['threshold']}%."
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']}%."))
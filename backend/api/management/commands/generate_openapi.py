@@ -1,36 +1,27 @@
 import json
 import os
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.test import RequestFactory
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework.permissions import AllowAny
 
-class Command(BaseCommand):
-    def handle(self, *args, **options):
-        factory = RequestFactory()
-        django_request = factory.get('/api/?format=openapi')
+from config.schema import generate_document
 
-        schema_view = get_schema_view(
-            openapi.Info(
-                title="My API",
-                default_version='v1',
-                description="Test description",
-            ),
-            public=True,
-            permission_classes=(AllowAny,),
-        )
 
-        # Call the view with the raw Django HttpRequest
-        response = schema_view.without_ui(cache_timeout=0)(django_request)
-        response.render()
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI document to settings.OPENAPI_SCHEMA_FILE (or --output). Workers serve "
+        "that file instead of generating the schema, so rerun this whenever the API changes."
+    )
 
-        openapi_schema = json.loads(response.content.decode())
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.OPENAPI_SCHEMA_FILE or "interfaces/openapi.json")
+
+    def handle(self, *args, **options):
+        openapi_schema = generate_document()
 
-        output_dir = "interfaces"
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, "openapi.json")
+        output_path = options["output"]
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
         with open(output_path, "w") as f:
             json.dump(openapi_schema, f, indent=2)
+        self.stdout.write(f"Wrote {output_path}")
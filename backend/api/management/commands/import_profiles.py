@@ -0,0 +1,63 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hashing import HashingPool
+from api.profile_import import DEFAULT_CHUNK_SIZE, FORMATS, import_profiles, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create travellers (user, profile and opening wallet deposit) from a CSV file with a "
+        "header row or an NDJSON file. Columns: username, password, full_name, age, address, "
+        "preferred_berth, auto_fill_enabled, wallet_deposit. Passwords are hashed on a process pool "
+        "and rows are written in chunks; invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for standard input.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension (.csv or .ndjson/.jsonl).")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="Password hashing processes (0 hashes in this process).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or self._format_of(path)
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        workers = options["workers"]
+        # Its own pool, not this process's shared one: nothing else here competes for hashing.
+        pool = HashingPool(workers, max_pending=max(workers, 1) * 2, wait=None)
+        try:
+            report = import_profiles(
+                read_rows(stream, fmt), pool=pool, chunk_size=options["chunk_size"], progress=self._progress,
+            )
+        finally:
+            pool.shutdown()
+            if stream is not sys.stdin:
+                stream.close()
+        for line, message in report.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f"... and {report.failed - len(report.errors)} more errors")
+        self.stdout.write(
+            f"Imported {report.created} of {report.rows} rows in {report.elapsed:.1f}s "
+            f"({report.rows_per_second:.0f} rows/s); {report.deposits} wallet deposits totalling "
+            f"{report.deposited:.2f}; {report.failed} rows failed."
+        )
+
+    def _progress(self, report):
+        self.stdout.write(
+            f"  {report.rows} rows read, {report.created} created, {report.failed} failed "
+            f"({report.rows_per_second:.0f} rows/s)"
+        )
+
+    @staticmethod
+    def _format_of(path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            return "csv"
+        if extension in (".ndjson", ".jsonl"):
+            return "ndjson"
+        raise CommandError("Cannot tell the format from the file name; pass --format csv or --format ndjson.")
@@ -0,0 +1,113 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: time to a ready WSGI application, then to the first response.
+_COLD_START = """
+import io, json, sys, time
+start = time.perf_counter()
+from config.wsgi import application
+from django.apps import apps
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter()
+statuses = []
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": "/api/health/", "QUERY_STRING": "", "SERVER_NAME": "localhost",
+    "SERVER_PORT": "80", "HTTP_HOST": "localhost", "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.url_scheme": "http",
+    "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+}
+b"".join(application(environ, lambda status, headers: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({
+    "ready_ms": (ready - start) * 1000, "first_response_ms": (done - start) * 1000,
+    "status": statuses[0], "modules": len(sys.modules),
+    "docs_loaded": "drf_yasg" in sys.modules,
+    "admin_installed": apps.is_installed("django.contrib.admin"),
+}))
+"""
+
+
+def _group(module):
+    """Bucket a module for the import-time summary: django.<pkg>, django.contrib.<app>, else top level."""
+    parts = module.split(".")
+    if parts[0] == "django" and len(parts) > 1:
+        return ".".join(parts[:3] if parts[1] == "contrib" else parts[:2])
+    return parts[0]
+
+
+# PUBLIC_INTERFACE
+def parse_importtime(stderr):
+    """Sum `python -X importtime` self times (microseconds) by package group; returns (total, Counter)."""
+    groups = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _cumulative, module = line[len("import time:"):].split("|")
+        groups[_group(module.strip())] += int(self_us)
+    return sum(groups.values()), groups
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start for each SERVER_ROLE. Spawns fresh interpreters that import "
+        "config.wsgi and serve one request, and reports the median time to a ready application and "
+        "to the first response. Also prints a `-X importtime` summary of where the import time goes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--role", choices=("full", "api", "both"), default="both")
+        parser.add_argument("--repeat", type=int, default=7, help="Cold starts per role (median reported).")
+        parser.add_argument("--top", type=int, default=15, help="Package groups listed in the import summary.")
+        parser.add_argument("--no-importtime", action="store_true", help="Skip the import-time breakdown.")
+
+    def _spawn(self, role, *flags):
+        env = {
+            **os.environ, "SERVER_ROLE": role,
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"),
+        }
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, *flags, "-c", _COLD_START], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, timeout=120,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            raise CommandError(f"Cold start for role {role!r} failed:\n{proc.stderr[-2000:]}")
+        return json.loads(proc.stdout.strip().splitlines()[-1]), elapsed, proc.stderr
+
+    def handle(self, *args, **options):
+        roles = ("full", "api") if options["role"] == "both" else (options["role"],)
+        medians = {}
+        for role in roles:
+            runs = [self._spawn(role) for _ in range(options["repeat"])]
+            sample = runs[0][0]
+            medians[role] = {
+                "process": statistics.median(elapsed for _, elapsed, _ in runs),
+                "ready": statistics.median(result["ready_ms"] for result, _, _ in runs),
+                "first": statistics.median(result["first_response_ms"] for result, _, _ in runs),
+            }
+            self.stdout.write(
+                f"role={role:<5} process={medians[role]['process']:7.1f}ms  app ready={medians[role]['ready']:7.1f}ms  "
+                f"first response={medians[role]['first']:7.1f}ms (HTTP {sample['status'].split()[0]})  "
+                f"modules={sample['modules']}  docs={'yes' if sample['docs_loaded'] else 'no'}  "
+                f"admin={'yes' if sample['admin_installed'] else 'no'}  (median of {len(runs)})"
+            )
+        if len(medians) == 2:
+            full, api = medians["full"]["first"], medians["api"]["first"]
+            self.stdout.write(f"api role reaches its first response {full - api:.1f}ms ({(full - api) / full:.0%}) sooner")
+        if options["no_importtime"]:
+            return
+        for role in roles:
+            _, _, stderr = self._spawn(role, "-X", "importtime")
+            total, groups = parse_importtime(stderr)
+            self.stdout.write(f"\nImport time by package, role={role} (total {total / 1000:.1f}ms, self time):")
+            for group, micros in groups.most_common(options["top"]):
+                self.stdout.write(f"  {micros / 1000:8.1f}ms  {micros / total:5.1%}  {group}")
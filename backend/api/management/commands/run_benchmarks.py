@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.factories import load_dataset, seed, teardown
+from benchmarks.runner import run_suite, write_results
+from benchmarks.scenarios import SCENARIOS, missing_routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed (or reuse) a benchmark dataset and measure throughput and p50/p95/p99 latency of every "
+        "route in api/urls.py through the Django test client, a real WSGI server and/or uvicorn. Writes JSON "
+        "for compare_benchmarks. Runs against the configured database: point DB_* at a scratch one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="benchmark-results.json")
+        parser.add_argument(
+            "--transport", choices=("client", "wsgi", "asgi", "both"), default="both",
+            help="both = client and wsgi; asgi needs uvicorn installed.",
+        )
+        parser.add_argument("--requests", type=int, default=200, help="Recorded requests per route.")
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--only", nargs="*", help="Route names to run (default: all).")
+        parser.add_argument("--tag", default="std", help="Dataset tag; an existing dataset with it is reused.")
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--bookings", type=int, default=1000000)
+        parser.add_argument("--payments", type=int, default=100000)
+        parser.add_argument("--teardown", action="store_true", help="Delete the dataset afterwards.")
+
+    def handle(self, *args, **options):
+        missing = missing_routes()
+        if missing:
+            raise CommandError(f"Routes without a benchmark scenario: {', '.join(missing)}")
+        scenarios = SCENARIOS
+        if options["only"]:
+            scenarios = [scenario for scenario in SCENARIOS if scenario.route in options["only"]]
+            unknown = set(options["only"]) - {scenario.route for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+        dataset = load_dataset(options["tag"])
+        if dataset is None:
+            self.stdout.write(f"Seeding dataset {options['tag']!r}...")
+            dataset = seed(
+                options["tag"], users=options["users"], bookings=options["bookings"], payments=options["payments"],
+                log=self.stdout.write,
+            )
+        else:
+            self.stdout.write(f"Reusing dataset {options['tag']!r}: {dataset.sizes}")
+
+        transports = ("client", "wsgi") if options["transport"] == "both" else (options["transport"],)
+        try:
+            document = run_suite(
+                scenarios, dataset, transports, requests=options["requests"], warmup=options["warmup"],
+                concurrency=options["concurrency"], log=self.stdout.write,
+            )
+        finally:
+            if options["teardown"]:
+                teardown(options["tag"])
+        write_results(document, options["output"])
+        self.stdout.write(f"Wrote {len(document['results'])} results to {options['output']}")
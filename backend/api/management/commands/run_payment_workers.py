@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from api import services  # noqa: F401  (registers the payment job handlers)
+from api.ids import MAX_WORKER_ID
+from api.jobs import run_pending
+
+
+def _work(name, batch, poll, once, stop):
+    try:
+        while not stop.is_set():
+            if not run_pending(name, batch):
+                if once:
+                    return
+                stop.wait(poll)
+    finally:
+        connection.close()
+
+
+def _process_main(worker_id, batch, poll, once):
+    # Each process issues PNRs, so each needs its own id-generator worker id (None: from the pid).
+    settings.ID_WORKER_ID = worker_id
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    _work(f"{socket.gethostname()}:{os.getpid()}", batch, poll, once, stop)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run payment jobs (gateway order creation, callback reconciliation) from the database "
+        "queue on a pool of worker threads or processes. Threads share this process's ID_WORKER_ID. "
+        "With --processes, process i uses id-generator worker id --worker-id-base + i; that range must "
+        "not overlap the worker id of any other process writing to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--processes", action="store_true", help="Fork worker processes instead of threads.")
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per poll.")
+        parser.add_argument("--poll", type=float, default=0.5, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once no jobs are due.")
+        parser.add_argument(
+            "--worker-id-base", type=int,
+            help="First id-generator worker id of the worker processes. Required with --processes unless DEBUG.",
+        )
+
+    def handle(self, *args, **options):
+        workers, batch, poll, once = options["workers"], options["batch"], options["poll"], options["once"]
+        worker_ids = self._worker_ids(workers, options["worker_id_base"]) if options["processes"] else None
+        mode = "processes" if options["processes"] else "threads"
+        self.stdout.write(f"Running {workers} payment worker {mode}" + (" until the queue is drained" if once else ""))
+        if options["processes"]:
+            self._run_processes(worker_ids, batch, poll, once)
+        else:
+            self._run_threads(workers, batch, poll, once)
+        self.stdout.write("Payment workers stopped.")
+
+    @staticmethod
+    def _worker_ids(workers, base):
+        if base is None:
+            if not settings.DEBUG:
+                raise CommandError(
+                    "--processes needs --worker-id-base: each process issues PNRs under its own worker id."
+                )
+            return [None] * workers  # development: each process falls back to its pid
+        if base < 0 or base + workers - 1 > MAX_WORKER_ID:
+            raise CommandError(
+                f"Worker ids {base}..{base + workers - 1} do not fit in 0..{MAX_WORKER_ID}."
+            )
+        return [base + i for i in range(workers)]
+
+    @staticmethod
+    def _run_threads(workers, batch, poll, once):
+        stop = threading.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_work, f"{prefix}:{i}", batch, poll, once, stop) for i in range(workers)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                stop.set()
+
+    @staticmethod
+    def _run_processes(worker_ids, batch, poll, once):
+        connections.close_all()  # Never share a database connection across fork.
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=_process_main, args=(worker_id, batch, poll, once)) for worker_id in worker_ids
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.scheduler import TatkalScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Confirm auto_confirm booking drafts at the instant their Tatkal window opens, in fair "
+        "order (every user's first draft before anyone's second) and within the per-user cap. "
+        "Prints a report per window, including bookings committed per second after open."
+    )
+
+    def add_arguments(self, parser):
+        config = settings.TATKAL_SCHEDULER
+        parser.add_argument("--workers", type=int, default=config["WORKERS"], help="Threads confirming drafts.")
+        parser.add_argument("--max-per-user", type=int, default=config["MAX_PER_USER"])
+        parser.add_argument("--horizon", type=float, default=86400.0, help="Seconds ahead to look for windows.")
+        parser.add_argument("--poll", type=float, default=5.0,
+                            help="Seconds between reloads of the pending drafts.")
+        parser.add_argument("--once", action="store_true",
+                            help="Fire the next window within the horizon, then exit.")
+
+    def handle(self, *args, **options):
+        scheduler = TatkalScheduler(workers=options["workers"], max_per_user=options["max_per_user"])
+        count = scheduler.load(options["horizon"])
+        opens_at = scheduler.next_window()
+        self.stdout.write(
+            f"{count} drafts pending; next window opens {opens_at.isoformat() if opens_at else 'outside the horizon'}"
+        )
+        try:
+            scheduler.run(
+                options["horizon"], options["poll"], once=options["once"],
+                on_report=lambda report: self.stdout.write(report.summary()),
+            )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write("Tatkal scheduler stopped.")
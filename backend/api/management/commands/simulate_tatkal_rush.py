@@ -0,0 +1,130 @@
+import datetime
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from api.admission import TICKET_HEADER
+from api.bench import percentile
+from api.inventory import create_train_run
+from api.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate the 10:00 Tatkal window: virtual users all arrive within a short spike and keep "
+        "trying POST /api/create_booking/ (following waiting-room tickets and Retry-After) until "
+        "booked, sold out or out of patience. Reports goodput against offered load, with admission "
+        "control on, off, or both (--compare)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=300)
+        parser.add_argument("--spike", type=float, default=1.0, help="Seconds over which users arrive.")
+        parser.add_argument("--patience", type=float, default=20.0, help="Seconds a user keeps trying.")
+        parser.add_argument("--coaches", type=int, default=5)
+        parser.add_argument("--global-rate", type=float, help="Override TATKAL_ADMISSION GLOBAL_RATE.")
+        parser.add_argument("--global-burst", type=int, help="Override TATKAL_ADMISSION GLOBAL_BURST.")
+        parser.add_argument("--no-admission", action="store_true", help="Run with admission control off.")
+        parser.add_argument("--compare", action="store_true", help="Run without, then with, admission control.")
+
+    def handle(self, *args, **options):
+        conf = dict(settings.TATKAL_ADMISSION)
+        if options["global_rate"] is not None:
+            conf["GLOBAL_RATE"] = options["global_rate"]
+        if options["global_burst"] is not None:
+            conf["GLOBAL_BURST"] = options["global_burst"]
+        modes = [False, True] if options["compare"] else [not options["no_admission"]]
+        # Shed and queued responses are the point of the exercise; keep them out of the error log.
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for enabled in modes:
+                with override_settings(TATKAL_ADMISSION={**conf, "ENABLED": enabled}):
+                    self._run(options, enabled, conf)
+        finally:
+            request_logger.setLevel(level)
+
+    def _run(self, options, admission, conf):
+        stamp = time.time_ns()
+        journey_date = datetime.date.today() + datetime.timedelta(days=1)
+        run = create_train_run(f"R{stamp % 10 ** 8}", f"RUSH_{stamp}", "RUSH_DST", journey_date,
+                               coaches=options["coaches"])
+        users = User.objects.bulk_create(
+            User(username=f"rush_{stamp}_{i}") for i in range(options["users"])
+        )
+        profiles = UserProfile.objects.bulk_create(
+            UserProfile(user=user, full_name="Rush", age=30, address="Rush") for user in users
+        )
+        statuses = Counter()
+        lock = threading.Lock()
+        spike, patience = options["spike"], options["patience"]
+        start = time.perf_counter()
+
+        def traveller(index):
+            # Admission keys its per-user buckets on the client address: one address per traveller.
+            address = f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+            client = Client(raise_request_exception=False, REMOTE_ADDR=address)
+            time.sleep(spike * index / len(profiles))
+            arrived = time.perf_counter()
+            body = {
+                "user_profile_id": profiles[index].pk, "source": run.source, "destination": run.destination,
+                "journey_date": str(journey_date), "passenger_name": f"P{index}", "passenger_age": 30,
+                "passenger_sex": "M", "fare": "0.00",
+            }
+            headers = {}
+            try:
+                while time.perf_counter() - arrived < patience:
+                    response = client.post("/api/create_booking/", body, content_type="application/json",
+                                           headers=headers)
+                    with lock:
+                        statuses[response.status_code] += 1
+                    if response.status_code in (201, 409):
+                        return response.status_code, time.perf_counter() - arrived
+                    if response.status_code == 503 and response.has_header(TICKET_HEADER):
+                        # Come back when the ETA says our turn is near (Retry-After is whole seconds).
+                        headers = {TICKET_HEADER: response[TICKET_HEADER]}
+                        time.sleep(min(max(response.json()["eta_seconds"] / 2, 0.05), 1.0))
+                    else:
+                        headers = {}
+                        time.sleep(min(float(response.get("Retry-After", 0.05)), 1.0))
+                return None, time.perf_counter() - arrived
+            finally:
+                connection.close()
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(profiles)) as pool:
+                outcomes = list(pool.map(traveller, range(len(profiles))))
+            elapsed = time.perf_counter() - start
+        finally:
+            run.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        booked = [seconds for code, seconds in outcomes if code == 201]
+        sold_out = sum(1 for code, _ in outcomes if code == 409)
+        requests = sum(statuses.values())
+        label = "on" if admission else "off"
+        if admission:
+            label += f" (global {conf['GLOBAL_RATE']}/s, burst {conf['GLOBAL_BURST']})"
+        self.stdout.write(f"Admission control {label}")
+        self.stdout.write(
+            f"  offered: {len(profiles)} users in {spike:.1f}s ({len(profiles) / spike:.0f} arrivals/s), "
+            f"{requests} requests ({requests / elapsed:.0f} req/s)"
+        )
+        self.stdout.write(
+            f"  goodput: {len(booked)} booked in {elapsed:.2f}s ({len(booked) / elapsed:.1f} bookings/s), "
+            f"{sold_out} sold out, {len(profiles) - len(booked) - sold_out} gave up"
+        )
+        self.stdout.write("  responses: " + " ".join(f"{code}={count}" for code, count in sorted(statuses.items())))
+        self.stdout.write(
+            f"  time to booking: p50={percentile(booked, 50):.2f}s p95={percentile(booked, 95):.2f}s "
+            f"p99={percentile(booked, 99):.2f}s"
+        )
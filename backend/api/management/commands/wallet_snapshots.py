@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+
+from api.models import UserProfile, WalletLedgerEntry
+from api.wallet import compact_wallet, rebuild_snapshots, verify_snapshots
+
+
+class Command(BaseCommand):
+    help = "Compact, rebuild or verify materialized wallet balance snapshots from the wallet ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute every snapshot from full ledger history.")
+        parser.add_argument("--verify", action="store_true", help="Check snapshots against the ledger; fail on drift.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if options["rebuild"]:
+            rebuilt = 0
+            for chunk in self._chunks(UserProfile.objects.all(), chunk_size):
+                rebuilt += rebuild_snapshots(chunk)
+            self.stdout.write(f"Rebuilt {rebuilt} wallet snapshots.")
+        elif not options["verify"]:
+            pending = UserProfile.objects.filter(
+                Exists(WalletLedgerEntry.objects.filter(profile=OuterRef("pk"), id__gt=OuterRef("wallet_snapshot_through")))
+            )
+            compacted = sum(1 for pk in pending.values_list("pk", flat=True).iterator() if compact_wallet(pk))
+            self.stdout.write(f"Compacted {compacted} wallet snapshots.")
+
+        if options["verify"]:
+            mismatches = []
+            for chunk in self._chunks(UserProfile.objects.all(), chunk_size):
+                mismatches.extend(verify_snapshots(chunk))
+            for pk, derived, ledger in mismatches:
+                self.stderr.write(f"Profile {pk}: snapshot balance {derived} != ledger balance {ledger}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} wallet snapshots do not match the ledger.")
+            self.stdout.write("All wallet snapshots match the ledger.")
+
+    @staticmethod
+    def _chunks(queryset, size):
+        chunk = []
+        for pk in queryset.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=size):
+            chunk.append(pk)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,350 @@
+"""
+Request-level performance metrics.
+
+MetricsMiddleware times every request and records the following per view:
+- latency;
+- SQL query count and time, via an execute wrapper on every connection;
+- time spent producing serializer `.data`;
+- response size.
+
+Samples go into in-process log-linear ("HDR-style") histograms. Recording
+one costs a dict update under a lock, so the middleware is cheap enough to
+leave on. GET /api/metrics/ renders them in the Prometheus text format:
+histograms as summaries (quantiles plus _sum and _count) and request counts
+as counters. The same page also carries values from registered collectors,
+such as the availability cache and admission control counters.
+
+Metrics are per process; scrape every worker.
+"""
+import contextvars
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.serializers import BaseSerializer
+
+PREFIX = "quickbook"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = (0.5, 0.9, 0.99)
+SUB_BUCKETS = 16  # per power of two: quantiles are within ~6% of the true value
+
+_current = contextvars.ContextVar("quickbook_request_stats", default=None)
+
+
+# PUBLIC_INTERFACE
+class Histogram:
+    """
+    Log-linear histogram of non-negative values: SUB_BUCKETS equal-width buckets per power
+    of two, stored sparsely, so memory is bounded by the value range, not the sample count.
+    """
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _index(value):
+        if value <= 0:
+            return None
+        mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+    @staticmethod
+    def _upper_bound(index):
+        if index is None:
+            return 0.0
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent)
+
+    def record(self, value):
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (never above the largest sample)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.counts, key=lambda i: -1 if i is None else i):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+
+# PUBLIC_INTERFACE
+class MetricsRegistry:
+    """Thread-safe store of labelled histograms and counters, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> int
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, labels, value):
+        """Record `value` in histogram `name`; `labels` is a tuple of (key, value) pairs."""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.record(value)
+
+    def increment(self, name, labels, amount=1):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def register_collector(self, collector):
+        """
+        Add a callable returning [(name, type, help, [(labels, value), ...]), ...], evaluated on
+        every scrape; for gauges and counters kept elsewhere.
+        """
+        self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def histogram(self, name, labels):
+        """A copy of one histogram's state, or None (for tests and debugging)."""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                return None
+            copy = Histogram()
+            copy.counts, copy.count, copy.sum, copy.max = (
+                dict(histogram.counts), histogram.count, histogram.sum, histogram.max
+            )
+            return copy
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            histograms = [
+                (name, labels, [(q, h.quantile(q)) for q in QUANTILES], h.sum, h.count)
+                for (name, labels), h in self._histograms.items()
+            ]
+            counters = list(self._counters.items())
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for name, labels, quantiles, total, count in sorted(histograms, key=lambda row: (row[0], row[1])):
+            header(name, "summary")
+            for q, value in quantiles:
+                lines.append(f"{name}{_labels(labels + (('quantile', str(q)),))} {_number(value)}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                self._help.setdefault(name, help_text)
+                header(name, kind)
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = f"{PREFIX}_request_duration_seconds"
+SQL_QUERIES = f"{PREFIX}_request_sql_queries"
+SQL_SECONDS = f"{PREFIX}_request_sql_duration_seconds"
+SERIALIZER_SECONDS = f"{PREFIX}_request_serializer_duration_seconds"
+RESPONSE_BYTES = f"{PREFIX}_response_size_bytes"
+REQUESTS_TOTAL = f"{PREFIX}_requests_total"
+
+REGISTRY.describe(REQUEST_SECONDS, "Wall time per request, by view.")
+REGISTRY.describe(SQL_QUERIES, "SQL statements executed per request, by view.")
+REGISTRY.describe(SQL_SECONDS, "Time spent in SQL per request, by view.")
+REGISTRY.describe(SERIALIZER_SECONDS, "Time spent producing serializer data per request, by view.")
+REGISTRY.describe(RESPONSE_BYTES, "Response body size, by view (streaming responses excluded).")
+REGISTRY.describe(REQUESTS_TOTAL, "Requests served, by view, method and status code.")
+
+
+class _RequestStats:
+    __slots__ = ("queries", "sql_seconds", "serializer_seconds", "serializing")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+def _time_sql(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - start
+        stats.queries += 1
+
+
+def _time_connection(db):
+    # Connections are per thread, and the async ORM queries on a worker thread, so the wrapper
+    # stays installed on each connection rather than around the request; it is a no-op outside one.
+    if _time_sql not in db.execute_wrappers:
+        db.execute_wrappers.append(_time_sql)
+
+
+@receiver(connection_created)
+def _time_new_connection(sender, connection, **kwargs):
+    _time_connection(connection)
+
+
+_serializers_instrumented = False
+
+
+def _instrument_serializers():
+    """Wrap BaseSerializer.data so the outermost `.data` call of a request is timed."""
+    global _serializers_instrumented
+    if _serializers_instrumented:
+        return
+    _serializers_instrumented = True
+    original = BaseSerializer.data
+
+    def data(self):
+        stats = _current.get()
+        if stats is None or stats.serializing:
+            return original.fget(self)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - start
+            stats.serializing = False
+
+    BaseSerializer.data = property(data, doc=original.__doc__)
+
+
+# PUBLIC_INTERFACE
+class MetricsMiddleware:
+    """
+    Record latency, SQL, serializer time and response size for every request into REGISTRY.
+
+    Sync and async capable: under ASGI it must not be the one sync-only entry in MIDDLEWARE,
+    or Django would run every request on a worker thread and re-enter the async views with
+    async_to_sync, an extra thread per open long poll or event stream.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_serializers()
+        _time_connection(connection)  # opened before this module was imported
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = _RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            _time_connection(connection)
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        # The async ORM queries on a worker thread; sync_to_async copies this context, and so
+        # `_current`, into it, where _time_sql finds the stats.
+        stats = _RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _record(request, response, stats, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else "") or "unmatched"
+        labels = (("view", view),)
+        REGISTRY.observe(REQUEST_SECONDS, labels, elapsed)
+        REGISTRY.observe(SQL_QUERIES, labels, stats.queries)
+        REGISTRY.observe(SQL_SECONDS, labels, stats.sql_seconds)
+        REGISTRY.observe(SERIALIZER_SECONDS, labels, stats.serializer_seconds)
+        if not response.streaming:
+            REGISTRY.observe(RESPONSE_BYTES, labels, len(response.content))
+        REGISTRY.increment(REQUESTS_TOTAL, labels + (("method", request.method), ("status", response.status_code)))
+
+
+def _cache_and_admission_metrics():
+    from .admission import get_controller
+    from .inventory import AVAILABILITY_CACHE
+    from .profile_cache import PROFILE_CACHE
+
+    cache = AVAILABILITY_CACHE.stats()
+    profiles = PROFILE_CACHE.stats()
+    admission = get_controller().stats()
+    return [
+        (f"{PREFIX}_availability_cache_lookups_total", "counter", "Availability cache lookups by outcome.",
+         [((("result", key),), cache[key]) for key in ("local_hits", "shared_hits", "misses")]),
+        (f"{PREFIX}_availability_cache_evictions_total", "counter", "Local availability cache LRU evictions.",
+         [((), cache["evictions"])]),
+        (f"{PREFIX}_profile_cache_lookups_total", "counter", "Profile cache lookups by outcome.",
+         [((("result", key),), profiles[key]) for key in ("local_hits", "shared_hits", "misses")]),
+        (f"{PREFIX}_profile_cache_invalidations_total", "counter", "Profile cache keys invalidated by writes.",
+         [((), profiles["invalidations"])]),
+        (f"{PREFIX}_admission_decisions_total", "counter", "Booking admission decisions by outcome.",
+         [((("outcome", key),), admission[key]) for key in ("admitted", "queued", "rejected")]),
+        (f"{PREFIX}_admission_waiting", "gauge", "Requests holding a waiting-room ticket.",
+         [((), admission["waiting"])]),
+    ]
+
+
+REGISTRY.register_collector(_cache_and_admission_metrics)
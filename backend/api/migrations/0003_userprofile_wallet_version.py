@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_remove_userprofile_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='wallet_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-17 03:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    """Seed each existing wallet with an opening entry already folded into its snapshot."""
+    UserProfile = apps.get_model('api', 'UserProfile')
+    WalletLedgerEntry = apps.get_model('api', 'WalletLedgerEntry')
+    for profile in UserProfile.objects.filter(wallet_balance__gt=0).iterator():
+        entry = WalletLedgerEntry.objects.create(profile=profile, kind='opening', amount=profile.wallet_balance)
+        UserProfile.objects.filter(pk=profile.pk).update(wallet_snapshot_through=entry.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_userprofile_wallet_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='wallet_snapshot_through',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='WalletLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opening', 'Opening Balance'), ('deposit', 'Deposit'), ('debit', 'Debit'), ('refund', 'Refund')], max_length=16)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wallet_entries', to='api.booking')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_entries', to='api.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'id'], name='wallet_entry_profile_id_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
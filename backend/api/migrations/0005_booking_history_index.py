@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user_profile', '-booking_time', '-id'], name='booking_history_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2 on 2026-10-17 03:12
+
+from django.db import migrations, models
+
+
+def _duplicates(model, field):
+    """Rows whose `field` repeats an earlier row's value, in id order; the earliest row of each value is kept."""
+    repeated = (
+        model.objects.exclude(**{field: None}).values(field)
+        .annotate(rows=models.Count('id')).filter(rows__gt=1).values_list(field, flat=True)
+    )
+    seen = set()
+    for pk, value in model.objects.filter(**{f'{field}__in': list(repeated)}).order_by('id').values_list('id', field):
+        if value in seen:
+            yield pk
+        seen.add(value)
+
+
+def _reissued_pnr(pk, taken):
+    """
+    A PNR for booking `pk` made here, not by api.ids, so this migration does not change with
+    application code or need its settings. "R" plus the zero-padded id fills the 20-character
+    column and never matches the all-digit PNRs api.ids issues.
+    """
+    pnr, n = f'R{pk:019d}', pk
+    while pnr in taken:  # only if an old PNR happens to have this form
+        n += 1
+        pnr = f'R{n:019d}'
+    taken.add(pnr)
+    return pnr
+
+
+def dedupe_ids(apps, schema_editor):
+    """
+    Clear the way for the new unique constraints. Empty strings become NULL, which do not
+    collide. A PNR repeated on later bookings is reissued for them; a repeated gateway
+    order or payment id cannot be reissued here, so later copies are set to NULL.
+    """
+    Booking = apps.get_model('api', 'Booking')
+    PaymentTransaction = apps.get_model('api', 'PaymentTransaction')
+    Booking.objects.filter(pnr='').update(pnr=None)
+    PaymentTransaction.objects.filter(order_id='').update(order_id=None)
+    PaymentTransaction.objects.filter(payment_id='').update(payment_id=None)
+    duplicates = list(_duplicates(Booking, 'pnr'))
+    if duplicates:
+        taken = set(Booking.objects.filter(pnr__startswith='R').values_list('pnr', flat=True))
+        for pk in duplicates:
+            Booking.objects.filter(pk=pk).update(pnr=_reissued_pnr(pk, taken))
+    for field in ('order_id', 'payment_id'):
+        PaymentTransaction.objects.filter(pk__in=list(_duplicates(PaymentTransaction, field))).update(**{field: None})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_booking_history_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='pnr',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='paymenttransaction',
+            name='order_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='paymenttransaction',
+            name='payment_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_status', 'journey_date'], name='booking_status_date_idx'),
+        ),
+    ]
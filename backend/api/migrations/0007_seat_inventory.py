@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-17 03:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('train_number', models.CharField(max_length=10)),
+                ('source', models.CharField(max_length=60)),
+                ('destination', models.CharField(max_length=60)),
+                ('journey_date', models.DateField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'destination', 'journey_date'], name='train_run_segment_idx')],
+                'constraints': [models.UniqueConstraint(fields=('train_number', 'journey_date'), name='unique_train_run_per_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Coach',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=8)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coaches', to='api.trainrun')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Seat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('berth_type', models.CharField(choices=[('lower', 'Lower'), ('middle', 'Middle'), ('upper', 'Upper'), ('side_lower', 'Side Lower'), ('side_upper', 'Side Upper')], max_length=16)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='seat', to='api.booking')),
+                ('coach', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seats', to='api.coach')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seats', to='api.trainrun')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('booking__isnull', True)), fields=['run', 'berth_type', 'coach', 'number'], name='seat_free_berth_idx')],
+                'constraints': [models.UniqueConstraint(fields=('coach', 'number'), name='unique_seat_per_coach')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='coach',
+            constraint=models.UniqueConstraint(fields=('run', 'code'), name='unique_coach_per_run'),
+        ),
+    ]
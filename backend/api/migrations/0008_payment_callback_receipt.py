@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 03:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallbackReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=160, unique=True)),
+                ('response', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='callback_receipts', to='api.paymenttransaction')),
+            ],
+        ),
+    ]
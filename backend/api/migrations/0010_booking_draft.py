@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_payment_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=60)),
+                ('destination', models.CharField(max_length=60)),
+                ('journey_date', models.DateField()),
+                ('passengers', models.JSONField()),
+                ('fare_ceiling', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('status', models.CharField(choices=[('staged', 'Staged'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='staged', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_drafts', to='api.userprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='draft',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='api.bookingdraft'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingdraft',
+            index=models.Index(fields=['user_profile', 'status'], name='booking_draft_profile_idx'),
+        ),
+    ]
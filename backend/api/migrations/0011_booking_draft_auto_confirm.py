@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_booking_draft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingdraft',
+            name='auto_confirm',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='bookingdraft',
+            index=models.Index(condition=models.Q(('auto_confirm', True)), fields=['journey_date', 'user_profile'], name='booking_draft_scheduled_idx'),
+        ),
+    ]
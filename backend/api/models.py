@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 from decimal import Decimal
 
+from .events import notify_booking_changed
+
 # PUBLIC_INTERFACE
 class UserProfile(models.Model):
     """
@@ -21,7 +24,12 @@ class UserProfile(models.Model):
         ("side_upper", "Side Upper"),
         ("any", "Any"),
     ), default="any")
+    # Materialized wallet snapshot: every debit plus all credits up to `wallet_snapshot_through`.
+    # Credits appended to the ledger after that entry are added on read (see available_wallet_balance).
     wallet_balance = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    wallet_snapshot_through = models.BigIntegerField(default=0)
+    # Bumped on every wallet change; used by the optimistic debit path in api.wallet.
+    wallet_version = models.PositiveIntegerField(default=0)
     auto_fill_enabled = models.BooleanField(default=True)
 
     def __str__(self):
@@ -29,24 +37,42 @@ class UserProfile(models.Model):
 
     # PUBLIC_INTERFACE
     def deposit_wallet(self, amount):
-        """Add funds to wallet balance."""
-        self.wallet_balance += Decimal(amount)
-        self.save()
+        """Add funds to wallet balance (appends a deposit entry to the wallet ledger)."""
+        from .wallet import credit_wallet
+        credit_wallet(self.pk, amount)
+        self.refresh_wallet()
 
     # PUBLIC_INTERFACE
     def deduct_wallet(self, amount) -> bool:
         """Deduct funds from wallet if sufficient balance exists; returns True if successful, False otherwise."""
-        amt = Decimal(amount)
-        if self.wallet_balance >= amt:
-            self.wallet_balance -= amt
-            self.save()
-            return True
-        return False
+        from .wallet import debit_wallet
+        debited = debit_wallet(self.pk, amount)
+        self.refresh_wallet()
+        return debited
+
+    # PUBLIC_INTERFACE
+    def refresh_wallet(self):
+        """Reload only the wallet columns from the database."""
+        self.refresh_from_db(fields=["wallet_balance", "wallet_snapshot_through", "wallet_version"])
+        self.__dict__.pop("pending_wallet_credit", None)
+
+    # PUBLIC_INTERFACE
+    @property
+    def available_wallet_balance(self) -> Decimal:
+        """
+        Snapshot balance plus ledger credits appended since the last compaction.
+        The credit delta is cached on the instance until refresh_wallet().
+        """
+        pending = getattr(self, "pending_wallet_credit", None)
+        if pending is None:
+            from .wallet import pending_wallet_credit
+            pending = self.pending_wallet_credit = pending_wallet_credit(self.pk, self.wallet_snapshot_through)
+        return self.wallet_balance + pending
 
     # PUBLIC_INTERFACE
     def can_afford(self, amount) -> bool:
         """Checks if wallet has at least `amount`."""
-        return self.wallet_balance >= Decimal(amount)
+        return self.available_wallet_balance >= Decimal(amount)
 
 # PUBLIC_INTERFACE
 class Booking(models.Model):
@@ -93,9 +119,21 @@ class Booking(models.Model):
         default="initiated"
     )
 
-    pnr = models.CharField(max_length=20, blank=True, null=True)
+    pnr = models.CharField(max_length=20, blank=True, null=True, unique=True)
     booking_time = models.DateTimeField(auto_now_add=True)
     feedback = models.TextField(blank=True, null=True)
+    # The staged draft this booking was confirmed from, if any (see api/drafts.py).
+    draft = models.ForeignKey(
+        'BookingDraft', on_delete=models.SET_NULL, related_name='bookings', blank=True, null=True
+    )
+
+    class Meta:
+        indexes = [
+            # Backs keyset pagination of a user's booking history (newest first).
+            models.Index(fields=['user_profile', '-booking_time', '-id'], name='booking_history_idx'),
+            # Cancellation and expiry sweeps select by status within a journey date range.
+            models.Index(fields=['booking_status', 'journey_date'], name='booking_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"Booking #{self.pk}: {self.source}->{self.destination}, {self.passenger_name}"
@@ -106,14 +144,112 @@ class Booking(models.Model):
         Attempt to pay fare from user wallet. Deducts fare, marks as paid if successful.
         Returns True if payment successful, else False.
         """
-        if not self.paid and self.user_profile and self.fare and self.user_profile.can_afford(self.fare):
-            if self.user_profile.deduct_wallet(self.fare):
-                self.paid = True
-                self.paid_via_wallet = True
-                self.booking_status = "booked"
-                self.save()
-                return True
-        return False
+        if self.paid or not self.user_profile_id or not self.fare:
+            return False
+        from .wallet import debit_wallet
+        with transaction.atomic():
+            if not debit_wallet(self.user_profile_id, self.fare, booking=self):
+                return False
+            self.paid = True
+            self.paid_via_wallet = True
+            self.booking_status = "booked"
+            self.save(update_fields=["paid", "paid_via_wallet", "booking_status"])
+            notify_booking_changed(self.pk)
+        if self._meta.get_field("user_profile").is_cached(self):
+            self.user_profile.refresh_wallet()
+        return True
+
+    # PUBLIC_INTERFACE
+    def refund_to_wallet(self) -> bool:
+        """
+        Credit the fare back to the user wallet for a booking paid via wallet.
+        Returns True if a refund entry was appended, else False.
+        """
+        if not (self.paid and self.paid_via_wallet and self.fare):
+            return False
+        from .wallet import credit_wallet
+        credit_wallet(self.user_profile_id, self.fare, kind=WalletLedgerEntry.KIND_REFUND, booking=self)
+        return True
+
+# PUBLIC_INTERFACE
+class BookingDraft(models.Model):
+    """
+    A booking staged and validated ahead of a Tatkal window and confirmed later with one call.
+    `passengers` holds the validated passenger fields of each Booking to create; `fare_ceiling`
+    is the most the user will pay per passenger. With `auto_confirm`, run_tatkal_scheduler
+    confirms it when the journey date's Tatkal window opens (see api/scheduler.py).
+    """
+    STATUS_STAGED = 'staged'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_CANCELLED = 'cancelled'
+
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='booking_drafts')
+    source = models.CharField(max_length=60)
+    destination = models.CharField(max_length=60)
+    journey_date = models.DateField()
+    passengers = models.JSONField()
+    fare_ceiling = models.DecimalField(max_digits=8, decimal_places=2)
+    auto_confirm = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=16,
+        choices=(
+            (STATUS_STAGED, "Staged"),
+            (STATUS_CONFIRMED, "Confirmed"),
+            (STATUS_CANCELLED, "Cancelled"),
+        ),
+        default=STATUS_STAGED,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    confirmed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # A user's staged drafts, listed before the window opens.
+            models.Index(fields=['user_profile', 'status'], name='booking_draft_profile_idx'),
+            # The scheduler's scan for a window: drafts it will confirm, by journey date.
+            models.Index(
+                fields=['journey_date', 'user_profile'],
+                condition=models.Q(auto_confirm=True),
+                name='booking_draft_scheduled_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Draft #{self.pk}: {self.source}->{self.destination} on {self.journey_date} ({self.status})"
+
+# PUBLIC_INTERFACE
+class WalletLedgerEntry(models.Model):
+    """
+    Append-only record of every wallet movement. Credits (deposits, refunds) are positive,
+    debits negative. Rows are never updated; balances are derived from the profile snapshot
+    plus the credits appended after it.
+    """
+    KIND_OPENING = "opening"
+    KIND_DEPOSIT = "deposit"
+    KIND_DEBIT = "debit"
+    KIND_REFUND = "refund"
+
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='wallet_entries')
+    kind = models.CharField(max_length=16, choices=(
+        (KIND_OPENING, "Opening Balance"),
+        (KIND_DEPOSIT, "Deposit"),
+        (KIND_DEBIT, "Debit"),
+        (KIND_REFUND, "Refund"),
+    ))
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    booking = models.ForeignKey(
+        Booking, on_delete=models.SET_NULL, related_name='wallet_entries', blank=True, null=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keeps the "credits since snapshot" delta sum an index range scan.
+            models.Index(fields=['profile', 'id'], name='wallet_entry_profile_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} for profile {self.profile_id}"
 
 # (Legacy) Keep PaymentTransaction for backward compatibility; can be migrated out in next major revision
 class PaymentTransaction(models.Model):
@@ -121,8 +257,9 @@ class PaymentTransaction(models.Model):
     # Link to Booking for payment records; NOT required for quick-wallet-pay logic,
     # but kept for gateway/callback integration.
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='payment', blank=True, null=True)
-    order_id = models.CharField(max_length=64, blank=True, null=True)
-    payment_id = models.CharField(max_length=64, blank=True, null=True)
+    # Gateway callbacks look transactions up by these ids; unique so lookups are single-row index probes.
+    order_id = models.CharField(max_length=64, blank=True, null=True, unique=True)
+    payment_id = models.CharField(max_length=64, blank=True, null=True, unique=True)
     status = models.CharField(
         max_length=16,
         choices=(
@@ -139,3 +276,136 @@ class PaymentTransaction(models.Model):
 
     def __str__(self):
         return f"Payment for Booking {self.booking.pk if self.booking else 'N/A'}: {self.status}"
+
+# PUBLIC_INTERFACE
+class TrainRun(models.Model):
+    """One train on one journey date: the unit that seat inventory is sold against."""
+    train_number = models.CharField(max_length=10)
+    source = models.CharField(max_length=60)
+    destination = models.CharField(max_length=60)
+    journey_date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['train_number', 'journey_date'], name='unique_train_run_per_date'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['source', 'destination', 'journey_date'], name='train_run_segment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.train_number} {self.source}->{self.destination} on {self.journey_date}"
+
+# PUBLIC_INTERFACE
+class Coach(models.Model):
+    """A coach (e.g. S1) of a train run."""
+    run = models.ForeignKey(TrainRun, on_delete=models.CASCADE, related_name='coaches')
+    code = models.CharField(max_length=8)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'code'], name='unique_coach_per_run'),
+        ]
+
+    def __str__(self):
+        return f"{self.code} of {self.run}"
+
+# PUBLIC_INTERFACE
+class Seat(models.Model):
+    """
+    A single berth of a coach. `booking` is set while the berth is sold and cleared on cancellation.
+    `run` is denormalized from the coach so free berths of a run are found with one index seek.
+    """
+    run = models.ForeignKey(TrainRun, on_delete=models.CASCADE, related_name='seats')
+    coach = models.ForeignKey(Coach, on_delete=models.CASCADE, related_name='seats')
+    number = models.PositiveSmallIntegerField()
+    berth_type = models.CharField(max_length=16, choices=(
+        ("lower", "Lower"),
+        ("middle", "Middle"),
+        ("upper", "Upper"),
+        ("side_lower", "Side Lower"),
+        ("side_upper", "Side Upper"),
+    ))
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, related_name='seat', blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['coach', 'number'], name='unique_seat_per_coach'),
+        ]
+        indexes = [
+            # Partial index over unsold berths only: the allocator's "next free berth of this type"
+            # probe is a seek to the first entry, and it shrinks as the run sells out.
+            models.Index(
+                fields=['run', 'berth_type', 'coach', 'number'],
+                condition=models.Q(booking__isnull=True),
+                name='seat_free_berth_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.coach.code}/{self.number} ({self.berth_type})"
+
+# PUBLIC_INTERFACE
+class PaymentCallbackReceipt(models.Model):
+    """
+    Stored outcome of a processed gateway callback, keyed by idempotency key.
+    A redelivered callback finds its receipt with one unique-index read and gets the same
+    response back without touching the payment or booking again.
+    """
+    idempotency_key = models.CharField(max_length=160, unique=True)
+    payment = models.ForeignKey(PaymentTransaction, on_delete=models.CASCADE, related_name='callback_receipts')
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Callback receipt {self.idempotency_key}"
+
+# PUBLIC_INTERFACE
+class PaymentJob(models.Model):
+    """
+    A unit of gateway work (order creation, callback reconciliation) queued off the request
+    path and executed by `manage.py run_payment_workers`. See api/jobs.py.
+    """
+    KIND_CREATE_ORDER = 'create_order'
+    KIND_RECONCILE_CALLBACK = 'reconcile_callback'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    kind = models.CharField(max_length=32)
+    payment_transaction = models.ForeignKey(PaymentTransaction, on_delete=models.CASCADE, related_name='jobs')
+    payload = models.JSONField(default=dict, blank=True)
+    # Collapses redelivered requests (e.g. the same gateway callback) into one job.
+    dedupe_key = models.CharField(max_length=160, unique=True, blank=True, null=True)
+    status = models.CharField(
+        max_length=16,
+        choices=(
+            (STATUS_QUEUED, "Queued"),
+            (STATUS_RUNNING, "Running"),
+            (STATUS_DONE, "Done"),
+            (STATUS_FAILED, "Failed"),
+        ),
+        default=STATUS_QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for due jobs: status = queued AND run_after <= now, oldest first.
+            models.Index(fields=['status', 'run_after'], name='payment_job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job for payment {self.payment_transaction_id}: {self.status}"
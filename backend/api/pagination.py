@@ -0,0 +1,146 @@
+"""
+Keyset (cursor) pagination and NDJSON streaming for unbounded list endpoints.
+
+Pages are selected with a WHERE on the last row's ordering key instead of an
+OFFSET, so every page costs one index range scan no matter how deep the client
+has paged. The next-page cursor is returned in a `Link` header, leaving the
+response body the same plain list the endpoints have always returned.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 500
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+# PUBLIC_INTERFACE
+class InvalidCursor(ValueError):
+    """Raised when a client sends a malformed cursor or page size."""
+
+
+# PUBLIC_INTERFACE
+class KeysetPaginator:
+    """
+    Paginates a queryset on a descending-or-ascending compound key, e.g. ('-booking_time', '-id').
+    The last key field must be unique so the ordering is total.
+    """
+
+    def __init__(self, ordering, page_size=DEFAULT_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE):
+        self.ordering = ordering
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    # PUBLIC_INTERFACE
+    def paginate(self, queryset, request):
+        """Return (rows, next_cursor) for the page the request asks for."""
+        limit = self._limit(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            queryset = queryset.filter(self._after(self._decode(cursor, queryset.model)))
+        rows = list(queryset[:limit + 1])
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self._encode(rows[-1])
+
+    # PUBLIC_INTERFACE
+    def link_header(self, request, next_cursor):
+        """RFC 8288 Link header value pointing at the next page."""
+        params = request.query_params.copy()
+        params["cursor"] = next_cursor
+        url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+        return f'<{url}>; rel="next"'
+
+    def _limit(self, request):
+        raw = request.query_params.get("limit")
+        if raw is None:
+            return self.page_size
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise InvalidCursor("limit must be an integer.")
+        if limit <= 0:
+            raise InvalidCursor("limit must be positive.")
+        return min(limit, self.max_page_size)
+
+    def _fields(self):
+        return [(field.lstrip("-"), field.startswith("-")) for field in self.ordering]
+
+    def _after(self, values):
+        # (a, b) after (x, y) in the ordering == a < x OR (a = x AND b < y), for each key prefix.
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = "lt" if descending else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _encode(self, row):
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate.
+        values = [getattr(row, name) for name, _ in self._fields()]
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+        raw = json.dumps(values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode(self, cursor, model):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            raise InvalidCursor("Invalid cursor.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor("Invalid cursor.")
+        return [
+            _cursor_value(model._meta.get_field(name), value) for (name, _), value in zip(self._fields(), values)
+        ]
+
+
+def _cursor_value(field, value):
+    """Check one decoded cursor element against the model field it pages on; the ORM never sees a bad type."""
+    if isinstance(field, models.DateTimeField):
+        try:
+            parsed = parse_datetime(value) if isinstance(value, str) else None
+        except ValueError:
+            parsed = None
+        if parsed is None or timezone.is_naive(parsed):
+            raise InvalidCursor("Invalid cursor.")
+        return parsed
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        if type(value) is not int:
+            raise InvalidCursor("Invalid cursor.")
+        return value
+    if not isinstance(value, str):
+        raise InvalidCursor("Invalid cursor.")
+    return value
+
+
+# PUBLIC_INTERFACE
+def wants_stream(request) -> bool:
+    """True if the client asked for the NDJSON streaming mode (?stream=ndjson)."""
+    return request.query_params.get("stream") == "ndjson"
+
+
+# PUBLIC_INTERFACE
+def stream_ndjson(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream every row of `queryset` as one JSON document per line.
+    Rows are fetched in chunks through a server-side iterator and serialized one at a time,
+    so memory stays flat regardless of how many rows there are.
+    """
+    def rows():
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield json.dumps(serializer_class(obj).data, cls=DjangoJSONEncoder) + "\n"
+
+    return StreamingHttpResponse(rows(), content_type=NDJSON_CONTENT_TYPE)
@@ -0,0 +1,116 @@
+"""
+Hot-profile cache: UserProfileSerializer output by profile id, and the
+profile id of each user, in a TieredCache (settings.PROFILE_CACHE).
+
+Profile reads (GET profile, auto-fill on every booking-form render, the
+nested profile of every booking) are served from process memory. Writes
+invalidate through model signals once their transaction commits:
+
+- profile save() and delete(), including the cascade from user.delete();
+- user save() (the username is part of the representation);
+- every wallet ledger entry. Each credit (deposit_wallet) and each debit
+  (deduct_wallet, booking payments) appends one, in the same transaction
+  as the balance change.
+
+Reads inside a transaction bypass the cache in both directions. They may
+see the transaction's own uncommitted writes, which must not be cached,
+and they must see those writes rather than the committed value.
+
+Another worker's local copy is not invalidated by this process's writes.
+It lives at most LOCAL_TTL seconds. Set LOCAL_TTL to 0 to serve every read
+from the shared tier when that bound is too loose.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import TieredCache
+from .models import UserProfile, WalletLedgerEntry
+from .serializers import UserProfileSerializer
+
+_config = settings.PROFILE_CACHE
+PROFILE_CACHE = TieredCache(
+    "profile",
+    max_size=_config["MAX_SIZE"],
+    local_ttl=_config["LOCAL_TTL"],
+    shared_ttl=_config["SHARED_TTL"],
+    shared_alias=_config["SHARED_ALIAS"] or None,
+    # Longer than any profile read takes, so a read from before a commit cannot refill the shared tier.
+    tombstone_ttl=5,
+)
+
+
+def _load_profiles(profile_ids):
+    queryset = UserProfileSerializer.setup_eager_loading(UserProfile.objects.filter(pk__in=profile_ids))
+    return {profile.pk: dict(UserProfileSerializer(profile).data) for profile in queryset}
+
+
+def _load_profile_ids(user_ids):
+    return dict(UserProfile.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+
+
+def _read_through(kind, ids, load):
+    """{id: value} for `ids` under key prefix `kind` ('p' profile, 'u' user), loading misses with `load`."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    if transaction.get_connection().in_atomic_block:
+        return load(ids)
+    found = PROFILE_CACHE.get_many(
+        [f"{kind}{id_}" for id_ in ids],
+        lambda keys: {f"{kind}{id_}": value for id_, value in load([int(key[1:]) for key in keys]).items()},
+    )
+    return {id_: found[f"{kind}{id_}"] for id_ in ids if f"{kind}{id_}" in found}
+
+
+# PUBLIC_INTERFACE
+def profiles_data(profile_ids) -> dict:
+    """{profile id: serialized profile} for those of `profile_ids` that exist."""
+    return _read_through("p", profile_ids, _load_profiles)
+
+
+# PUBLIC_INTERFACE
+def profile_data(profile_id):
+    """The serialized profile, or None if there is no such profile."""
+    return profiles_data([profile_id]).get(profile_id)
+
+
+# PUBLIC_INTERFACE
+def profile_data_for_user(user_id):
+    """The serialized profile of user `user_id`, or None if the user has no profile."""
+    profile_id = _read_through("u", [user_id], _load_profile_ids).get(user_id)
+    return None if profile_id is None else profile_data(profile_id)
+
+
+# PUBLIC_INTERFACE
+def invalidate_profiles(profile_ids=(), user_ids=()):
+    """Drop these profiles (and user -> profile mappings) from the cache once the transaction commits."""
+    keys = [f"p{profile_id}" for profile_id in profile_ids] + [f"u{user_id}" for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: PROFILE_CACHE.invalidate(keys))
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def _profile_changed(sender, instance, **kwargs):
+    invalidate_profiles([instance.pk], [instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def _user_saved(sender, instance, created, update_fields, **kwargs):
+    # Only the username is part of the representation; logins save just last_login.
+    if created or (update_fields is not None and "username" not in update_fields):
+        return
+    invalidate_profiles(UserProfile.objects.filter(user_id=instance.pk).values_list("id", flat=True), [instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def _user_deleted(sender, instance, **kwargs):
+    # Its profile was deleted by the cascade, which invalidated it.
+    invalidate_profiles(user_ids=[instance.pk])
+
+
+@receiver(post_save, sender=WalletLedgerEntry)
+def _wallet_changed(sender, instance, **kwargs):
+    invalidate_profiles([instance.profile_id])
@@ -0,0 +1,184 @@
+"""
+Bulk traveller onboarding: `manage.py import_profiles` and POST /api/user_profiles/import/.
+
+Corporate and agent accounts arrive as CSV or NDJSON lists of thousands of
+travellers. The rows are read as a stream and imported in chunks. Each chunk
+is validated and checked for usernames that are taken. Its passwords are
+hashed on a process pool. Then its users, profiles and opening wallet
+deposits are written with three bulk INSERTs in one transaction. A bad row
+is reported by line number and skipped; it does not stop the import.
+
+The API runs on a request thread and shares the hashing pool with logins
+and registrations, so it takes at most settings.PROFILE_IMPORT_MAX_ROWS
+rows per request. The command has no limit.
+
+bulk_create sends no post_save signals. No signal is needed: the new
+profiles have nothing in the profile cache yet.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from .hashing import hash_passwords
+from .models import UserProfile, WalletLedgerEntry
+from .serializers import ProfileImportRowSerializer
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 1000
+# Errors kept in the report; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+
+# PUBLIC_INTERFACE
+@dataclass
+class ImportReport:
+    """Running totals of an import, passed to the progress callback after each chunk."""
+    rows: int = 0
+    created: int = 0
+    deposits: int = 0
+    deposited: Decimal = Decimal("0.00")
+    failed: int = 0
+    errors: list = field(default_factory=list)  # (line, message) for the first MAX_REPORTED_ERRORS
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def as_dict(self):
+        return {
+            "rows": self.rows, "created": self.created, "failed": self.failed,
+            "deposits": self.deposits, "deposited": f"{self.deposited:.2f}",
+            "elapsed": round(self.elapsed, 3), "rows_per_second": round(self.rows_per_second, 1),
+            "errors": [{"line": line, "error": message} for line, message in self.errors],
+        }
+
+
+# PUBLIC_INTERFACE
+def read_rows(lines, fmt):
+    """
+    Yield (line number, row dict or None) from an iterable of text lines. CSV needs a header
+    row; empty CSV cells count as absent. None marks an NDJSON line that is not a JSON object.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}
+    elif fmt == "ndjson":
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _messages(errors):
+    return "; ".join(
+        f"{name}: {' '.join(str(message) for message in messages)}" for name, messages in errors.items()
+    )
+
+
+def _validate(chunk, seen, report):
+    valid = []
+    for line, row in chunk:
+        if row is None:
+            report.error(line, "not a JSON object")
+            continue
+        serializer = ProfileImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            report.error(line, _messages(serializer.errors))
+            continue
+        data = serializer.validated_data
+        if data["username"] in seen:
+            report.error(line, f"duplicate username {data['username']!r} in this import")
+            continue
+        seen.add(data["username"])
+        valid.append((line, data))
+    return valid
+
+
+def _without_taken_usernames(rows, report):
+    taken = set(User.objects.filter(username__in=[data["username"] for _, data in rows])
+                .values_list("username", flat=True))
+    for line, data in rows:
+        if data["username"] in taken:
+            report.error(line, f"username {data['username']!r} already exists")
+    return [(line, data) for line, data in rows if data["username"] not in taken]
+
+
+def _write(rows, hashes):
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            User(username=data["username"], password=encoded) for (_, data), encoded in zip(rows, hashes)
+        )
+        profiles = UserProfile.objects.bulk_create(
+            UserProfile(
+                user_id=user.pk, full_name=data["full_name"], age=data["age"], address=data["address"],
+                preferred_berth=data["preferred_berth"], auto_fill_enabled=data["auto_fill_enabled"],
+            )
+            for user, (_, data) in zip(users, rows)
+        )
+        deposits = WalletLedgerEntry.objects.bulk_create(
+            WalletLedgerEntry(profile_id=profile.pk, kind=WalletLedgerEntry.KIND_DEPOSIT, amount=data["wallet_deposit"])
+            for profile, (_, data) in zip(profiles, rows) if data["wallet_deposit"] > 0
+        )
+    return deposits
+
+
+def _import_chunk(chunk, seen, pool, report):
+    rows = _without_taken_usernames(_validate(chunk, seen, report), report)
+    if not rows:
+        return
+    hashes = hash_passwords((data.get("password") or None for _, data in rows), pool)
+    try:
+        deposits = _write(rows, hashes)
+    except IntegrityError:
+        # A username was registered between the check and the INSERT; drop it and retry once.
+        kept = {line for line, _ in _without_taken_usernames(rows, report)}
+        hashes = [encoded for (line, _), encoded in zip(rows, hashes) if line in kept]
+        rows = [(line, data) for line, data in rows if line in kept]
+        deposits = _write(rows, hashes) if rows else []
+    report.created += len(rows)
+    report.deposits += len(deposits)
+    report.deposited += sum((entry.amount for entry in deposits), Decimal("0.00"))
+
+
+# PUBLIC_INTERFACE
+def import_profiles(rows, pool=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None) -> ImportReport:
+    """
+    Create a user, profile and opening wallet deposit for each (line, row) from read_rows().
+    Passwords are hashed on `pool` (a HashingPool; default: this process's hashing pool).
+    `progress(report)` is called after every chunk.
+    """
+    report = ImportReport()
+    seen = set()
+    start = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(chunk, seen, pool, report)
+        report.rows += len(chunk)
+        report.elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress(report)
+    report.elapsed = time.perf_counter() - start
+    report.errors.sort()
+    return report
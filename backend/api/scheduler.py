@@ -0,0 +1,311 @@
+"""
+Tatkal window scheduler: confirms auto_confirm booking drafts the instant their window opens.
+
+Without it, every user with a staged draft calls confirm at 10:00:00. The
+admission controller sheds most of those requests, and who gets a berth
+depends on whose request got in first. `manage.py run_tatkal_scheduler`
+fires the drafts itself:
+
+- A journey date's window opens at TATKAL_SCHEDULER['OPENS_AT'], in its
+  TIME_ZONE, on the day before the journey.
+- Pending intents (staged auto_confirm drafts) sit in one heap ordered by
+  window, then fairness round, then lot. The heap is rebuilt from the
+  database on every load, so drafts staged or cancelled since then are
+  picked up.
+- Fairness: a user's first draft in a window is in round 0 and the second
+  in round 1, so every user's first booking is made before anyone's second.
+  Within a round the order is a lottery: a hash of the window and the draft
+  id. Staging early or staging many drafts gains nothing. Drafts beyond
+  MAX_PER_USER for one user in one window are never fired.
+- Firing: worker threads open their database connections before the window
+  opens, then wait. At the opening instant they take intents from the
+  ordered queue and confirm each with api.drafts.confirm_draft, the same
+  transaction as the confirm endpoint: berth allocation, then
+  Booking.try_pay_via_wallet (one combined debit for a group).
+
+Time comes from an injectable clock with now() and sleep(), so tests can
+run a window without waiting for it.
+"""
+import datetime
+import hashlib
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .drafts import DraftNotConfirmable, confirm_draft
+from .inventory import NoBerthAvailable
+from .models import BookingDraft
+
+logger = logging.getLogger(__name__)
+
+
+# PUBLIC_INTERFACE
+class SystemClock:
+    """The wall clock. A scheduler clock needs now() (an aware datetime) and sleep(seconds)."""
+
+    def now(self):
+        return timezone.now()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+def _zone():
+    return ZoneInfo(settings.TATKAL_SCHEDULER["TIME_ZONE"])
+
+
+# PUBLIC_INTERFACE
+def window_opens_at(journey_date) -> datetime.datetime:
+    """The instant the Tatkal window for `journey_date` opens: OPENS_AT on the day before."""
+    hour, minute = (int(part) for part in settings.TATKAL_SCHEDULER["OPENS_AT"].split(":"))
+    return datetime.datetime.combine(
+        journey_date - datetime.timedelta(days=1), datetime.time(hour, minute), tzinfo=_zone()
+    )
+
+
+# PUBLIC_INTERFACE
+@dataclass(frozen=True, order=True)
+class Intent:
+    """One draft to confirm. Intents order by window, then fairness round, then lot."""
+    opens_at: datetime.datetime
+    round: int
+    lot: str
+    draft_id: int
+    profile_id: int = field(compare=False)
+
+
+def _lot(opens_at, draft_id):
+    return hashlib.blake2b(f"{opens_at.isoformat()}:{draft_id}".encode(), digest_size=8).hexdigest()
+
+
+# PUBLIC_INTERFACE
+def fair_intents(opens_at, drafts, max_per_user):
+    """
+    (intents, capped draft ids) for one window. `drafts` are (draft id, profile id, status) in
+    staging order. Drafts that are already confirmed count toward their user's cap but are not fired.
+    """
+    seen = defaultdict(int)
+    intents, capped = [], []
+    for draft_id, profile_id, status in drafts:
+        round_ = seen[profile_id]
+        seen[profile_id] += 1
+        if status != BookingDraft.STATUS_STAGED:
+            continue
+        if round_ >= max_per_user:
+            capped.append(draft_id)
+            continue
+        intents.append(Intent(opens_at, round_, _lot(opens_at, draft_id), draft_id, profile_id))
+    return intents, capped
+
+
+# PUBLIC_INTERFACE
+@dataclass
+class WindowReport:
+    """
+    What firing one window did. Times are seconds after the opening instant; `started` is
+    above zero only for a window fired late (after a restart).
+    """
+    opens_at: datetime.datetime
+    intents: int = 0
+    booked: int = 0  # drafts confirmed and paid from the wallet
+    unpaid: int = 0  # drafts confirmed, but the wallet was short
+    sold_out: int = 0
+    skipped: int = 0  # confirmed or cancelled by the user since the load
+    failed: int = 0
+    capped: int = 0  # over MAX_PER_USER; not fired
+    bookings: int = 0  # Booking rows committed
+    started: float = 0.0
+    first_commit: float = None
+    last_commit: float = None
+
+    @property
+    def committed_per_second(self):
+        """Bookings committed per second of firing."""
+        elapsed = (self.last_commit or 0.0) - self.started
+        return self.bookings / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        opens = self.opens_at.astimezone(_zone()).strftime("%Y-%m-%d %H:%M %Z")
+        line = (
+            f"Window {opens}: {self.intents} drafts fired, {self.booked} booked, {self.unpaid} unpaid, "
+            f"{self.sold_out} sold out, {self.skipped} skipped, {self.failed} failed, {self.capped} over the "
+            f"per-user cap"
+        )
+        if self.bookings:
+            line += (
+                f"; fired {self.started:.3f}s after open, {self.bookings} bookings committed "
+                f"{self.first_commit:.3f}s-{self.last_commit:.3f}s after open ({self.committed_per_second:.1f}/s)"
+            )
+        return line
+
+
+# PUBLIC_INTERFACE
+class TatkalScheduler:
+    """
+    Holds the pending intents and fires each window at its opening instant. Settings come from
+    settings.TATKAL_SCHEDULER unless given. `workers=0` confirms inline on the calling thread.
+    """
+
+    def __init__(self, clock=None, workers=None, max_per_user=None, grace=None):
+        config = settings.TATKAL_SCHEDULER
+        self.clock = clock or SystemClock()
+        self.workers = config["WORKERS"] if workers is None else workers
+        self.max_per_user = config["MAX_PER_USER"] if max_per_user is None else max_per_user
+        self.grace = config["GRACE"] if grace is None else grace
+        self._heap = []
+        self._capped = {}
+        self._fired = set()
+
+    # PUBLIC_INTERFACE
+    def load(self, horizon) -> int:
+        """
+        Rebuild the heap from the windows opening from `grace` seconds ago to `horizon` seconds
+        ahead, leaving out windows this scheduler already fired. Returns the number of intents.
+        """
+        now = self.clock.now()
+        earliest = now - datetime.timedelta(seconds=self.grace)
+        latest = now + datetime.timedelta(seconds=horizon)
+        day = datetime.timedelta(days=1)
+        rows = (
+            BookingDraft.objects.filter(
+                auto_confirm=True,
+                journey_date__range=(earliest.astimezone(_zone()).date() + day, latest.astimezone(_zone()).date() + day),
+            )
+            .exclude(status=BookingDraft.STATUS_CANCELLED)
+            .order_by("journey_date", "id")
+            .values_list("journey_date", "id", "user_profile_id", "status")
+        )
+        windows = defaultdict(list)
+        for journey_date, draft_id, profile_id, status in rows:
+            opens_at = window_opens_at(journey_date)
+            if earliest <= opens_at <= latest and opens_at not in self._fired:
+                windows[opens_at].append((draft_id, profile_id, status))
+        heap, capped = [], {}
+        for opens_at, drafts in windows.items():
+            intents, over = fair_intents(opens_at, drafts, self.max_per_user)
+            heap.extend(intents)
+            capped[opens_at] = len(over)
+        heapq.heapify(heap)
+        self._heap, self._capped = heap, capped
+        return len(heap)
+
+    # PUBLIC_INTERFACE
+    def next_window(self):
+        """Opening instant of the earliest window with pending intents, or None."""
+        return self._heap[0].opens_at if self._heap else None
+
+    # PUBLIC_INTERFACE
+    def pop_window(self) -> list:
+        """Remove the earliest window's intents from the heap and return them in firing order."""
+        opens_at = self.next_window()
+        intents = []
+        while self._heap and self._heap[0].opens_at == opens_at:
+            intents.append(heapq.heappop(self._heap))
+        return intents
+
+    # PUBLIC_INTERFACE
+    def fire_next_window(self):
+        """Wait for the earliest window to open, fire it and return its WindowReport (None if none)."""
+        intents = self.pop_window()
+        if not intents:
+            return None
+        opens_at = intents[0].opens_at
+        self._fired.add(opens_at)
+        report = WindowReport(opens_at, intents=len(intents), capped=self._capped.pop(opens_at, 0))
+        queue, lock = deque(intents), threading.Lock()
+        if not self.workers:
+            self._wait_until(opens_at, report)
+            self._drain(queue, report, lock)
+            return report
+        go = threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(queue, report, lock, go), name=f"tatkal-scheduler-{i}")
+            for i in range(min(self.workers, len(intents)))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._wait_until(opens_at, report)
+        finally:
+            go.set()
+            for thread in threads:
+                thread.join()
+        return report
+
+    # PUBLIC_INTERFACE
+    def run(self, horizon, poll, once=False, on_report=lambda report: None):
+        """
+        Load, sleep toward the next window and fire each window as it opens. Reloads at least every
+        `poll` seconds until the last `poll` seconds before a window, so drafts staged or cancelled
+        until then are included. With `once`, returns after firing one window, or at once if
+        no window opens within `horizon` seconds.
+        """
+        while True:
+            self.load(horizon)
+            opens_at = self.next_window()
+            if opens_at is None:
+                if once:
+                    return
+                self.clock.sleep(poll)
+                continue
+            if (opens_at - self.clock.now()).total_seconds() > poll:
+                self.clock.sleep(poll)
+                continue
+            on_report(self.fire_next_window())
+            if once:
+                return
+
+    def _wait_until(self, instant, report):
+        while True:
+            remaining = (instant - self.clock.now()).total_seconds()
+            if remaining <= 0:
+                report.started = -remaining
+                return
+            self.clock.sleep(remaining)
+
+    def _work(self, queue, report, lock, go):
+        try:
+            connection.ensure_connection()  # Connect now, not after the window opens.
+            go.wait()
+            self._drain(queue, report, lock)
+        finally:
+            connection.close()
+
+    def _drain(self, queue, report, lock):
+        while True:
+            try:
+                intent = queue.popleft()
+            except IndexError:
+                return
+            self._fire(intent, report, lock)
+
+    def _fire(self, intent, report, lock):
+        bookings = 0
+        try:
+            rows, paid, created = confirm_draft(intent.draft_id)
+        except (BookingDraft.DoesNotExist, DraftNotConfirmable):
+            outcome = "skipped"
+        except NoBerthAvailable:
+            outcome = "sold_out"
+        except Exception:
+            logger.exception("Tatkal scheduler could not confirm draft %s", intent.draft_id)
+            outcome = "failed"
+        else:
+            outcome = "skipped" if not created else "booked" if paid else "unpaid"
+            bookings = len(rows) if created else 0
+        elapsed = (self.clock.now() - intent.opens_at).total_seconds()
+        with lock:
+            setattr(report, outcome, getattr(report, outcome) + 1)
+            if bookings:
+                report.bookings += bookings
+                report.first_commit = elapsed if report.first_commit is None else min(report.first_commit, elapsed)
+                report.last_commit = elapsed if report.last_commit is None else max(report.last_commit, elapsed)
@@ -1,11 +1,17 @@
 from rest_framework import serializers
 from decimal import Decimal
-from .models import UserProfile, Booking, PaymentTransaction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from .models import UserProfile, Booking, BookingDraft, PaymentTransaction, Seat
+from .wallet import pending_credit_expression
 
 # PUBLIC_INTERFACE
 class UserProfileSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
-    wallet_balance = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    wallet_balance = serializers.DecimalField(
+        max_digits=10, decimal_places=2, source='available_wallet_balance', read_only=True
+    )
 
     class Meta:
         model = UserProfile
@@ -14,10 +20,96 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'wallet_balance', 'auto_fill_enabled',
         ]
 
+    # PUBLIC_INTERFACE
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the user and pending wallet credit with each profile so rendering issues no extra queries."""
+        return queryset.select_related('user').only(
+            'id', 'user__id', 'user__username', 'full_name', 'age', 'address', 'preferred_berth',
+            'wallet_balance', 'wallet_snapshot_through', 'auto_fill_enabled',
+        ).annotate(pending_wallet_credit=pending_credit_expression())
+
+    def update(self, instance, validated_data):
+        # Write only the submitted columns so a profile edit never overwrites a concurrent wallet debit.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+# PUBLIC_INTERFACE
+class ProfileImportRowSerializer(serializers.Serializer):
+    """
+    One traveller of a bulk import (api/profile_import.py). A row without a password gets an
+    unusable one; `wallet_deposit` is credited to the new wallet.
+    """
+    username = serializers.CharField(
+        max_length=User._meta.get_field('username').max_length,
+        validators=User._meta.get_field('username').validators,
+    )
+    password = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    full_name = serializers.CharField(max_length=100)
+    age = serializers.IntegerField(min_value=1)
+    address = serializers.CharField(max_length=256)
+    preferred_berth = serializers.ChoiceField(
+        choices=UserProfile._meta.get_field('preferred_berth').choices, default='any'
+    )
+    auto_fill_enabled = serializers.BooleanField(default=True)
+    wallet_deposit = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.00"), default=Decimal("0.00")
+    )
+
+
+# PUBLIC_INTERFACE
+class SeatSerializer(serializers.ModelSerializer):
+    coach = serializers.CharField(source='coach.code', read_only=True)
+
+    class Meta:
+        model = Seat
+        fields = ['coach', 'number', 'berth_type']
+
+
+# PUBLIC_INTERFACE
+class CachedProfileField(serializers.Field):
+    """
+    A booking's profile as UserProfileSerializer renders it. A profile already loaded on the
+    booking is rendered directly; otherwise it comes from the profile cache, or from the batch
+    fetched by BookingListSerializer.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, booking):
+        if Booking.user_profile.is_cached(booking):
+            return UserProfileSerializer(booking.user_profile).data
+        preloaded = getattr(self.parent, 'preloaded_profiles', None)
+        if preloaded is not None and booking.user_profile_id in preloaded:
+            return preloaded[booking.user_profile_id]
+        from .profile_cache import profile_data
+        return profile_data(booking.user_profile_id)
+
+
+# PUBLIC_INTERFACE
+class BookingListSerializer(serializers.ListSerializer):
+    """Fetches the profiles of a list of bookings in one batch rather than one per booking."""
+
+    def to_representation(self, data):
+        from .profile_cache import profiles_data
+        bookings = list(data.all() if hasattr(data, 'all') else data)
+        self.child.preloaded_profiles = profiles_data({
+            booking.user_profile_id for booking in bookings if not Booking.user_profile.is_cached(booking)
+        })
+        try:
+            return [self.child.to_representation(booking) for booking in bookings]
+        finally:
+            self.child.preloaded_profiles = None
+
 
 # PUBLIC_INTERFACE
 class BookingSerializer(serializers.ModelSerializer):
-    user_profile = UserProfileSerializer(read_only=True)
+    user_profile = CachedProfileField()
+    seat = SeatSerializer(read_only=True)
     user_profile_id = serializers.PrimaryKeyRelatedField(
         source='user_profile', queryset=UserProfile.objects.all(), write_only=True
     )
@@ -28,13 +120,31 @@ class BookingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Booking
+        list_serializer_class = BookingListSerializer
         fields = [
             'id', 'user_profile', 'user_profile_id', 'source', 'destination', 'journey_date',
             'passenger_name', 'passenger_age', 'passenger_sex', 'preferred_berth', 'fare',
             'paid', 'paid_via_wallet', 'payment_time',
-            'booking_status', 'pnr', 'booking_time', 'feedback'
+            'booking_status', 'pnr', 'booking_time', 'feedback', 'seat'
         ]
 
+    # PUBLIC_INTERFACE
+    @staticmethod
+    def setup_eager_loading(queryset, prefix='', with_profile=False):
+        """
+        Join the allocated seat. Profiles come from the profile cache while rendering;
+        `with_profile=True` prefetches each distinct booking profile once instead, for async
+        callers, which cannot fill the cache mid-render.
+        `prefix` is the lookup path to the booking when the queryset is of a related model.
+        """
+        queryset = queryset.select_related(f'{prefix}seat__coach')
+        if with_profile:
+            queryset = queryset.prefetch_related(Prefetch(
+                f'{prefix}user_profile',
+                queryset=UserProfileSerializer.setup_eager_loading(UserProfile.objects.all()),
+            ))
+        return queryset
+
     def validate(self, data):
         # PUBLIC_INTERFACE
         # Validate that ages are positive and fare is not negative
@@ -72,6 +182,90 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Fare cannot be negative.")
         return data
 
+# Passengers travelling together in one group booking.
+MAX_GROUP_PASSENGERS = 6
+
+
+# PUBLIC_INTERFACE
+class GroupPassengerSerializer(BookingCreateSerializer):
+    """Per-passenger fields of a group booking; reuses BookingCreateSerializer validation."""
+    user_profile_id = None
+
+    class Meta(BookingCreateSerializer.Meta):
+        fields = ['passenger_name', 'passenger_age', 'passenger_sex', 'preferred_berth', 'fare']
+
+
+# PUBLIC_INTERFACE
+class GroupBookingCreateSerializer(serializers.Serializer):
+    """
+    Books up to MAX_GROUP_PASSENGERS passengers on one journey in a single request.
+    The profile and journey fields are shared; each passenger carries its own berth and fare.
+    """
+    user_profile_id = serializers.PrimaryKeyRelatedField(
+        source='user_profile', queryset=UserProfile.objects.all(), write_only=True
+    )
+    source = serializers.CharField(max_length=60)
+    destination = serializers.CharField(max_length=60)
+    journey_date = serializers.DateField()
+    passengers = GroupPassengerSerializer(many=True, min_length=1, max_length=MAX_GROUP_PASSENGERS)
+
+    def create(self, validated_data):
+        passengers = validated_data.pop('passengers')
+        bookings = [Booking(**validated_data, **passenger) for passenger in passengers]
+        return Booking.objects.bulk_create(bookings)
+
+
+# PUBLIC_INTERFACE
+class DraftPassengerSerializer(BookingCreateSerializer):
+    """Per-passenger fields of a booking draft; the fare is settled when the draft is confirmed."""
+    user_profile_id = None
+
+    class Meta(BookingCreateSerializer.Meta):
+        fields = ['passenger_name', 'passenger_age', 'passenger_sex', 'preferred_berth']
+
+
+# PUBLIC_INTERFACE
+class BookingDraftSerializer(serializers.ModelSerializer):
+    """
+    Stages a booking for one to MAX_GROUP_PASSENGERS passengers. All validation happens here,
+    so confirming the draft later builds its bookings from the stored fields without re-checking them.
+    """
+    user_profile_id = serializers.PrimaryKeyRelatedField(
+        source='user_profile', queryset=UserProfile.objects.all()
+    )
+    passengers = DraftPassengerSerializer(many=True, min_length=1, max_length=MAX_GROUP_PASSENGERS)
+
+    class Meta:
+        model = BookingDraft
+        fields = [
+            'id', 'user_profile_id', 'source', 'destination', 'journey_date', 'passengers',
+            'fare_ceiling', 'auto_confirm', 'status', 'created_at', 'confirmed_at',
+        ]
+        read_only_fields = ['status', 'created_at', 'confirmed_at']
+
+    def validate_fare_ceiling(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Fare ceiling must be positive.")
+        return value
+
+    def validate(self, data):
+        # The scheduler enforces the same cap when the window opens; this refuses the draft up front.
+        if data.get('auto_confirm'):
+            cap = settings.TATKAL_SCHEDULER['MAX_PER_USER']
+            scheduled = BookingDraft.objects.filter(
+                user_profile=data['user_profile'], journey_date=data['journey_date'], auto_confirm=True,
+            ).exclude(status=BookingDraft.STATUS_CANCELLED)
+            if scheduled.count() >= cap:
+                raise serializers.ValidationError(
+                    f"At most {cap} drafts per journey date can be confirmed automatically."
+                )
+        return data
+
+    def create(self, validated_data):
+        validated_data['passengers'] = [dict(passenger) for passenger in validated_data['passengers']]
+        return BookingDraft.objects.create(**validated_data)
+
+
 # PUBLIC_INTERFACE
 class PaymentTransactionSerializer(serializers.ModelSerializer):
     booking = BookingSerializer(read_only=True)
@@ -84,3 +278,12 @@ class PaymentTransactionSerializer(serializers.ModelSerializer):
             'id', 'booking', 'booking_id', 'order_id', 'payment_id', 'status',
             'amount', 'created_at', 'payment_response'
         ]
+
+    # PUBLIC_INTERFACE
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Join the booking and its seat so nested rendering issues no per-row queries.
+        The booking's profile is read from the profile cache while rendering.
+        """
+        return BookingSerializer.setup_eager_loading(queryset.select_related('booking'), prefix='booking__')
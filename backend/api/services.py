@@ -0,0 +1,201 @@
+"""
+Booking and payment operations shared by the sync (DRF) and async views.
+
+Each function is plain synchronous ORM code that owns its transaction, so the
+async views can hand it to `sync_to_async` as a single unit of work.
+
+Gateway work (order creation, callback reconciliation and the PNR issued with
+it) runs as PaymentJobs on the `run_payment_workers` pool; the request-path
+functions here only enqueue it.
+"""
+from django.db import IntegrityError, transaction
+
+from .events import notify_booking_changed
+from .gateway import get_gateway
+from .ids import new_pnr
+from .inventory import NoBerthAvailable, allocate_berth, release_berth
+from .jobs import enqueue, job_handler
+from .models import Booking, PaymentCallbackReceipt, PaymentJob, PaymentTransaction, Seat
+
+
+# PUBLIC_INTERFACE
+def create_and_pay_booking(serializer):
+    """
+    Save a validated BookingCreateSerializer, allocate a berth and try a wallet debit,
+    all in one transaction. Returns (booking, paid). Raises NoBerthAvailable if sold out.
+    """
+    with transaction.atomic():
+        booking = serializer.save()
+        allocate_berth(booking)
+        paid = booking.try_pay_via_wallet()
+    booking.refresh_from_db()  # For .paid values
+    return booking, paid
+
+
+def _reclaim_berth(booking):
+    """Allocate a berth again if an earlier failed payment released it. False if sold out since."""
+    if Seat.objects.filter(booking=booking).exists():
+        return True
+    try:
+        allocate_berth(booking)
+    except NoBerthAvailable:
+        return False
+    return True
+
+
+# PUBLIC_INTERFACE
+def callback_idempotency_key(payment_transaction_id, payment_id) -> str:
+    """
+    Idempotency key of a gateway callback: the order (one PaymentTransaction per order id)
+    plus the gateway payment id. Built from request fields only, so a replay is
+    recognised before anything is loaded.
+    """
+    return f"{payment_transaction_id}:{payment_id or ''}"
+
+
+# PUBLIC_INTERFACE
+def stored_callback_response(key):
+    """The stored response of an already-processed callback, or None (one unique-index read)."""
+    return PaymentCallbackReceipt.objects.filter(idempotency_key=key).values_list("response", flat=True).first()
+
+
+# PUBLIC_INTERFACE
+async def astored_callback_response(key):
+    """Async stored_callback_response, for serving replays straight from the event loop."""
+    return await PaymentCallbackReceipt.objects.filter(idempotency_key=key).values_list(
+        "response", flat=True
+    ).afirst()
+
+
+# Booking statuses a payment callback may move on from. "failed" is there so a retried payment
+# can still succeed; booked and cancelled bookings are final as far as the gateway is concerned.
+PAYABLE_STATUSES = ("initiated", "payment_pending", "failed")
+
+
+def _settle_booking(booking, succeeded):
+    """Move a payable booking to booked (with a PNR and a berth) or failed."""
+    if succeeded:
+        retried = booking.booking_status == "failed"
+        booking.booking_status = "booked"
+        # Generate dummy PNR
+        booking.pnr = new_pnr()
+        if retried and not _reclaim_berth(booking):
+            # Sold out since an earlier failed attempt released the berth.
+            booking.booking_status = "failed"
+            booking.pnr = None
+    else:
+        booking.booking_status = "failed"
+        # A failed booking cannot be cancelled, so its berth goes back to the pool now.
+        release_berth(booking)
+    booking.save(update_fields=["booking_status", "pnr"])
+    notify_booking_changed(booking.pk)
+
+
+# PUBLIC_INTERFACE
+def apply_payment_callback(payment_transaction_id, payment_id, status_str):
+    """
+    Record a gateway callback on its PaymentTransaction and move the booking to booked/failed.
+    Returns {"booking_status", "pnr"}, plus "ignored" (the reason) when the booking was left
+    as it was. Raises PaymentTransaction.DoesNotExist.
+
+    Only an initiated, payment_pending or failed booking is moved. A callback for a booking
+    that is already booked or cancelled, or for a payment with no booking, is recorded on the
+    payment and ignored. Idempotent: a redelivered callback returns the stored response
+    without writing. Once an order has succeeded, later callbacks for it (any payment id)
+    never change the booking or its PNR.
+    """
+    key = callback_idempotency_key(payment_transaction_id, payment_id)
+    stored = stored_callback_response(key)
+    if stored is not None:
+        return stored
+    try:
+        with transaction.atomic():
+            payment = PaymentTransaction.objects.select_for_update().get(id=payment_transaction_id)
+            # Re-check under the row lock: a concurrent delivery may have just finished.
+            stored = stored_callback_response(key)
+            if stored is not None:
+                return stored
+            # Locked too, so a concurrent cancel either lands first (and is seen here) or waits.
+            booking = Booking.objects.select_for_update().filter(pk=payment.booking_id).first()
+            ignored = ""
+            if payment.status != "success":
+                payment.payment_id = payment_id or None
+                payment.status = "success" if status_str == "success" else "failed"
+                payment.save(update_fields=["payment_id", "status"])
+                if booking is None:
+                    ignored = "payment has no booking"
+                elif booking.booking_status not in PAYABLE_STATUSES:
+                    ignored = f"booking is {booking.booking_status}"
+                else:
+                    _settle_booking(booking, payment.status == "success")
+            if booking is None:
+                result = {"booking_status": None, "pnr": None}
+            else:
+                result = {"booking_status": booking.booking_status, "pnr": booking.pnr}
+            if ignored:
+                result["ignored"] = ignored
+            PaymentCallbackReceipt.objects.create(idempotency_key=key, payment=payment, response=result)
+    except IntegrityError:
+        # Lost an insert race on the receipt (backends without row locks); the winner's answer stands.
+        stored = stored_callback_response(key)
+        if stored is None:
+            raise
+        return stored
+    return result
+
+
+# PUBLIC_INTERFACE
+def initiate_payment(booking, amount):
+    """
+    Record a PaymentTransaction for `booking` and queue creation of its gateway order.
+    Returns the transaction (status "created" until a worker has created the order).
+    """
+    with transaction.atomic():
+        payment = PaymentTransaction.objects.create(booking=booking, status="created", amount=amount)
+        enqueue(PaymentJob.KIND_CREATE_ORDER, payment.pk)
+    return payment
+
+
+# PUBLIC_INTERFACE
+def submit_payment_callback(payment_transaction_id, payment_id, status_str):
+    """
+    Accept a gateway callback for background reconciliation. Returns (stored_response, job):
+    an already-processed callback gets its stored response and no job; otherwise the queued
+    job is returned (redeliveries share it). Raises PaymentTransaction.DoesNotExist.
+    """
+    key = callback_idempotency_key(payment_transaction_id, payment_id)
+    stored = stored_callback_response(key)
+    if stored is not None:
+        return stored, None
+    if not PaymentTransaction.objects.filter(id=payment_transaction_id).exists():
+        raise PaymentTransaction.DoesNotExist("Payment transaction not found.")
+    job, _ = enqueue(
+        PaymentJob.KIND_RECONCILE_CALLBACK, payment_transaction_id,
+        payload={"payment_id": payment_id, "status": status_str}, dedupe_key=key,
+    )
+    return None, job
+
+
+def _fail_payment(job):
+    PaymentTransaction.objects.filter(id=job.payment_transaction_id, status="created").update(status="failed")
+
+
+@job_handler(PaymentJob.KIND_CREATE_ORDER, on_exhausted=_fail_payment)
+def _create_order(job):
+    payment = PaymentTransaction.objects.get(id=job.payment_transaction_id)
+    if payment.order_id:  # Created by an earlier attempt whose lease ran out.
+        return {"order_id": payment.order_id}
+    order = get_gateway().create_order(payment)
+    payment.order_id = order["order_id"]
+    payment.status = "pending"
+    payment.payment_response = {"payment_url": order["payment_url"]}
+    payment.save(update_fields=["order_id", "status", "payment_response"])
+    return order
+
+
+@job_handler(PaymentJob.KIND_RECONCILE_CALLBACK)
+def _reconcile_callback(job):
+    payment_id, reported = job.payload.get("payment_id"), job.payload.get("status", "success")
+    order_id = PaymentTransaction.objects.values_list("order_id", flat=True).get(id=job.payment_transaction_id)
+    verified = get_gateway().verify_payment(order_id, payment_id, reported)
+    return apply_payment_callback(job.payment_transaction_id, payment_id, verified)
@@ -0,0 +1,182 @@
+"""
+Compact read path for booking-status polling.
+
+Clients waiting for a PNR poll GET /api/bookings/<id>/status/ about once a
+second. The full GET /api/bookings/<id>/ runs BookingSerializer with the
+nested profile and seat on every poll. This path skips DRF and
+ModelSerializer. It fetches only the polled columns with values_list() and
+builds the body with a row builder set up once at import. The ETag is a
+hash of the body, so a poll for a booking that has not changed gets an
+empty 304.
+
+Async callers (the long-poll and event-stream views) read on a small thread
+pool, settings.BOOKING_STATUS_READ_THREADS, rather than on the request's
+thread-sensitive executor, so an open connection does not hold a thread
+between reads. 0 reads on the request's executor instead.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework import serializers
+
+from .events import BROKER
+from .models import Booking
+
+_DATETIME = serializers.DateTimeField()
+
+
+def _datetime(value):
+    # Same rendering as BookingSerializer's DateTimeFields.
+    return None if value is None else _DATETIME.to_representation(value)
+
+
+# Response key, model column, converter (None: the column value is used as-is).
+STATUS_FIELDS = (
+    ("id", "id", None),
+    ("booking_status", "booking_status", None),
+    ("pnr", "pnr", None),
+    ("paid", "paid", None),
+    ("paid_via_wallet", "paid_via_wallet", None),
+    ("payment_time", "payment_time", _datetime),
+)
+STATUS_COLUMNS = tuple(column for _, column, _ in STATUS_FIELDS)
+
+
+# PUBLIC_INTERFACE
+def compile_row_builder(fields):
+    """
+    Build a function turning one values_list() row into a dict for `fields`, a sequence of
+    (key, column, converter or None) in column order. Keys keep the order of `fields`.
+    """
+    items = tuple((key, index, converter) for index, (key, _column, converter) in enumerate(fields))
+
+    def build(row):
+        return {
+            key: row[index] if converter is None else converter(row[index]) for key, index, converter in items
+        }
+
+    return build
+
+
+build_status = compile_row_builder(STATUS_FIELDS)
+
+
+def _encode(row):
+    return json.dumps(build_status(row), separators=(",", ":")).encode()
+
+
+def _status_rows(booking_id):
+    return Booking.objects.filter(pk=booking_id).values_list(*STATUS_COLUMNS)[:1]
+
+
+_STATUS_INDEX = STATUS_COLUMNS.index("booking_status")
+
+
+# PUBLIC_INTERFACE
+def booking_status_body(booking_id):
+    """The encoded status body for `booking_id`, or None if there is no such booking."""
+    for row in _status_rows(booking_id):
+        return _encode(row)
+    return None
+
+
+def _read_booking_status(booking_id):
+    for row in _status_rows(booking_id):
+        return _encode(row), row[_STATUS_INDEX]
+    return None
+
+
+def _read_on_pool(booking_id):
+    try:
+        return _read_booking_status(booking_id)
+    finally:
+        # Pool threads outlive requests; release the connection as the end of a request would.
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BOOKING_STATUS_READ_THREADS, thread_name_prefix="status-read",
+                )
+    return _executor
+
+
+@receiver(setting_changed)
+def _reset_executor(setting, **kwargs):
+    global _executor
+    if setting == "BOOKING_STATUS_READ_THREADS":
+        with _executor_lock:
+            executor, _executor = _executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _read(booking_id):
+    if not settings.BOOKING_STATUS_READ_THREADS:
+        return sync_to_async(_read_booking_status)(booking_id)
+    return sync_to_async(_read_on_pool, thread_sensitive=False, executor=_get_executor())(booking_id)
+
+
+_in_flight = {}  # (event loop, booking_id) -> (BROKER.epoch when the read started, task)
+
+
+# PUBLIC_INTERFACE
+async def aread_booking_status(booking_id):
+    """
+    (encoded status body, booking_status) for `booking_id`, or None if there is no such booking.
+
+    Concurrent reads of one booking on an event loop share a query. A status change wakes every
+    connection waiting on the booking at once, and a burst of new connections arrives together.
+    A read is only shared while no change has been published since it started, so a caller
+    woken by a change never gets a row read before it.
+    """
+    loop = asyncio.get_running_loop()
+    key = (loop, booking_id)
+    epoch = BROKER.epoch
+    current = _in_flight.get(key)
+    if current is not None and current[0] == epoch:
+        return await asyncio.shield(current[1])
+    task = loop.create_task(_read(booking_id))
+    _in_flight[key] = (epoch, task)
+    try:
+        return await asyncio.shield(task)
+    finally:
+        if _in_flight.get(key, (None, None))[1] is task:
+            del _in_flight[key]
+
+
+# PUBLIC_INTERFACE
+def body_etag(body):
+    return '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+# PUBLIC_INTERFACE
+def status_response(request, body):
+    """200 with `body` and its ETag, or 304 when the request's If-None-Match already has it."""
+    etag = body_etag(body)
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    # Per-user data that changes as payment completes: always revalidate.
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -1,5 +1,75 @@
-from rest_framework.test import APITestCase
+import asyncio
+import base64
+import datetime
+import gzip
+import heapq
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from pathlib import Path
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from rest_framework.test import APIClient, APITestCase
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+
+from config import schema as openapi_schema
+from config.database import database_from_env
+
+from benchmarks.factories import seed as seed_benchmark_data, teardown as teardown_benchmark_data
+from benchmarks.runner import compare, run_suite
+from benchmarks.scenarios import SCENARIOS, missing_routes
+
+from . import async_views
+from . import ids
+from . import metrics
+from . import status_poll
+from .events import BROKER
+from .management.commands.profile_startup import parse_importtime
+from .admission import ADMITTED, REJECTED, TICKET_HEADER, AdmissionController, TokenBucket, client_key_for
+from .models import (
+    UserProfile, Booking, BookingDraft, PaymentCallbackReceipt, PaymentJob, PaymentTransaction, Seat, WalletLedgerEntry,
+)
+from .caching import LocalLRU, TieredCache
+from .inventory import (
+    AVAILABILITY_CACHE, NoBerthAvailable, allocate_berth, availability, create_train_run, segment_availability,
+)
+from .pagination import MAX_PAGE_SIZE
+from .hashing import HashingBusy, HashingPool, check_password as pooled_check_password, hash_password
+from .profile_cache import PROFILE_CACHE, profile_data
+from .scheduler import TatkalScheduler, window_opens_at
+from .serializers import BookingCreateSerializer, BookingDraftSerializer
+from .gateway import GatewayError, MockGateway
+from .jobs import BACKOFF_MAX, backoff_delay, claim_jobs, drain
+from .services import apply_payment_callback, initiate_payment
+from .wallet import (
+    credit_wallet, debit_wallet, compact_wallet, pay_bookings_via_wallet, rebuild_snapshots, verify_snapshots,
+    STRATEGY_ATOMIC, STRATEGY_LOCKED, STRATEGY_OPTIMISTIC, SNAPSHOT_GRACE,
+)
 
 class HealthTests(APITestCase):
     def test_health(self):
@@ -35,3 +105,2249 @@ class UserProfileRegistrationTests(APITestCase):
         elif response.status_code == 400:
             # User already exists, should give "User already exists."
             self.assertEqual(response.data.get("error"), "User already exists.")
+
+
+class AutoFillSuggestionTests(APITestCase):
+    def test_get_returns_the_profile_fields_the_form_prefills(self):
+        user = User.objects.create_user(username="filler", password="x")
+        profile = UserProfile.objects.create(
+            user=user, full_name="Fill Me", age=28, address="4 Form St", preferred_berth="upper",
+        )
+        response = self.client.get(reverse("auto_fill_suggestions", args=[profile.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            "full_name": "Fill Me", "age": 28, "address": "4 Form St", "preferred_berth": "upper",
+            "auto_fill_enabled": True,
+        })
+
+
+class WalletDebitEngineTests(TransactionTestCase):
+    """Concurrency stress test for the conditional-UPDATE wallet debit path."""
+
+    PARALLEL_DEBITS = 1000
+    WORKERS = 8
+    # Generous bound: SQLite serialises writers, a real server backend is far tighter.
+    P99_BOUND_SECONDS = 2.0
+
+    def setUp(self):
+        user = User.objects.create_user(username="walletstress", password="x")
+        self.profile = UserProfile.objects.create(
+            user=user, full_name="Wallet Stress", age=30, address="1 Load St",
+            wallet_balance=Decimal("750.00"),
+        )
+
+    def _debit(self, strategy):
+        try:
+            start = time.perf_counter()
+            ok = debit_wallet(self.profile.pk, Decimal("1.00"), strategy=strategy)
+            return ok, time.perf_counter() - start
+        finally:
+            connection.close()
+
+    def _stress(self, strategy):
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(lambda _: self._debit(strategy), range(self.PARALLEL_DEBITS)))
+        successes = sum(1 for ok, _ in results if ok)
+        latencies = sorted(elapsed for _, elapsed in results)
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        self.profile.refresh_wallet()
+        # Exactly 750 debits fit; every other call must be refused, never overdrawn.
+        self.assertEqual(successes, 750)
+        self.assertEqual(self.profile.wallet_balance, Decimal("0.00"))
+        self.assertLess(p99, self.P99_BOUND_SECONDS)
+
+    def test_parallel_atomic_debits_are_exact(self):
+        self._stress(STRATEGY_ATOMIC)
+
+    def test_parallel_optimistic_debits_are_exact(self):
+        self._stress(STRATEGY_OPTIMISTIC)
+
+    def test_debit_refuses_overdraft_and_non_positive_amounts(self):
+        self.assertFalse(debit_wallet(self.profile.pk, Decimal("750.01")))
+        self.assertFalse(debit_wallet(self.profile.pk, Decimal("0")))
+        self.assertTrue(debit_wallet(self.profile.pk, Decimal("500.00"), strategy=STRATEGY_LOCKED))
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.wallet_balance, Decimal("250.00"))
+        self.assertEqual(self.profile.wallet_version, 1)
+
+    def test_try_pay_via_wallet_marks_booking_paid(self):
+        booking = Booking.objects.create(
+            user_profile=self.profile, source="NDLS", destination="BCT",
+            journey_date=datetime.date(2026, 1, 1), passenger_name="P", passenger_age=30,
+            passenger_sex="M", fare=Decimal("250.00"),
+        )
+        self.assertTrue(booking.try_pay_via_wallet())
+        self.assertEqual(booking.user_profile.wallet_balance, Decimal("500.00"))
+        self.assertFalse(booking.try_pay_via_wallet())
+        booking.refresh_from_db()
+        self.assertEqual(booking.booking_status, "booked")
+
+
+class WalletLedgerTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="ledger", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Ledger User", age=40, address="2 Ledger Rd")
+
+    def test_deposit_appends_entry_without_touching_snapshot(self):
+        self.profile.deposit_wallet("100.00")
+        self.profile.deposit_wallet("50.00")
+        self.assertEqual(self.profile.wallet_balance, Decimal("0.00"))
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("150.00"))
+        self.assertEqual(self.profile.wallet_entries.count(), 2)
+
+    def test_debit_spends_pending_credits_and_records_entry(self):
+        self.profile.deposit_wallet("100.00")
+        self.assertTrue(self.profile.deduct_wallet("80.00"))
+        self.assertFalse(self.profile.deduct_wallet("30.00"))
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("20.00"))
+        self.assertEqual(
+            list(self.profile.wallet_entries.order_by("id").values_list("kind", "amount")),
+            [(WalletLedgerEntry.KIND_DEPOSIT, Decimal("100.00")), (WalletLedgerEntry.KIND_DEBIT, Decimal("-80.00"))],
+        )
+
+    def test_compaction_folds_settled_credits_only(self):
+        self.profile.deposit_wallet("100.00")
+        self.assertFalse(compact_wallet(self.profile.pk))
+        self.assertTrue(compact_wallet(self.profile.pk, now=timezone.now() + SNAPSHOT_GRACE * 2))
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.wallet_balance, Decimal("100.00"))
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("100.00"))
+        self.assertEqual(verify_snapshots([self.profile.pk]), [])
+
+    def test_rebuild_and_verify_detect_and_repair_drift(self):
+        self.profile.deposit_wallet("70.00")
+        self.profile.deduct_wallet("20.00")
+        UserProfile.objects.filter(pk=self.profile.pk).update(wallet_balance=Decimal("999.00"))
+        self.assertEqual(len(verify_snapshots([self.profile.pk])), 1)
+        self.assertEqual(profile_data(self.profile.pk)["wallet_balance"], "1069.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rebuild_snapshots([self.profile.pk], now=timezone.now() + SNAPSHOT_GRACE * 2), 1)
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.wallet_balance, Decimal("50.00"))
+        self.assertEqual(profile_data(self.profile.pk)["wallet_balance"], "50.00")
+        self.assertEqual(verify_snapshots([self.profile.pk]), [])
+        call_command("wallet_snapshots", "--verify", stdout=StringIO())
+
+    def test_cancel_refunds_wallet_paid_booking(self):
+        self.profile.deposit_wallet("300.00")
+        booking = Booking.objects.create(
+            user_profile=self.profile, source="NDLS", destination="BCT",
+            journey_date=datetime.date(2026, 1, 1), passenger_name="P", passenger_age=30,
+            passenger_sex="F", fare=Decimal("120.00"),
+        )
+        self.assertTrue(booking.try_pay_via_wallet())
+        response = self.client.post(f"/api/bookings/{booking.pk}/cancel/", {}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("300.00"))
+
+    def test_second_cancel_does_not_refund_again(self):
+        self.profile.deposit_wallet("300.00")
+        booking = Booking.objects.create(
+            user_profile=self.profile, source="NDLS", destination="BCT",
+            journey_date=datetime.date(2026, 1, 1), passenger_name="P", passenger_age=30,
+            passenger_sex="F", fare=Decimal("120.00"),
+        )
+        self.assertTrue(booking.try_pay_via_wallet())
+        first = self.client.post(f"/api/bookings/{booking.pk}/cancel/", {}, format="json")
+        second = self.client.post(f"/api/bookings/{booking.pk}/cancel/", {}, format="json")
+        self.assertEqual((first.status_code, second.status_code), (200, 400))
+        self.assertEqual(self.profile.wallet_entries.filter(kind=WalletLedgerEntry.KIND_REFUND).count(), 1)
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("300.00"))
+
+
+class GroupBookingTests(APITestCase):
+    url = "/api/create_group_booking/"
+
+    def setUp(self):
+        user = User.objects.create_user(username="family", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Family Head", age=45, address="3 Home St")
+
+    def _payload(self, count, fare="100.00"):
+        return {
+            "user_profile_id": self.profile.pk, "source": "NDLS", "destination": "HWH",
+            "journey_date": "2026-12-01",
+            "passengers": [
+                {"passenger_name": f"Member {i}", "passenger_age": 10 + i, "passenger_sex": "M",
+                 "preferred_berth": "lower", "fare": fare}
+                for i in range(count)
+            ],
+        }
+
+    def test_group_booking_debits_combined_fare_once(self):
+        self.profile.deposit_wallet("400.00")
+        response = self.client.post(self.url, self._payload(4), format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data["wallet_auto_debited"])
+        self.assertEqual(len(response.data["bookings"]), 4)
+        self.assertEqual(Booking.objects.filter(user_profile=self.profile, paid=True).count(), 4)
+        # One conditional debit of the combined fare, recorded as one ledger entry per booking paid.
+        debits = self.profile.wallet_entries.filter(kind=WalletLedgerEntry.KIND_DEBIT)
+        self.assertEqual(sorted(debits.values_list("booking_id", "amount")), [
+            (booking["id"], Decimal("-100.00")) for booking in sorted(response.data["bookings"], key=lambda b: b["id"])
+        ])
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("0.00"))
+
+    def test_group_booking_is_all_or_nothing_on_insufficient_funds(self):
+        self.profile.deposit_wallet("250.00")
+        response = self.client.post(self.url, self._payload(3), format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.data["wallet_auto_debited"])
+        self.assertFalse(Booking.objects.filter(paid=True).exists())
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("250.00"))
+
+    def test_group_booking_rejects_more_than_six_passengers(self):
+        response = self.client.post(self.url, self._payload(7), format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_group_booking_validates_every_passenger(self):
+        payload = self._payload(2)
+        payload["passengers"][1]["passenger_age"] = 0
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+
+class QueryCountRegressionTests(APITestCase):
+    """Listing and status endpoints must issue a constant number of queries regardless of row count."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="frequent", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Frequent Flyer", age=50, address="4 Rail Rd")
+        self.profile.deposit_wallet("10.00")
+
+    def _seed(self, count):
+        Booking.objects.bulk_create(
+            Booking(
+                user_profile=self.profile, source="NDLS", destination="MAS",
+                journey_date=datetime.date(2026, 6, 1), passenger_name=f"P{i}", passenger_age=30,
+                passenger_sex="M", fare=Decimal("10.00"),
+            )
+            for i in range(count)
+        )
+
+    def _assert_get_bookings_queries(self, count):
+        """Render every one of `count` bookings, page by page, at a constant query count per page."""
+        self._seed(count)
+        seen = []
+        url = f"/api/get_bookings/{self.profile.user_id}/?limit={MAX_PAGE_SIZE}"
+        while url:
+            # profile id lookup, bookings, prefetched profile with user join and pending credit
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertEqual(response.data[0]["user_profile"]["wallet_balance"], "10.00")
+            seen.extend(row["id"] for row in response.data)
+            link = response.get("Link")
+            url = link[1:link.index(">")] if link else None
+        self.assertEqual(len(seen), count)
+        self.assertEqual(len(set(seen)), count)
+
+    def test_get_bookings_single_booking(self):
+        self._assert_get_bookings_queries(1)
+
+    def test_get_bookings_hundred_bookings(self):
+        self._assert_get_bookings_queries(100)
+
+    def test_get_bookings_ten_thousand_bookings(self):
+        self._assert_get_bookings_queries(10000)
+
+    def test_booking_status_and_payment_status_are_constant(self):
+        self._seed(1)
+        booking = Booking.objects.get()
+        payment = PaymentTransaction.objects.create(booking=booking, order_id="order_x", amount=Decimal("10.00"))
+        with self.assertNumQueries(2):
+            self.client.get(f"/api/bookings/{booking.pk}/")
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/payment/{payment.pk}/status/")
+        self.assertEqual(response.data["booking"]["user_profile"]["user"], "frequent")
+
+    def test_profile_list_is_constant(self):
+        for i in range(20):
+            user = User.objects.create_user(username=f"bulk{i}", password="x")
+            UserProfile.objects.create(user=user, full_name=f"Bulk {i}", age=20, address="x")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/user_profiles/")
+        self.assertEqual(len(response.data), 21)
+
+
+class BookingHistoryPaginationTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="historian", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Historian", age=60, address="5 Past Ln")
+        Booking.objects.bulk_create(
+            Booking(
+                user_profile=self.profile, source="SBC", destination="MAS",
+                journey_date=datetime.date(2026, 3, 1), passenger_name=f"P{i}", passenger_age=30,
+                passenger_sex="F", fare=Decimal("1.00"),
+            )
+            for i in range(25)
+        )
+        # Identical timestamps for half the history force the id tie-breaker.
+        same_instant = timezone.now()
+        Booking.objects.filter(pk__in=Booking.objects.order_by("pk").values_list("pk", flat=True)[:12]).update(
+            booking_time=same_instant
+        )
+        self.url = f"/api/get_bookings/{user.pk}/"
+
+    def test_cursor_walk_returns_every_booking_once_in_order(self):
+        seen = []
+        url = f"{self.url}?limit=7"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row["id"] for row in response.data)
+            link = response.get("Link")
+            url = link[1:link.index(">")] if link else None
+        expected = list(Booking.objects.order_by("-booking_time", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_ndjson_stream_returns_full_history(self):
+        response = self.client.get(f"{self.url}?stream=ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[0])["user_profile"]["user"], "historian")
+
+    def test_invalid_cursor_and_limit_are_rejected(self):
+        self.assertEqual(self.client.get(f"{self.url}?cursor=not-a-cursor").status_code, 400)
+        self.assertEqual(self.client.get(f"{self.url}?limit=zero").status_code, 400)
+
+    @staticmethod
+    def _cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        booking = Booking.objects.order_by("id").first()
+        bad = {
+            "/api/user_profiles/": [["abc"], [True], [1.5]],
+            self.url: [
+                ["abc", 1], [{"a": 1}, 1], ["2026-03-01T10:00:00", 1],
+                [booking.booking_time.isoformat(), "1"], [booking.booking_time.isoformat(), None],
+            ],
+        }
+        for url, cursors in bad.items():
+            for values in cursors:
+                with self.subTest(url=url, cursor=values):
+                    response = self.client.get(f"{url}?cursor={self._cursor(values)}")
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.data, {"error": "Invalid cursor."})
+        self.assertEqual(
+            self.client.get(f"{self.url}?cursor={self._cursor([booking.booking_time.isoformat(), booking.pk])}")
+            .status_code,
+            200,
+        )
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    EXPLAIN every hot lookup and assert the planner picks an index, not a full scan.
+    Seed size defaults small for CI; set EXPLAIN_SEED_ROWS=1000000 for the full-size check.
+    """
+    SEED_ROWS = int(os.environ.get("EXPLAIN_SEED_ROWS", "2000"))
+
+    @classmethod
+    def setUpTestData(cls):
+        profiles = []
+        for i in range(20):
+            user = User.objects.create_user(username=f"explain{i}", password="x")
+            profiles.append(UserProfile.objects.create(user=user, full_name=f"E{i}", age=30, address="x"))
+        statuses = ["initiated", "payment_pending", "booked", "failed", "cancelled"]
+        batch = []
+        for i in range(cls.SEED_ROWS):
+            batch.append(Booking(
+                user_profile=profiles[i % len(profiles)], source="NDLS", destination="BCT",
+                journey_date=datetime.date(2026, 1, 1) + datetime.timedelta(days=i % 120),
+                passenger_name="P", passenger_age=30, passenger_sex="M", fare=Decimal("1.00"),
+                booking_status=statuses[i % len(statuses)], pnr=f"{i:010d}",
+            ))
+            if len(batch) == 5000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+        bookings = list(Booking.objects.values_list("pk", flat=True)[:500])
+        PaymentTransaction.objects.bulk_create(
+            PaymentTransaction(booking_id=pk, order_id=f"order_{pk}", payment_id=f"pay_{pk}", amount=Decimal("1.00"))
+            for pk in bookings
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.profile = profiles[0]
+
+    def assertIndexScan(self, queryset, table):
+        plan = queryset.explain()
+        if connection.vendor == "sqlite":
+            table_lines = [line for line in plan.splitlines() if table in line]
+            self.assertTrue(table_lines, plan)
+            for line in table_lines:
+                self.assertIn("USING", line, plan)
+            # The index must also deliver the ORDER BY, not just the filter.
+            self.assertNotIn("TEMP B-TREE", plan)
+        else:
+            self.assertNotIn("Seq Scan", plan)
+            self.assertIn("Index", plan)
+
+    def test_booking_history_uses_index(self):
+        self.assertIndexScan(
+            Booking.objects.filter(user_profile=self.profile).order_by("-booking_time", "-id")[:50], "api_booking"
+        )
+
+    def test_status_sweep_uses_index(self):
+        self.assertIndexScan(
+            Booking.objects.filter(booking_status="payment_pending", journey_date__lt=datetime.date(2026, 1, 10)),
+            "api_booking",
+        )
+
+    def test_pnr_lookup_uses_index(self):
+        self.assertIndexScan(Booking.objects.filter(pnr="0000000042"), "api_booking")
+
+    def test_payment_callback_lookups_use_index(self):
+        self.assertIndexScan(PaymentTransaction.objects.filter(order_id="order_1"), "api_paymenttransaction")
+        self.assertIndexScan(PaymentTransaction.objects.filter(payment_id="pay_1"), "api_paymenttransaction")
+
+
+class UniqueIdMigrationTests(TransactionTestCase):
+    """Migration 0006 must apply over rows that already repeat a PNR, order id or payment id."""
+    before, after = ("api", "0005_booking_history_index"), ("api", "0006_hot_lookup_indexes")
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def _migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def test_duplicate_ids_are_reissued_or_cleared(self):
+        apps = self._migrate(self.before)
+        user = apps.get_model("auth", "User").objects.create(username="legacy")
+        profile = apps.get_model("api", "UserProfile").objects.create(
+            user_id=user.pk, full_name="Legacy", age=40, address="x"
+        )
+        Booking, PaymentTransaction = apps.get_model("api", "Booking"), apps.get_model("api", "PaymentTransaction")
+        bookings = [
+            Booking.objects.create(
+                user_profile_id=profile.pk, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 1, 1),
+                passenger_name="P", passenger_age=30, passenger_sex="M", pnr=pnr,
+            )
+            for pnr in ("1234567890", "1234567890", "1234567890", "", "")
+        ]
+        for booking, (order_id, payment_id) in zip(bookings, [("order_a", "pay_a"), ("order_a", "pay_a"), ("", "")]):
+            PaymentTransaction.objects.create(booking_id=booking.pk, order_id=order_id, payment_id=payment_id, amount=1)
+
+        # Self-contained: the migration must not depend on the live id generator or its settings.
+        with mock.patch("api.ids.new_pnr", side_effect=AssertionError("migration used api.ids")):
+            apps = self._migrate(self.after)
+        Booking, PaymentTransaction = apps.get_model("api", "Booking"), apps.get_model("api", "PaymentTransaction")
+        pnrs = list(Booking.objects.order_by("id").values_list("pnr", flat=True))
+        self.assertEqual(pnrs[:3], ["1234567890", f"R{bookings[1].pk:019d}", f"R{bookings[2].pk:019d}"])
+        self.assertEqual(pnrs[3:], [None, None])
+        self.assertEqual(
+            list(PaymentTransaction.objects.order_by("id").values_list("order_id", "payment_id")),
+            [("order_a", "pay_a"), (None, None), (None, None)],
+        )
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_connection_runs_in_wal_mode(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite-specific pragmas")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_postgresql_persistent_and_pooled_modes(self):
+        persistent = database_from_env(Path("/tmp"), {"DB_ENGINE": "postgresql", "DB_CONN_MAX_AGE": "120"})
+        self.assertEqual(persistent["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(persistent["CONN_MAX_AGE"], 120)
+        self.assertTrue(persistent["CONN_HEALTH_CHECKS"])
+        pooled = database_from_env(Path("/tmp"), {"DB_ENGINE": "postgresql", "DB_POOL": "1", "DB_POOL_MAX_SIZE": "40"})
+        self.assertEqual(pooled["CONN_MAX_AGE"], 0)
+        self.assertEqual(pooled["OPTIONS"]["pool"]["max_size"], 40)
+        with self.assertRaises(ValueError):
+            database_from_env(Path("/tmp"), {"DB_ENGINE": "oracle"})
+
+
+# Books a whole run as one user in a burst; admission control is tested separately.
+@override_settings(TATKAL_ADMISSION={"ENABLED": False})
+class BerthAllocationTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="traveller", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Traveller", age=28, address="6 Track Rd")
+        self.profile.deposit_wallet("1000.00")
+        self.run = create_train_run("12951", "NDLS", "BCT", datetime.date(2026, 11, 1), coaches=1, berths_per_coach=8)
+
+    def _book(self, berth="lower"):
+        return self.client.post("/api/create_booking/", {
+            "user_profile_id": self.profile.pk, "source": "NDLS", "destination": "BCT",
+            "journey_date": "2026-11-01", "passenger_name": "P", "passenger_age": 30,
+            "passenger_sex": "F", "preferred_berth": berth, "fare": "10.00",
+        }, format="json")
+
+    def test_preferred_berth_then_fallback(self):
+        first, second, third = self._book("side_upper"), self._book("side_upper"), self._book("lower")
+        self.assertEqual(first.data["seat"], {"coach": "S1", "number": 8, "berth_type": "side_upper"})
+        # The only side upper is gone, so the next preference in line (upper) is used.
+        self.assertEqual(second.data["seat"]["berth_type"], "upper")
+        self.assertEqual(third.data["seat"]["berth_type"], "lower")
+
+    def test_sold_out_run_rejects_booking_without_debit(self):
+        for _ in range(8):
+            self.assertEqual(self._book().status_code, 201)
+        response = self._book()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 8)
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("920.00"))
+
+    def test_cancel_returns_berth_to_pool(self):
+        booking_id = self._book("middle").data["id"]
+        self.assertEqual(availability(self.run.pk)["middle"], 1)
+        self.client.post(f"/api/bookings/{booking_id}/cancel/", {}, format="json")
+        self.assertEqual(availability(self.run.pk)["middle"], 2)
+        self.assertFalse(Seat.objects.filter(booking_id=booking_id).exists())
+
+    def test_segment_without_inventory_books_without_berth(self):
+        booking = Booking.objects.create(
+            user_profile=self.profile, source="SBC", destination="MAS", journey_date=datetime.date(2026, 11, 1),
+            passenger_name="P", passenger_age=30, passenger_sex="M",
+        )
+        self.assertIsNone(allocate_berth(booking))
+
+
+class ConcurrentCancellationTests(TransactionTestCase):
+    def test_concurrent_cancels_refund_once(self):
+        user = User.objects.create_user(username="canceller", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Canceller", age=30, address="x")
+        profile.deposit_wallet("300.00")
+        booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 1, 1),
+            passenger_name="P", passenger_age=30, passenger_sex="F", fare=Decimal("120.00"),
+        )
+        self.assertTrue(booking.try_pay_via_wallet())
+
+        def cancel(_):
+            try:
+                return APIClient().post(f"/api/bookings/{booking.pk}/cancel/", {}, format="json").status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = sorted(pool.map(cancel, range(8)))
+        self.assertEqual(statuses, [200] + [400] * 7)
+        self.assertEqual(profile.wallet_entries.filter(kind=WalletLedgerEntry.KIND_REFUND).count(), 1)
+        profile.refresh_wallet()
+        self.assertEqual(profile.available_wallet_balance, Decimal("300.00"))
+
+
+class ConcurrentBerthAllocationTests(TransactionTestCase):
+    REQUESTERS = 32
+
+    def test_concurrent_requesters_never_share_a_berth(self):
+        user = User.objects.create_user(username="crowd", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Crowd", age=30, address="x")
+        run = create_train_run("12952", "BCT", "NDLS", datetime.date(2026, 11, 2), coaches=2, berths_per_coach=72)
+
+        def requester(_):
+            booked = 0
+            try:
+                while True:
+                    try:
+                        with transaction.atomic():
+                            booking = Booking.objects.create(
+                                user_profile=profile, source="BCT", destination="NDLS",
+                                journey_date=datetime.date(2026, 11, 2), passenger_name="P",
+                                passenger_age=30, passenger_sex="M",
+                            )
+                            allocate_berth(booking)
+                        booked += 1
+                    except NoBerthAvailable:
+                        return booked
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.REQUESTERS) as pool:
+            booked = sum(pool.map(requester, range(self.REQUESTERS)))
+        self.assertEqual(booked, 144)
+        self.assertEqual(Seat.objects.filter(run=run, booking__isnull=True).count(), 0)
+        self.assertEqual(Booking.objects.count(), 144)
+
+
+class AvailabilityCacheTests(APITestCase):
+    url = "/api/availability/?source=MAS&destination=SBC&journey_date=2026-11-05"
+
+    def setUp(self):
+        user = User.objects.create_user(username="checker", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Checker", age=33, address="7 Poll St")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run = create_train_run("12007", "MAS", "SBC", datetime.date(2026, 11, 5), coaches=1, berths_per_coach=8)
+        # Start each test with empty tiers, without the tombstones the run's creation left behind.
+        AVAILABILITY_CACHE.clear_local()
+        caches["shared"].clear()
+
+    def test_repeat_reads_are_served_from_cache(self):
+        before = AVAILABILITY_CACHE.stats()
+        with self.assertNumQueries(1):
+            first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.data["availability"], {
+            "lower": 2, "middle": 2, "upper": 2, "side_lower": 1, "side_upper": 1,
+        })
+        self.assertEqual(second.data, first.data)
+        after = AVAILABILITY_CACHE.stats()
+        self.assertEqual(after["misses"] - before["misses"], 5)
+        self.assertEqual(after["local_hits"] - before["local_hits"], 5)
+
+    def test_shared_tier_refills_an_empty_local_tier(self):
+        self.client.get(self.url)
+        AVAILABILITY_CACHE.clear_local()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url + "&berth=lower")
+        self.assertEqual(response.data["availability"], {"lower": 2})
+
+    def test_booking_and_cancellation_invalidate_segment(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.client.post("/api/create_booking/", {
+                "user_profile_id": self.profile.pk, "source": "MAS", "destination": "SBC",
+                "journey_date": "2026-11-05", "passenger_name": "P", "passenger_age": 30,
+                "passenger_sex": "F", "preferred_berth": "lower", "fare": "0.00",
+            }, format="json").data
+        self.assertEqual(segment_availability("MAS", "SBC", datetime.date(2026, 11, 5))["lower"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/bookings/{booking['id']}/cancel/", {}, format="json")
+        self.assertEqual(self.client.get(self.url).data["availability"]["lower"], 2)
+
+    def test_count_read_before_a_booking_commits_does_not_refill_the_shared_tier(self):
+        # Another worker process: its own local tier and generations, the same shared tier and settings.
+        other = TieredCache(
+            AVAILABILITY_CACHE.prefix, shared_ttl=AVAILABILITY_CACHE.shared_ttl,
+            shared_alias=AVAILABILITY_CACHE.shared_alias, tombstone_ttl=AVAILABILITY_CACHE.tombstone_ttl,
+        )
+
+        def book():
+            with mock.patch("api.inventory.AVAILABILITY_CACHE", AVAILABILITY_CACHE), \
+                    self.captureOnCommitCallbacks(execute=True):
+                self.client.post("/api/create_booking/", {
+                    "user_profile_id": self.profile.pk, "source": "MAS", "destination": "SBC",
+                    "journey_date": "2026-11-05", "passenger_name": "P", "passenger_age": 30,
+                    "passenger_sex": "F", "preferred_berth": "lower", "fare": "0.00",
+                }, format="json")
+
+        def fill_around_a_booking(keys, loader):
+            # The other worker counts berths, this worker books one and invalidates, then the other fills.
+            return TieredCache.get_many(other, keys, lambda missing: (loader(missing), book())[0])
+
+        with mock.patch.object(other, "get_many", fill_around_a_booking), \
+                mock.patch("api.inventory.AVAILABILITY_CACHE", other):
+            stale = segment_availability("MAS", "SBC", datetime.date(2026, 11, 5))
+        self.assertEqual(stale["lower"], 2)
+        AVAILABILITY_CACHE.clear_local()
+        self.assertEqual(self.client.get(self.url).data["availability"]["lower"], 1)
+
+    def test_invalid_query_is_rejected(self):
+        self.assertEqual(self.client.get("/api/availability/?source=MAS").status_code, 400)
+        self.assertEqual(self.client.get(self.url + "&berth=window").status_code, 400)
+
+    def test_local_lru_evicts_least_recently_used(self):
+        lru = LocalLRU(max_size=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+        self.assertEqual(lru.evictions, 1)
+
+    def test_local_tier_expires_after_ttl(self):
+        cache = TieredCache("ttl-test", local_ttl=0.0, shared_alias=None)
+        loads = []
+        cache.get("k", lambda: loads.append(1) or "v")
+        cache.get("k", lambda: loads.append(1) or "v")
+        self.assertEqual(len(loads), 2)
+
+
+class AsyncViewTests(TestCase):
+    """The async endpoints must answer exactly like their DRF counterparts."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="asyncuser", password="x")
+        self.user = user
+        self.profile = UserProfile.objects.create(user=user, full_name="Async User", age=31, address="8 Loop Rd")
+
+    async def test_async_deposit_and_booking_status(self):
+        response = await self.async_client.post(
+            "/api/async/deposit_wallet/", {"user_id": self.user.pk, "amount": "75.50"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"wallet_balance": 75.5, "deposited": "75.50"})
+
+        response = await self.async_client.post("/api/async/create_booking/", {
+            "user_profile_id": self.profile.pk, "source": "NDLS", "destination": "BCT",
+            "journey_date": "2026-12-01", "passenger_name": "P", "passenger_age": 30,
+            "passenger_sex": "M", "preferred_berth": "lower", "fare": "50.00",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertTrue(created["wallet_auto_debited"])
+        self.assertEqual(created["user_profile"]["wallet_balance"], "25.50")
+
+        async_status = (await self.async_client.get(f"/api/async/bookings/{created['id']}/")).json()
+        sync_status = await sync_to_async(lambda: self.client.get(f"/api/bookings/{created['id']}/").json())()
+        self.assertEqual(async_status, sync_status)
+
+    async def test_async_payment_callback(self):
+        booking = await Booking.objects.acreate(
+            user_profile=self.profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 1),
+            passenger_name="P", passenger_age=30, passenger_sex="M", booking_status="payment_pending",
+        )
+        payment = await PaymentTransaction.objects.acreate(booking=booking, order_id="order_async", amount=1)
+        body = {"payment_transaction_id": payment.pk, "payment_id": "pay_async", "status": "success"}
+        accepted = await self.async_client.post("/api/async/payment/callback/", body, content_type="application/json")
+        self.assertEqual(accepted.status_code, 202)
+        await sync_to_async(drain)()
+        response = await self.async_client.post("/api/async/payment/callback/", body, content_type="application/json")
+        self.assertEqual(response.json()["booking_status"], "booked")
+        missing = await self.async_client.post(
+            "/api/async/payment/callback/", {"payment_transaction_id": 0}, content_type="application/json"
+        )
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_async_views_reject_bad_input(self):
+        self.assertEqual((await self.async_client.get("/api/async/bookings/0/")).status_code, 404)
+        bad_json = await self.async_client.post(
+            "/api/async/create_booking/", "not json", content_type="application/json"
+        )
+        self.assertEqual(bad_json.status_code, 400)
+        unknown_user = await self.async_client.post(
+            "/api/async/deposit_wallet/", {"user_id": 0, "amount": "1.00"}, content_type="application/json"
+        )
+        self.assertEqual(unknown_user.status_code, 404)
+
+
+class PaymentCallbackIdempotencyTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="payer", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Payer", age=41, address="9 Gateway Rd")
+        self.booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 3),
+            passenger_name="P", passenger_age=30, passenger_sex="M", booking_status="payment_pending",
+        )
+        self.payment = PaymentTransaction.objects.create(booking=self.booking, order_id="order_idem", amount=1)
+        self.body = {"payment_transaction_id": self.payment.pk, "payment_id": "pay_1", "status": "success"}
+
+    def _callback(self, body):
+        """Deliver a callback, let the payment workers reconcile it, and return the stored response."""
+        accepted = self.client.post("/api/payment/callback/", body, format="json")
+        if accepted.status_code == 202:
+            drain()
+        return self.client.post("/api/payment/callback/", body, format="json").data
+
+    def test_redelivered_callback_returns_stored_result_without_writes(self):
+        first = self._callback(self.body)
+        with self.assertNumQueries(1):
+            replay = self.client.post("/api/payment/callback/", self.body, format="json").data
+        self.assertEqual(replay, first)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.pnr, first["pnr"])
+
+    def test_success_is_final_for_the_order(self):
+        first = self._callback(self.body)
+        late_failure = self._callback({**self.body, "payment_id": "pay_2", "status": "failed"})
+        self.assertEqual(late_failure, first)
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.payment_id), ("success", "pay_1"))
+
+    def test_failed_attempt_can_be_followed_by_success(self):
+        failed = self._callback({**self.body, "status": "failed"})
+        self.assertEqual(failed["booking_status"], "failed")
+        succeeded = self._callback({**self.body, "payment_id": "pay_2"})
+        self.assertEqual(succeeded["booking_status"], "booked")
+
+    def test_failed_payment_releases_the_berth_and_success_reclaims_one(self):
+        run = create_train_run("12951", "NDLS", "BCT", self.booking.journey_date, coaches=1, berths_per_coach=1)
+        seat = allocate_berth(self.booking)
+        self._callback({**self.body, "status": "failed"})
+        seat.refresh_from_db()
+        self.assertIsNone(seat.booking_id)
+        self.assertEqual(sum(availability(run.pk).values()), 1)
+        succeeded = self._callback({**self.body, "payment_id": "pay_2"})
+        self.assertEqual(succeeded["booking_status"], "booked")
+        self.assertTrue(Seat.objects.filter(booking=self.booking).exists())
+
+    def test_success_after_failure_fails_when_the_released_berth_was_sold(self):
+        create_train_run("12951", "NDLS", "BCT", self.booking.journey_date, coaches=1, berths_per_coach=1)
+        allocate_berth(self.booking)
+        self._callback({**self.body, "status": "failed"})
+        allocate_berth(Booking.objects.create(
+            user_profile=self.booking.user_profile, source="NDLS", destination="BCT",
+            journey_date=self.booking.journey_date, passenger_name="Q", passenger_age=30, passenger_sex="F",
+        ))
+        succeeded = self._callback({**self.body, "payment_id": "pay_2"})
+        self.assertEqual((succeeded["booking_status"], succeeded["pnr"]), ("failed", None))
+
+    def test_success_after_cancellation_leaves_the_booking_cancelled(self):
+        create_train_run("12951", "NDLS", "BCT", self.booking.journey_date, coaches=1, berths_per_coach=1)
+        allocate_berth(self.booking)
+        self.client.post(reverse("tatkal_booking_cancel", args=[self.booking.pk]), {}, format="json")
+        late = self._callback(self.body)
+        self.assertEqual(late, {"booking_status": "cancelled", "pnr": None, "ignored": "booking is cancelled"})
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.booking_status, self.booking.pnr), ("cancelled", None))
+        self.assertFalse(Seat.objects.filter(booking=self.booking).exists())
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.payment_id), ("success", "pay_1"))
+
+    def test_success_for_a_booking_already_booked_keeps_its_pnr(self):
+        self.booking.booking_status, self.booking.pnr = "booked", "PNRWALLET01"
+        self.booking.save(update_fields=["booking_status", "pnr"])
+        first = self._callback(self.body)
+        second = self._callback({**self.body, "payment_id": "pay_2"})
+        self.assertEqual(first, {"booking_status": "booked", "pnr": "PNRWALLET01", "ignored": "booking is booked"})
+        self.assertEqual((second["booking_status"], second["pnr"]), ("booked", "PNRWALLET01"))
+        failure = self._callback({**self.body, "payment_id": "pay_3", "status": "failed"})
+        self.assertEqual(failure["booking_status"], "booked")
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.booking_status, self.booking.pnr), ("booked", "PNRWALLET01"))
+
+    def test_callback_for_a_payment_without_a_booking_is_ignored(self):
+        orphan = PaymentTransaction.objects.create(order_id="order_orphan", amount=1)
+        result = apply_payment_callback(orphan.pk, "pay_orphan", "success")
+        self.assertEqual(result, {"booking_status": None, "pnr": None, "ignored": "payment has no booking"})
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, "success")
+        self.assertEqual(apply_payment_callback(orphan.pk, "pay_orphan", "success"), result)
+
+
+class ConcurrentCallbackReplayTests(TransactionTestCase):
+    REPLAYS = 10000
+    WORKERS = 16
+    # Replays are one indexed read each; even SQLite on a CI box clears this easily.
+    MIN_REPLAYS_PER_SECOND = 500
+
+    def test_ten_thousand_concurrent_duplicates_change_nothing(self):
+        user = User.objects.create_user(username="replayer", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Replayer", age=41, address="x")
+        booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 3),
+            passenger_name="P", passenger_age=30, passenger_sex="M", booking_status="payment_pending",
+        )
+        payment = PaymentTransaction.objects.create(booking=booking, order_id="order_replay", amount=1)
+
+        def deliver(_):
+            try:
+                return apply_payment_callback(payment.pk, "pay_replay", "success")["pnr"]
+            finally:
+                connection.close()
+
+        first_pnr = deliver(None)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            pnrs = set(pool.map(deliver, range(self.REPLAYS)))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(pnrs, {first_pnr})
+        booking.refresh_from_db()
+        self.assertEqual((booking.booking_status, booking.pnr), ("booked", first_pnr))
+        self.assertEqual(PaymentCallbackReceipt.objects.count(), 1)
+        self.assertGreater(self.REPLAYS / elapsed, self.MIN_REPLAYS_PER_SECOND)
+
+
+def _pnrs_in_worker(worker_id, count=20000):
+    settings.ID_WORKER_ID = worker_id
+    return [ids.new_pnr() for _ in range(count)]
+
+
+class IdGeneratorTests(TestCase):
+    def test_ids_are_monotonic_and_carry_their_worker(self):
+        generator = ids.SnowflakeGenerator(7)
+        values = [generator.next_id() for _ in range(10000)]
+        self.assertEqual(values, sorted(set(values)))
+        self.assertEqual({ids.parse_id(value)[1] for value in values}, {7})
+
+    def test_clock_going_backwards_or_sequence_exhaustion_never_repeats(self):
+        now = [1_800_000_000_000 * 1_000_000]
+        generator = ids.SnowflakeGenerator(1, clock=lambda: now[0])
+        values = [generator.next_id() for _ in range(ids.MAX_SEQUENCE + 10)]
+        now[0] -= 5_000 * 1_000_000
+        values += [generator.next_id() for _ in range(10)]
+        self.assertEqual(values, sorted(set(values)))
+
+    def test_rendered_ids_are_fixed_width_and_sortable(self):
+        pnrs = [ids.new_pnr() for _ in range(100)]
+        orders = [ids.new_order_id() for _ in range(100)]
+        self.assertEqual({len(pnr) for pnr in pnrs}, {ids.PNR_DIGITS})
+        self.assertTrue(all(pnr.isdigit() for pnr in pnrs))
+        self.assertEqual({len(order) for order in orders}, {len(ids.ORDER_ID_PREFIX) + ids.ORDER_ID_WIDTH})
+        self.assertEqual(pnrs, sorted(pnrs))
+        self.assertEqual(orders, sorted(orders))
+
+    def test_invalid_worker_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ids.SnowflakeGenerator(ids.MAX_WORKER_ID + 1)
+        for worker_id in ("1024", -1, "seven"):
+            with self.subTest(worker_id=worker_id), override_settings(ID_WORKER_ID=worker_id):
+                with self.assertRaises(ImproperlyConfigured):
+                    ids.configured_worker_id()
+        with override_settings(ID_WORKER_ID="1023"):
+            self.assertEqual(ids.configured_worker_id(), 1023)
+
+    def test_pid_fallback_warns_and_settings_require_a_worker_id_outside_debug(self):
+        with override_settings(ID_WORKER_ID=None), self.assertLogs("api.ids", "WARNING"):
+            self.assertEqual(ids.configured_worker_id(), os.getpid() % (ids.MAX_WORKER_ID + 1))
+        script = "from django.conf import settings; settings.INSTALLED_APPS"
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings", "DJANGO_DEBUG": "0"}
+        env.pop("ID_WORKER_ID", None)
+        run = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertIn("ID_WORKER_ID must be set", run.stderr)
+
+    def test_unique_across_worker_processes(self):
+        ids.new_pnr()  # the forked children must not reuse this process's generator
+        with multiprocessing.get_context("fork").Pool(4) as pool:
+            batches = pool.map(_pnrs_in_worker, range(4))
+        generated = [pnr for batch in batches for pnr in batch]
+        self.assertEqual(len(set(generated)), len(generated))
+        for worker_id, batch in enumerate(batches):
+            self.assertEqual({ids.parse_id(int(pnr))[1] for pnr in batch}, {worker_id})
+
+
+class FlakyGateway(MockGateway):
+    """MockGateway whose next `failures` calls time out."""
+    failures = 0
+
+    def create_order(self, payment):
+        if FlakyGateway.failures:
+            FlakyGateway.failures -= 1
+            raise GatewayError("gateway timed out")
+        return super().create_order(payment)
+
+
+class PaymentJobQueueTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="queued", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Queued", age=33, address="x")
+        self.booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 4),
+            passenger_name="Q", passenger_age=33, passenger_sex="F", booking_status="payment_pending",
+        )
+
+    def _initiate(self):
+        response = self.client.post("/api/payment/initiate/", {"booking_id": self.booking.pk, "amount": "10.00"},
+                                    format="json")
+        self.assertEqual(response.status_code, 202)
+        return response.data
+
+    def _make_due(self):
+        PaymentJob.objects.update(run_after=timezone.now())
+
+    def test_requests_return_at_once_and_workers_complete_the_payment(self):
+        initiated = self._initiate()
+        status_url = initiated["status_url"]
+        self.assertEqual(self.client.get(status_url).data["order_id"], None)
+        self.assertEqual(drain(), 1)
+        order = self.client.get(status_url).data
+        self.assertEqual(order["status"], "pending")
+        self.assertTrue(order["order_id"].startswith("order_"))
+        self.assertIn(order["order_id"], order["payment_response"]["payment_url"])
+
+        body = {"payment_transaction_id": initiated["payment_transaction_id"], "payment_id": "pay_q"}
+        self.assertEqual(self.client.post("/api/payment/callback/", body, format="json").status_code, 202)
+        self.assertEqual(self.client.post("/api/payment/callback/", body, format="json").status_code, 202)
+        self.assertEqual(PaymentJob.objects.filter(kind=PaymentJob.KIND_RECONCILE_CALLBACK).count(), 1)
+        drain()
+        paid = self.client.get(status_url).data
+        self.assertEqual(paid["status"], "success")
+        self.assertEqual(paid["booking"]["booking_status"], "booked")
+        self.assertTrue(paid["booking"]["pnr"])
+
+    @override_settings(PAYMENT_GATEWAY="api.tests.FlakyGateway")
+    def test_transient_gateway_failures_are_retried_with_backoff(self):
+        FlakyGateway.failures = 2
+        self._initiate()
+        for attempt in (1, 2):
+            drain()
+            job = PaymentJob.objects.get()
+            self.assertEqual((job.status, job.attempts), (PaymentJob.STATUS_QUEUED, attempt))
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIn("GatewayError", job.last_error)
+            self.assertEqual(drain(), 0)  # not due yet
+            self._make_due()
+        drain()
+        job = PaymentJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (PaymentJob.STATUS_DONE, 3))
+        self.assertEqual(job.payment_transaction.status, "pending")
+
+    @override_settings(PAYMENT_GATEWAY="api.tests.FlakyGateway")
+    def test_exhausted_order_creation_fails_the_payment(self):
+        FlakyGateway.failures = 100
+        self.addCleanup(setattr, FlakyGateway, "failures", 0)
+        payment = initiate_payment(self.booking, Decimal("10.00"))
+        PaymentJob.objects.update(max_attempts=2)
+        drain()
+        self._make_due()
+        with self.assertLogs("api.jobs", "ERROR"):
+            drain()
+        self.assertEqual(PaymentJob.objects.get().status, PaymentJob.STATUS_FAILED)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "failed")
+
+    def test_job_with_expired_lease_is_reclaimed(self):
+        initiate_payment(self.booking, Decimal("10.00"))
+        self.assertEqual(len(claim_jobs("crashed-worker")), 1)
+        self.assertEqual(drain(), 0)
+        PaymentJob.objects.update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(drain(), 1)
+        self.assertEqual(PaymentJob.objects.get().status, PaymentJob.STATUS_DONE)
+
+    def test_backoff_is_exponential_with_jitter_and_capped(self):
+        for attempt in (1, 3, 5):
+            delay = backoff_delay(attempt)
+            self.assertTrue(2 ** (attempt - 2) <= delay <= 2 ** (attempt - 1))
+        self.assertLessEqual(backoff_delay(50), BACKOFF_MAX)
+
+
+class PaymentWorkerCommandTests(TransactionTestCase):
+    def test_worker_pool_drains_the_queue(self):
+        user = User.objects.create_user(username="pool", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Pool", age=33, address="x")
+        for i in range(20):
+            booking = Booking.objects.create(
+                user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 5),
+                passenger_name=f"P{i}", passenger_age=33, passenger_sex="F",
+            )
+            initiate_payment(booking, Decimal("10.00"))
+        call_command("run_payment_workers", "--once", "--workers", "4", "--batch", "3", stdout=StringIO())
+        self.assertEqual(PaymentJob.objects.filter(status=PaymentJob.STATUS_DONE).count(), 20)
+        self.assertEqual(PaymentTransaction.objects.filter(status="pending", order_id__startswith="order_").count(), 20)
+
+    def test_worker_processes_take_ids_from_an_explicit_in_range_base(self):
+        command = "api.management.commands.run_payment_workers.Command._run_processes"
+        with mock.patch(command) as run_processes:
+            call_command("run_payment_workers", "--processes", "--workers", "3", "--worker-id-base", "1021",
+                         stdout=StringIO())
+        self.assertEqual(run_processes.call_args.args[0], [1021, 1022, 1023])
+        with mock.patch(command) as run_processes:
+            with self.assertRaisesMessage(CommandError, "do not fit in 0..1023"):
+                call_command("run_payment_workers", "--processes", "--workers", "4", "--worker-id-base", "1021")
+            with self.assertRaisesMessage(CommandError, "--worker-id-base"):
+                call_command("run_payment_workers", "--processes", "--workers", "2")
+        run_processes.assert_not_called()
+
+
+class AdmissionControlTests(APITestCase):
+    def setUp(self):
+        self.now = [1000.0]
+        self.clock = lambda: self.now[0]
+
+    def _controller(self, **overrides):
+        conf = {"global_rate": 10, "global_burst": 2, "user_rate": 1, "user_burst": 2, "waiting_room": 3,
+                "ticket_ttl": 30, **overrides}
+        return AdmissionController(clock=self.clock, **conf)
+
+    def test_token_bucket_refills_at_rate_up_to_burst(self):
+        bucket = TokenBucket(rate=2, burst=3, clock=self.clock)
+        self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(bucket.wait_time(), 0.5)
+        self.now[0] += 10
+        self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+
+    def test_user_over_rate_is_shed_with_429(self):
+        controller = self._controller(global_burst=100)
+        outcomes = [controller.admit("ip:203.0.113.1").outcome for _ in range(3)]
+        self.assertEqual(outcomes, [ADMITTED, ADMITTED, REJECTED])
+        self.assertTrue(controller.admit("ip:203.0.113.2").admitted)
+
+    def test_waiting_room_is_fifo_and_bounded(self):
+        controller = self._controller()
+        self.assertTrue(controller.admit("a").admitted)
+        self.assertTrue(controller.admit("b").admitted)
+        queued = [controller.admit(user) for user in ("c", "d", "e")]
+        self.assertEqual([d.position for d in queued], [1, 2, 3])
+        self.assertAlmostEqual(queued[2].eta, 0.3)
+        self.assertEqual(controller.admit("f").reason, "waiting room full")
+        # One token refills; the newest ticket still waits behind the others, the oldest gets in.
+        self.now[0] += 0.1
+        self.assertFalse(controller.admit("e", queued[2].ticket).admitted)
+        self.assertTrue(controller.admit("c", queued[0].ticket).admitted)
+        self.assertEqual(controller.admit("d", queued[1].ticket).position, 1)
+
+    def test_a_ticket_needs_a_token_for_everyone_ahead(self):
+        controller = self._controller(global_burst=1)
+        controller.admit("a")
+        queued = [controller.admit(user) for user in ("b", "c")]
+        self.now[0] += 0.1  # One token: it is held for "b", who is first in line.
+        self.assertEqual(controller.admit("c", queued[1].ticket).position, 2)
+        self.assertEqual(controller.admit("d").position, 3)
+        self.assertTrue(controller.admit("b", queued[0].ticket).admitted)
+        self.now[0] += 0.1
+        self.assertTrue(controller.admit("c", queued[1].ticket).admitted)
+
+    def test_the_first_n_in_line_get_in_once_n_tokens_refill(self):
+        controller = self._controller()
+        controller.admit("a")
+        controller.admit("b")
+        queued = [controller.admit(user) for user in ("c", "d", "e")]
+        self.now[0] += 0.2
+        self.assertTrue(controller.admit("d", queued[1].ticket).admitted)
+        self.assertEqual(controller.admit("e", queued[2].ticket).position, 2)
+        self.assertTrue(controller.admit("c", queued[0].ticket).admitted)
+        self.assertEqual(controller.admit("e", queued[2].ticket).position, 1)
+        self.assertEqual(controller.admit("f").position, 2)
+
+    def test_a_head_ticket_overdue_for_its_retry_loses_its_place(self):
+        controller = self._controller(global_burst=1, head_grace=2)
+        controller.admit("a")
+        queued = [controller.admit(user) for user in ("b", "c")]
+        self.assertEqual(queued[0].retry_after, 1.0)
+        self.now[0] += 1
+        self.assertEqual(controller.admit("c", queued[1].ticket).position, 2)
+        self.now[0] += 2.1  # "b" was due back 1s after queueing; its grace is over.
+        self.assertTrue(controller.admit("c", queued[1].ticket).admitted)
+        self.assertNotEqual(controller.admit("b", queued[0].ticket).ticket, queued[0].ticket)
+
+    def test_queue_drains_at_the_global_rate_with_jittered_retries(self):
+        rate, burst, users = 200, 400, 1000
+        controller = self._controller(global_rate=rate, global_burst=burst, user_burst=5, waiting_room=5000)
+        jitter = random.Random(7)
+        retries = []  # heap of (time, user, ticket)
+        for user in range(users):
+            decision = controller.admit(user)
+            if not decision.admitted:
+                heapq.heappush(retries, (math.ceil(decision.retry_after) + jitter.uniform(0, 0.3), user,
+                                         decision.ticket))
+        queued = len(retries)
+        start = self.now[0]
+        admitted_at = []
+        while retries:
+            at, user, ticket = heapq.heappop(retries)
+            self.now[0] = start + at
+            decision = controller.admit(user, ticket)
+            if decision.admitted:
+                admitted_at.append(at)
+            else:
+                self.assertEqual(decision.ticket, ticket)  # nobody loses their place
+                heapq.heappush(retries, (at + math.ceil(decision.retry_after) + jitter.uniform(0, 0.3), user,
+                                         ticket))
+        self.assertEqual((queued, len(admitted_at)), (users - burst, users - burst))
+        # Clients first retry after about a second, then the line moves at the refill rate.
+        self.assertLess(max(admitted_at), queued / rate + 1.5)
+        self.assertEqual(controller.stats()["waiting"], 0)
+
+    def test_abandoned_tickets_expire(self):
+        controller = self._controller(global_burst=1)
+        controller.admit("a")
+        ticket = controller.admit("b").ticket
+        self.now[0] += 31
+        self.assertEqual(controller.stats()["waiting"], 1)
+        self.assertTrue(controller.admit("c").admitted)
+        self.assertEqual(controller.stats()["waiting"], 0)
+        self.assertNotEqual(controller.admit("b", ticket).ticket, ticket)
+
+    @override_settings(TATKAL_ADMISSION={"GLOBAL_RATE": 0.001, "GLOBAL_BURST": 1, "USER_RATE": 100, "USER_BURST": 100,
+                                         "WAITING_ROOM": 1})
+    def test_booking_endpoint_queues_then_sheds(self):
+        body = {"user_profile_id": 0, "source": "NDLS", "destination": "BCT", "journey_date": "2026-11-01"}
+        first = self.client.post("/api/create_booking/", body, format="json")
+        self.assertEqual(first.status_code, 400)  # admitted, then fails validation
+        queued = self.client.post("/api/bookings/", body, format="json")
+        self.assertEqual(queued.status_code, 503)
+        self.assertEqual((queued.data["queued"], queued.data["position"]), (True, 1))
+        self.assertEqual(queued[TICKET_HEADER], queued.data["ticket"])
+        self.assertTrue(int(queued["Retry-After"]) >= 1)
+        retried = self.client.post("/api/create_booking/", body, format="json",
+                                   headers={TICKET_HEADER: queued.data["ticket"]})
+        self.assertEqual((retried.status_code, retried.data["position"]), (503, 1))
+        shed = self.client.post("/api/create_booking/", body, format="json")
+        self.assertEqual(shed.status_code, 429)
+        async_shed = async_to_sync(AsyncClient().post)("/api/async/create_booking/", body,
+                                                       content_type="application/json")
+        self.assertEqual(async_shed.status_code, 429)
+
+    @override_settings(TATKAL_ADMISSION={"USER_RATE": 0.001, "USER_BURST": 2})
+    def test_one_client_cannot_use_up_another_profiles_bucket(self):
+        victim = {"user_profile_id": 7, "source": "NDLS", "destination": "BCT", "journey_date": "2026-11-01"}
+        attacker = [self.client.post("/api/create_booking/", victim, format="json", REMOTE_ADDR="203.0.113.9")
+                    for _ in range(4)]
+        self.assertEqual([response.status_code for response in attacker], [400, 400, 429, 429])
+        # Changing the profile id in the body does not get the attacker a fresh bucket either.
+        other = self.client.post("/api/create_booking/", {**victim, "user_profile_id": 8}, format="json",
+                                 REMOTE_ADDR="203.0.113.9")
+        self.assertEqual(other.status_code, 429)
+        own = self.client.post("/api/create_booking/", victim, format="json", REMOTE_ADDR="198.51.100.7")
+        self.assertEqual(own.status_code, 400)  # admitted, then fails validation
+
+    def test_forwarded_for_is_read_only_as_deep_as_the_trusted_proxies(self):
+        meta = {"REMOTE_ADDR": "10.0.0.2", "HTTP_X_FORWARDED_FOR": "6.6.6.6, 198.51.100.7, 10.0.0.1"}
+        for proxies, key in ((0, "ip:10.0.0.2"), (1, "ip:10.0.0.1"), (2, "ip:198.51.100.7"), (5, "ip:6.6.6.6")):
+            with override_settings(TATKAL_ADMISSION={"TRUSTED_PROXIES": proxies}):
+                self.assertEqual(client_key_for(meta), key)
+        with override_settings(TATKAL_ADMISSION={"TRUSTED_PROXIES": 1}):
+            self.assertEqual(client_key_for({"REMOTE_ADDR": "198.51.100.7"}), "ip:198.51.100.7")
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.REGISTRY.reset()
+        user = User.objects.create_user(username="measured", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Measured", age=50, address="x")
+        for _ in range(3):
+            Booking.objects.create(
+                user_profile=self.profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 6),
+                passenger_name="M", passenger_age=50, passenger_sex="M",
+            )
+
+    def test_histogram_quantiles_are_within_bucket_precision(self):
+        histogram = metrics.Histogram()
+        for value in range(1, 10001):
+            histogram.record(value / 1000)
+        for q in metrics.QUANTILES:
+            self.assertAlmostEqual(histogram.quantile(q), q * 10, delta=q * 10 / metrics.SUB_BUCKETS)
+        self.assertEqual(histogram.quantile(1.0), 10.0)
+        histogram.record(0)
+        self.assertEqual(histogram.count, 10001)
+
+    def test_request_sql_serializer_and_size_are_recorded_per_view(self):
+        response = self.client.get(f"/api/get_bookings/{self.profile.user_id}/")
+        labels = (("view", "get_bookings"),)
+        self.assertEqual(metrics.REGISTRY.histogram(metrics.SQL_QUERIES, labels).sum, 3)
+        self.assertGreater(metrics.REGISTRY.histogram(metrics.SQL_SECONDS, labels).sum, 0)
+        self.assertGreater(metrics.REGISTRY.histogram(metrics.SERIALIZER_SECONDS, labels).sum, 0)
+        self.assertEqual(metrics.REGISTRY.histogram(metrics.RESPONSE_BYTES, labels).sum, len(response.content))
+        self.assertEqual(metrics.REGISTRY.histogram(metrics.REQUEST_SECONDS, labels).count, 1)
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        self.client.get("/api/health/")
+        response = self.client.get("/api/metrics/")
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn("# TYPE quickbook_request_duration_seconds summary", body)
+        self.assertIn('quickbook_request_duration_seconds{view="Health",quantile="0.99"}', body)
+        self.assertIn('quickbook_requests_total{view="Health",method="GET",status="200"} 1', body)
+        self.assertIn('quickbook_admission_decisions_total{outcome="admitted"}', body)
+        for line in body.splitlines():
+            if not line.startswith("#"):
+                float(line.rsplit(" ", 1)[1])
+
+    def test_recording_overhead_is_small(self):
+        middleware = metrics.MetricsMiddleware(lambda request: HttpResponse(b"ok"))
+        request = RequestFactory().get("/api/health/")
+        rounds = 5000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            middleware(request)
+        per_request = (time.perf_counter() - start) / rounds
+        # Generous bound for slow CI machines; typically a few microseconds.
+        self.assertLess(per_request, 0.0002)
+
+
+class MetricsUnderAsgiTests(TransactionTestCase):
+    # ASGIHandler runs the async ORM on a per-request thread with its own connection,
+    # which only sees committed rows.
+
+    def setUp(self):
+        metrics.REGISTRY.reset()
+        user = User.objects.create_user(username="asgi", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Asgi", age=40, address="x")
+        self.booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 6),
+            passenger_name="A", passenger_age=40, passenger_sex="F",
+        )
+
+    async def test_async_views_run_under_asgi_without_a_thread_hop(self):
+        sent = []
+        requested = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": f"/api/async/bookings/{self.booking.pk}/", "query_string": b"", "headers": [],
+            "server": ("testserver", 80), "client": ("127.0.0.1", 1),
+        }
+        # The handler adapts sync-only middleware and hooks with these; the async ORM has its own.
+        # As Django's test client does: closing connections at request end would close the test database.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            with mock.patch("django.core.handlers.base.sync_to_async", wraps=sync_to_async) as to_thread, \
+                    mock.patch("django.core.handlers.base.async_to_sync", wraps=async_to_sync) as to_loop:
+                await ASGIHandler()(scope, receive, send)
+        finally:
+            disconnected.set()
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        self.assertEqual(sent[0]["status"], 200)
+        # Only Django's own sync process_view hooks (CSRF) take a short hop; nothing holds a thread
+        # for the whole request or re-enters the loop from one.
+        hops = [call.args[0] for call in to_thread.call_args_list if call.args[0].__name__ != "process_view"]
+        self.assertEqual(hops, [])
+        self.assertEqual(to_loop.call_count, 0)
+        labels = (("view", "async_tatkal_booking_status"),)
+        self.assertEqual(metrics.REGISTRY.histogram(metrics.REQUEST_SECONDS, labels).count, 1)
+        self.assertGreater(metrics.REGISTRY.histogram(metrics.SQL_QUERIES, labels).sum, 0)
+
+
+class BenchmarkSuiteTests(TransactionTestCase):
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(missing_routes(), [])
+
+    def test_suite_runs_every_scenario_cleanly_on_a_small_dataset(self):
+        dataset = seed_benchmark_data("t", users=20, bookings=400, payments=100)
+        document = run_suite(SCENARIOS, dataset, ("client",), requests=3, warmup=1)
+        self.assertEqual(len(document["results"]), len(SCENARIOS))
+        failing = {key: result["error_statuses"] for key, result in document["results"].items() if result["errors"]}
+        self.assertEqual(failing, {})
+        self.assertEqual(document["meta"]["database"], connection.vendor)
+        teardown_benchmark_data("t")
+        self.assertFalse(User.objects.filter(username__startswith="bench_t_").exists())
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        def document(rps, p99, errors=0):
+            result = {"throughput_rps": rps, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": p99, "errors": errors}
+            return {"results": {"client/Health": result}}
+
+        self.assertFalse(any(row[5] for row in compare(document(100, 5.0), document(95, 5.4), threshold=10)))
+        regressed = {row[1] for row in compare(document(100, 5.0), document(80, 6.0, errors=1), threshold=10)
+                     if row[5]}
+        self.assertEqual(regressed, {"throughput_rps", "p99_ms", "errors"})
+
+
+@override_settings(OPENAPI_SCHEMA_FILE="")
+class OpenApiSchemaTests(TestCase):
+    def setUp(self):
+        openapi_schema.SCHEMA.reset()
+        self.addCleanup(openapi_schema.SCHEMA.reset)
+
+    def test_schema_is_generated_once_and_host_patched_per_request(self):
+        with mock.patch.object(openapi_schema, "generate_document", wraps=openapi_schema.generate_document) as gen:
+            first = self.client.get("/swagger.json", headers={"host": "localhost"})
+            second = self.client.get("/swagger.json", headers={"host": "docs.kavia.ai", "x-forwarded-proto": "https"})
+        self.assertEqual(gen.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "application/json; charset=utf-8")
+        one, two = json.loads(first.content), json.loads(second.content)
+        self.assertEqual((one["host"], one["schemes"]), ("localhost", ["http"]))
+        self.assertEqual((two["host"], two["schemes"]), ("docs.kavia.ai", ["https"]))
+        self.assertIn("/create_booking/", one["paths"])
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+    def test_etag_revalidation_and_gzip(self):
+        plain = self.client.get("/swagger.json")
+        zipped = self.client.get("/swagger.json", headers={"accept-encoding": "gzip, br"})
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(zipped.content), plain.content)
+        self.assertLess(len(zipped.content), len(plain.content))
+        self.assertIn("Accept-Encoding", zipped["Vary"])
+        for etag in (plain["ETag"], zipped["ETag"]):
+            response = self.client.get("/swagger.json", headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get("/swagger.json", headers={"if-none-match": '"stale"'}).status_code, 200)
+
+    def test_docs_pages_fetch_the_cached_document(self):
+        page = self.client.get("/docs/")
+        self.assertEqual(page.status_code, 200)
+        self.assertIn("text/html", page["Content-Type"])
+        spec = self.client.get("/docs/?format=openapi")
+        self.assertEqual(spec["Content-Type"], "application/openapi+json; charset=utf-8")
+        self.assertEqual(spec["ETag"], self.client.get("/swagger.json")["ETag"])
+        self.assertEqual(self.client.get("/redoc/").status_code, 200)
+
+    def test_generated_artifact_is_served_instead_of_generating(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "openapi.json")
+            call_command("generate_openapi", output=path, stdout=StringIO())
+            document = json.loads(Path(path).read_text())
+            document["info"]["title"] = "From artifact"
+            Path(path).write_text(json.dumps(document))
+            with override_settings(OPENAPI_SCHEMA_FILE=path), \
+                    mock.patch.object(openapi_schema, "generate_document") as gen:
+                openapi_schema.SCHEMA.reset()
+                served = json.loads(self.client.get("/swagger.json").content)
+        gen.assert_not_called()
+        self.assertEqual(served["info"]["title"], "From artifact")
+        self.assertEqual(served["host"], "testserver")
+
+
+class StartupProfileTests(TestCase):
+    def test_api_role_urlconf_serves_only_the_api(self):
+        with override_settings(ROOT_URLCONF="config.urls_api"):
+            self.assertEqual(self.client.get("/api/health/").status_code, 200)
+            self.assertEqual(self.client.get("/docs/").status_code, 404)
+            self.assertEqual(self.client.get("/admin/").status_code, 404)
+
+    def test_full_urlconf_defers_the_docs_stack(self):
+        script = (
+            "import sys, django; django.setup(); from django.urls import get_resolver; "
+            "get_resolver().url_patterns; print('drf_yasg.views' in sys.modules, 'config.schema' in sys.modules)"
+        )
+        env = {**os.environ, "SERVER_ROLE": "full", "DJANGO_SETTINGS_MODULE": "config.settings"}
+        out = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split(), ["False", "False"])
+
+    def test_profile_startup_reports_a_lean_api_worker(self):
+        out = StringIO()
+        call_command("profile_startup", role="api", repeat=1, no_importtime=True, stdout=out)
+        self.assertRegex(out.getvalue(), r"role=api .*HTTP 200.*docs=no  admin=no")
+
+    def test_parse_importtime_groups_self_time_by_package(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |     django.db.models.fields\n"
+            "import time:        50 |        150 |   django.db.models\n"
+            "import time:        30 |         30 |   django.contrib.auth.models\n"
+            "import time:        20 |        200 | yaml\n"
+            "unrelated warning\n"
+        )
+        total, groups = parse_importtime(stderr)
+        self.assertEqual(total, 200)
+        self.assertEqual(groups, {"django.db": 150, "django.contrib.auth": 30, "yaml": 20})
+
+
+# The read pool's own connections cannot see rows inside a test transaction.
+@override_settings(BOOKING_STATUS_READ_THREADS=0)
+class BookingStatusPollTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="poller", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Poller", age=40, address="1 Poll St")
+        self.booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 1),
+            passenger_name="P", passenger_age=40, passenger_sex="F", booking_status="payment_pending",
+            fare=Decimal("500.00"),
+        )
+        self.url = reverse("tatkal_booking_poll", args=[self.booking.pk])
+
+    def test_poll_returns_the_status_fields_of_the_full_representation(self):
+        with self.assertNumQueries(1):
+            poll = self.client.get(self.url)
+        self.assertEqual(poll.status_code, 200)
+        self.assertEqual(poll["Content-Type"], "application/json")
+        full = self.client.get(reverse("tatkal_booking_status", args=[self.booking.pk])).json()
+        self.assertEqual(poll.json(), {key: full[key] for key, _, _ in status_poll.STATUS_FIELDS})
+
+        Booking.objects.filter(pk=self.booking.pk).update(
+            booking_status="booked", pnr="1234567890", paid=True, payment_time=timezone.now(),
+        )
+        full = self.client.get(reverse("tatkal_booking_status", args=[self.booking.pk])).json()
+        self.assertEqual(self.client.get(self.url).json(), {key: full[key] for key, _, _ in status_poll.STATUS_FIELDS})
+
+    def test_unchanged_polls_get_304_until_the_booking_changes(self):
+        first = self.client.get(self.url)
+        etag = first["ETag"]
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        unchanged = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual((unchanged.status_code, unchanged.content, unchanged["ETag"]), (304, b"", etag))
+
+        Booking.objects.filter(pk=self.booking.pk).update(booking_status="booked", pnr="9876543210", paid=True)
+        changed = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertEqual(changed.json()["pnr"], "9876543210")
+
+    def test_missing_booking_and_wrong_method(self):
+        self.assertEqual(self.client.get(reverse("tatkal_booking_poll", args=[self.booking.pk + 999])).status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    async def test_async_poll_matches_sync(self):
+        sync = await sync_to_async(self.client.get)(self.url)
+        response = await self.async_client.get(reverse("async_tatkal_booking_poll", args=[self.booking.pk]))
+        self.assertEqual((response.content, response["ETag"]), (sync.content, sync["ETag"]))
+        response = await self.async_client.get(
+            reverse("async_tatkal_booking_poll", args=[self.booking.pk]), headers={"if-none-match": sync["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_row_builder_keeps_field_order_and_any_key(self):
+        build = status_poll.compile_row_builder([("b", "y", str.upper), ("a's \"key\"", "x", None)])
+        self.assertEqual(list(build(("pnr", 1)).items()), [("b", "PNR"), ("a's \"key\"", 1)])
+
+
+# The read pool's own connections cannot see rows inside a test transaction.
+@override_settings(BOOKING_STATUS_READ_THREADS=0)
+class BookingStatusPushTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="waiter", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Waiter", age=29, address="2 Queue Ln")
+        self.booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 1),
+            passenger_name="W", passenger_age=29, passenger_sex="M", booking_status="payment_pending",
+            fare=Decimal("500.00"),
+        )
+        self.payment = PaymentTransaction.objects.create(
+            booking=self.booking, order_id="order_push", status="pending", amount=Decimal("500.00"),
+        )
+
+    def _pay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return apply_payment_callback(self.payment.pk, "pay_push", "success")
+
+    async def _stream(self, booking_id, **headers):
+        request = AsyncRequestFactory().get(f"/api/async/bookings/{booking_id}/events/", headers=headers)
+        return await async_views.booking_events(request, booking_id)
+
+    async def _until_subscribed(self, count):
+        for _ in range(1000):
+            if BROKER.subscriber_count(self.booking.pk) >= count:
+                return
+            await asyncio.sleep(0.001)
+        self.fail(f"only {BROKER.subscriber_count(self.booking.pk)} of {count} subscribers registered")
+
+    async def test_event_stream_pushes_the_payment_outcome_and_ends(self):
+        response = await self._stream(self.booking.pk)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        first = await anext(chunks)
+        self.assertIn(b"event: status\n", first)
+        self.assertIn(b'"booking_status":"payment_pending"', first)
+        self.assertEqual(BROKER.subscriber_count(self.booking.pk), 1)
+
+        result = await sync_to_async(self._pay)()
+        pushed = await asyncio.wait_for(anext(chunks), 5)
+        self.assertIn(b'"booking_status":"booked"', pushed)
+        self.assertIn(f'"pnr":"{result["pnr"]}"'.encode(), pushed)
+        with self.assertRaises(StopAsyncIteration):
+            await anext(chunks)
+        self.assertEqual(BROKER.subscriber_count(), 0)
+
+    async def _listen(self, response, received):
+        async for chunk in response.streaming_content:
+            received.append(chunk)
+
+    async def _until(self, condition, message):
+        for _ in range(2000):
+            if condition():
+                return
+            await asyncio.sleep(0.001)
+        self.fail(message)
+
+    async def test_reconnect_with_current_last_event_id_skips_the_replay(self):
+        received = []
+        listener = asyncio.ensure_future(self._listen(await self._stream(self.booking.pk), received))
+        await self._until(lambda: len(received) == 2, "no first event")
+        listener.cancel()  # what a client disconnect does under ASGI
+        await asyncio.gather(listener, return_exceptions=True)
+        self.assertEqual(BROKER.subscriber_count(), 0)
+        event_id = received[1].split(b"\n")[0].split(b": ")[1].decode()
+
+        received = []
+        response = await self._stream(self.booking.pk, **{"Last-Event-ID": event_id})
+        listener = asyncio.ensure_future(self._listen(response, received))
+        await self._until_subscribed(1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(received, [b"retry: 3000\n\n"])
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    async def test_unknown_booking_is_404(self):
+        response = await self._stream(self.booking.pk + 999)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_long_poll_returns_on_change_or_304_on_timeout(self):
+        url = reverse("async_tatkal_booking_poll", args=[self.booking.pk])
+        etag = (await self.async_client.get(url))["ETag"]
+        response = await self.async_client.get(url + "?wait=0.05", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        waiting = asyncio.ensure_future(self.async_client.get(url + "?wait=10", headers={"if-none-match": etag}))
+        await self._until_subscribed(1)
+        await sync_to_async(self._pay)()
+        response = await asyncio.wait_for(waiting, 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["booking_status"], "booked")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_wallet_payment_and_cancellation_publish_after_commit(self):
+        published = []
+        with mock.patch("api.events.LocalFanout.publish", lambda self, ids: published.append(ids)):
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    credit_wallet(self.booking.user_profile_id, Decimal("1000.00"))
+                    self.assertTrue(pay_bookings_via_wallet(self.booking.user_profile_id, [self.booking]))
+                    self.assertEqual(published, [])
+            self.assertEqual(published, [(self.booking.pk,)])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("tatkal_booking_cancel", args=[self.booking.pk]), {},
+                                 content_type="application/json")
+        self.assertEqual(published, [(self.booking.pk,), (self.booking.pk,)])
+
+    async def test_ten_thousand_idle_subscribers(self):
+        subscribers = 10000
+        received = [[] for _ in range(subscribers)]
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            responses = await asyncio.gather(*(self._stream(self.booking.pk) for _ in range(subscribers)))
+            listeners = [asyncio.ensure_future(self._listen(r, chunks)) for r, chunks in zip(responses, received)]
+            del responses
+            await self._until(lambda: all(len(chunks) == 2 for chunks in received), "streams did not start")
+            per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / subscribers
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(BROKER.subscriber_count(self.booking.pk), subscribers)
+        self.assertTrue(all(b'"booking_status":"payment_pending"' in chunks[1] for chunks in received))
+        # Called directly, an idle stream is a parked coroutine plus its subscription: a few KB. The served
+        # path, request objects included, is measured in BookingPushUnderAsgiTests.
+        self.assertLess(per_connection, 16 * 1024, f"{per_connection:.0f} bytes per idle connection")
+
+        await sync_to_async(self._pay)()
+        await asyncio.wait_for(asyncio.gather(*listeners), 60)
+        self.assertTrue(all(b'"booking_status":"booked"' in chunks[2] and len(chunks) == 3 for chunks in received))
+        self.assertEqual(BROKER.subscriber_count(), 0)
+
+
+class BookingPushUnderAsgiTests(TransactionTestCase):
+    """Open event streams and long polls served by the ASGI application, on a loop of their own."""
+
+    CONNECTIONS = 200
+
+    def setUp(self):
+        user = User.objects.create_user(username="asgi_push", password="x")
+        profile = UserProfile.objects.create(user=user, full_name="Push", age=30, address="x")
+        self.booking = Booking.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 8),
+            passenger_name="P", passenger_age=30, passenger_sex="F", booking_status="payment_pending",
+        )
+        self.payment = PaymentTransaction.objects.create(
+            booking=self.booking, order_id="order_asgi_push", status="pending", amount=Decimal("500.00"),
+        )
+
+    def _scope(self, path, query=b"", headers=()):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "query_string": query, "headers": list(headers),
+            "server": ("testserver", 80), "client": ("127.0.0.1", 1),
+        }
+
+    async def _serve(self, handler, scope, sent):
+        requested = []
+
+        async def receive():
+            if not requested:
+                requested.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            sent.append(message)
+
+        await handler(scope, receive, send)
+
+    async def _connect_and_pay(self, measured):
+        handler = async_views.PushASGIHandler()
+        streams = [[] for _ in range(self.CONNECTIONS // 2)]
+        polls = [[] for _ in range(self.CONNECTIONS // 2)]
+        etag = status_poll.body_etag((await status_poll.aread_booking_status(self.booking.pk))[0]).encode()
+        events = self._scope(f"/api/async/bookings/{self.booking.pk}/events/")
+        poll = self._scope(f"/api/async/bookings/{self.booking.pk}/status/", b"wait=30", [(b"if-none-match", etag)])
+        threads = threading.active_count()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tasks = [asyncio.ensure_future(self._serve(handler, events, sent)) for sent in streams]
+        tasks += [asyncio.ensure_future(self._serve(handler, poll, sent)) for sent in polls]
+        for _ in range(3000):
+            if BROKER.subscriber_count(self.booking.pk) == self.CONNECTIONS:
+                break
+            await asyncio.sleep(0.01)
+        measured["subscribers"] = BROKER.subscriber_count(self.booking.pk)
+        measured["new_threads"] = threading.active_count() - threads
+        measured["per_connection"] = (tracemalloc.get_traced_memory()[0] - baseline) / self.CONNECTIONS
+        tracemalloc.stop()
+        await sync_to_async(apply_payment_callback, thread_sensitive=False)(self.payment.pk, "pay_asgi", "success")
+        await asyncio.wait_for(asyncio.gather(*tasks), 30)
+        measured["streams"], measured["polls"] = streams, polls
+
+    def test_idle_connections_hold_no_thread(self):
+        measured = {}
+        # Its own loop on its own thread, as under an ASGI server: not inside async_to_sync,
+        # where thread-sensitive work would run on the test's thread instead.
+        loop_thread = threading.Thread(target=lambda: asyncio.run(self._connect_and_pay(measured)))
+        loop_thread.start()
+        loop_thread.join(60)
+        self.assertEqual(measured["subscribers"], self.CONNECTIONS)
+        # The read pool and asgiref's shared sync thread, not one per connection.
+        self.assertLessEqual(measured["new_threads"], settings.BOOKING_STATUS_READ_THREADS + 1)
+        self.assertLess(measured["per_connection"], 64 * 1024, f"{measured['per_connection']:.0f} bytes")
+        for sent in measured["streams"]:
+            body = b"".join(message.get("body", b"") for message in sent[1:])
+            self.assertIn(b'"booking_status":"booked"', body)
+        for sent in measured["polls"]:
+            self.assertEqual(sent[0]["status"], 200)
+            self.assertIn(b'"booking_status":"booked"', sent[1]["body"])
+        self.assertEqual(BROKER.subscriber_count(), 0)
+
+
+class ProfileCacheTests(TransactionTestCase):
+    # Outside a test transaction, so reads go through the cache and commits invalidate it.
+
+    def setUp(self):
+        PROFILE_CACHE.clear_local()
+        caches["shared"].clear()
+        self.user = User.objects.create_user(username="cached", password="x")
+        self.profile = UserProfile.objects.create(user=self.user, full_name="Cached", age=33, address="x")
+        self.profile.deposit_wallet(Decimal("100.00"))
+
+    def _balance(self):
+        return Decimal(self.client.get(reverse("get_profile", args=[self.user.pk])).json()["wallet_balance"])
+
+    def test_profile_reads_are_served_from_memory(self):
+        urls = (
+            reverse("get_profile", args=[self.user.pk]),
+            reverse("user_profile_detail", args=[self.user.pk]),
+            reverse("auto_fill_suggestions", args=[self.profile.pk]),
+        )
+        first = [self.client.get(url).json() for url in urls]
+        with self.assertNumQueries(0):
+            again = [self.client.get(url).json() for url in urls]
+        self.assertEqual(again, first)
+        self.assertEqual(first[0]["wallet_balance"], "100.00")
+
+    def test_booking_lists_take_profiles_from_the_cache(self):
+        for _ in range(3):
+            Booking.objects.create(
+                user_profile=self.profile, source="NDLS", destination="BCT", journey_date=datetime.date(2026, 12, 3),
+                passenger_name="P", passenger_age=30, passenger_sex="M",
+            )
+        url = reverse("get_bookings", args=[self.user.pk])
+        self.client.get(url)
+        with self.assertNumQueries(2):  # profile id and page of bookings; no profile query
+            bookings = self.client.get(url).json()
+        self.assertEqual({booking["user_profile"]["wallet_balance"] for booking in bookings}, {"100.00"})
+
+    def test_wallet_balance_is_never_stale_after_a_debit(self):
+        expected = Decimal("100.00")
+        self.assertEqual(self._balance(), expected)
+        for strategy in (STRATEGY_ATOMIC, STRATEGY_LOCKED, STRATEGY_OPTIMISTIC):
+            self.assertTrue(debit_wallet(self.profile.pk, "10.00", strategy=strategy))
+            expected -= 10
+            self.assertEqual(self._balance(), expected)
+        self.assertTrue(self.profile.deduct_wallet("5.00"))
+        self.assertEqual(self._balance(), expected - 5)
+        self.profile.deposit_wallet("5.00")
+        self.assertEqual(self._balance(), expected)
+
+    def test_concurrent_readers_never_refill_a_balance_from_before_a_debit(self):
+        debits, threads = 15, 4
+        stop = False
+
+        def read():
+            try:
+                while not stop:
+                    profile_data(self.profile.pk)
+            finally:
+                connection.close()
+
+        # One debit and its check at a time: otherwise the committed balance read here can include another
+        # thread's debit whose on-commit invalidation has not run yet, which no cache could reflect.
+        # The readers, whose fills are what could go stale, stay concurrent with everything.
+        writing = threading.Lock()
+
+        def debit(_):
+            stale = []
+            try:
+                for _ in range(debits):
+                    with writing:
+                        self.assertTrue(debit_wallet(self.profile.pk, "1.00"))
+                        committed = UserProfile.objects.get(pk=self.profile.pk).available_wallet_balance
+                        served = Decimal(profile_data(self.profile.pk)["wallet_balance"])
+                    # Balances only fall here, so a read after the commit may only be lower.
+                    if served > committed:
+                        stale.append((served, committed))
+            finally:
+                connection.close()
+            return stale
+
+        with ThreadPoolExecutor(max_workers=threads * 2) as pool:
+            readers = [pool.submit(read) for _ in range(threads)]
+            results = list(pool.map(debit, range(threads)))
+            stop = True
+            for reader in readers:
+                reader.result()
+        self.assertEqual([entry for stale in results for entry in stale], [])
+        self.assertEqual(self._balance(), Decimal("100.00") - debits * threads)
+
+    def test_profile_and_user_writes_invalidate(self):
+        detail = reverse("user_profile_detail", args=[self.user.pk])
+        auto_fill = reverse("auto_fill_suggestions", args=[self.profile.pk])
+        self.client.get(detail)
+        self.client.get(auto_fill)
+        self.client.put(detail, {"full_name": "Renamed"}, content_type="application/json")
+        self.client.post(auto_fill, {"auto_fill_enabled": False}, content_type="application/json")
+        self.assertEqual(self.client.get(detail).json()["full_name"], "Renamed")
+        self.assertFalse(self.client.get(auto_fill).json()["auto_fill_enabled"])
+        self.user.username = "renamed"
+        self.user.save()
+        self.assertEqual(self.client.get(detail).json()["user"], "renamed")
+        self.user.delete()
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        self.assertEqual(self.client.get(auto_fill).status_code, 404)
+
+    def test_rebuilt_snapshot_replaces_the_cached_balance(self):
+        # A drifted snapshot that was cached before the repair (UPDATE sends no signal).
+        UserProfile.objects.filter(pk=self.profile.pk).update(wallet_balance=Decimal("999.00"))
+        self.assertEqual(self._balance(), Decimal("1099.00"))
+        rebuild_snapshots([self.profile.pk], now=timezone.now() + SNAPSHOT_GRACE * 2)
+        self.assertEqual(self._balance(), Decimal("100.00"))
+
+    def test_rolled_back_writes_never_reach_the_cache(self):
+        self.assertEqual(self._balance(), Decimal("100.00"))
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertTrue(debit_wallet(self.profile.pk, "40.00"))
+            # Inside the transaction the read bypasses the cache and sees the debit.
+            self.assertEqual(profile_data(self.profile.pk)["wallet_balance"], "60.00")
+            raise RuntimeError
+        self.assertEqual(self._balance(), Decimal("100.00"))
+
+    def test_invalidation_discards_a_fill_read_before_it(self):
+        cache = TieredCache("t", shared_ttl=60, tombstone_ttl=5)
+
+        def load_then_invalidate(keys):
+            value = {key: "before" for key in keys}
+            cache.invalidate(keys)  # a write commits while the read is in flight
+            return value
+
+        self.assertEqual(cache.get_many(["k"], load_then_invalidate), {"k": "before"})
+        self.assertEqual(cache.get_many(["k"], lambda keys: dict.fromkeys(keys, "after")), {"k": "after"})
+        # Until the tombstone expires, no process's fill (such as a late one of the old value) lands.
+        cache._fill_shared({"k": "before"})
+        cache.clear_local()
+        self.assertEqual(cache.get_many(["k"], lambda keys: dict.fromkeys(keys, "reloaded")), {"k": "reloaded"})
+
+    def test_invalidating_one_key_keeps_a_concurrent_fill_of_another(self):
+        cache = TieredCache("t", shared_ttl=60, tombstone_ttl=5)
+
+        def load_while_other_is_invalidated(keys):
+            cache.invalidate(["a"])
+            return dict.fromkeys(keys, "loaded")
+
+        self.assertEqual(cache.get_many(["a", "b"], load_while_other_is_invalidated), {"a": "loaded", "b": "loaded"})
+        self.assertEqual(cache.get_many(["a", "b"], lambda keys: dict.fromkeys(keys, "reloaded")),
+                         {"a": "reloaded", "b": "loaded"})
+
+    def test_a_fill_racing_a_key_dropped_from_the_generation_map_is_discarded(self):
+        cache = TieredCache("t", max_size=2, shared_alias=None)
+
+        def load_during_churn(keys):
+            cache.invalidate(keys + ["x", "y", "z"])  # "k" falls out of the bounded generation map
+            return dict.fromkeys(keys, "before")
+
+        cache.get_many(["k"], load_during_churn)
+        self.assertEqual(cache.get_many(["k"], lambda keys: dict.fromkeys(keys, "after")), {"k": "after"})
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProfileImportTests(TestCase):
+    CSV = (
+        "username,password,full_name,age,address,preferred_berth,wallet_deposit\n"
+        "corp_a,secret-a,Traveller A,34,\"1 Road, City\",lower,250.00\n"
+        "corp_b,,Traveller B,41,2 Road,,\n"
+        "corp_c,secret-c,Traveller C,0,3 Road,upper,\n"
+        "corp_a,secret-x,Duplicate,30,4 Road,,\n"
+        "taken,secret-t,Taken,30,5 Road,,\n"
+        "corp_d,secret-d,Traveller D,29,6 Road,window,\n"
+        "corp_e,secret-e,Traveller E,52,7 Road,side_lower,10.50\n"
+    )
+
+    def setUp(self):
+        User.objects.create_user(username="taken", password="x")
+
+    def test_command_imports_csv_in_chunks_and_reports_bad_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "travellers.csv"
+            path.write_text(self.CSV)
+            out, err = StringIO(), StringIO()
+            call_command("import_profiles", str(path), "--workers", "2", "--chunk-size", "3", stdout=out, stderr=err)
+        self.assertIn("Imported 3 of 7 rows", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(out.getvalue().count("rows read"), 3)
+        errors = err.getvalue()
+        for line, text in ((4, "age"), (5, "duplicate username 'corp_a'"), (6, "'taken' already exists"),
+                           (7, "preferred_berth")):
+            self.assertIn(f"line {line}: ", errors)
+            self.assertIn(text, errors)
+
+        a = User.objects.get(username="corp_a")
+        self.assertTrue(a.check_password("secret-a"))
+        self.assertFalse(User.objects.get(username="corp_b").has_usable_password())
+        self.assertEqual((a.profile.address, a.profile.preferred_berth), ("1 Road, City", "lower"))
+        balances = {
+            profile.user.username: profile.available_wallet_balance
+            for profile in UserProfile.objects.filter(user__username__startswith="corp_")
+        }
+        self.assertEqual(balances, {"corp_a": Decimal("250.00"), "corp_b": Decimal("0.00"), "corp_e": Decimal("10.50")})
+
+    def test_api_accepts_csv_ndjson_and_json(self):
+        url = reverse("user_profile_import")
+        report = self.client.post(url, self.CSV, content_type="text/csv").json()
+        self.assertEqual((report["rows"], report["created"], report["failed"]), (7, 3, 4))
+        self.assertEqual((report["deposits"], report["deposited"]), (2, "260.50"))
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 5, 6, 7])
+
+        ndjson = "\n".join([
+            json.dumps({"username": "nd_1", "password": "p", "full_name": "N", "age": 20, "address": "x"}),
+            "not json",
+            json.dumps({"username": "corp_a", "full_name": "N", "age": 20, "address": "x"}),
+        ])
+        report = self.client.post(url, ndjson, content_type="application/x-ndjson").json()
+        self.assertEqual((report["created"], [error["line"] for error in report["errors"]]), (1, [2, 3]))
+
+        report = self.client.post(url, {"profiles": [
+            {"username": "js_1", "full_name": "J", "age": 20, "address": "x", "wallet_deposit": "5.00"}, "x",
+        ]}, content_type="application/json").json()
+        self.assertEqual((report["created"], report["deposited"], report["failed"]), (1, "5.00", 1))
+        self.assertEqual(self.client.post(url, {"profiles": "no"}, content_type="application/json").status_code, 400)
+
+    @override_settings(PROFILE_IMPORT_MAX_ROWS=3)
+    def test_api_refuses_bodies_over_the_row_limit_without_importing_any(self):
+        url = reverse("user_profile_import")
+        response = self.client.post(url, self.CSV, content_type="text/csv")
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("import_profiles", response.json()["error"])
+        rows = [{"username": f"js_{i}", "full_name": "J", "age": 20, "address": "x"} for i in range(4)]
+        response = self.client.post(url, {"profiles": rows}, content_type="application/json")
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(User.objects.filter(username__startswith="corp_").exists())
+        self.assertFalse(User.objects.filter(username__startswith="js_").exists())
+        report = self.client.post(url, {"profiles": rows[:3]}, content_type="application/json").json()
+        self.assertEqual(report["created"], 3)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], PASSWORD_HASHING_WORKERS=2,
+)
+class PasswordHashingPoolTests(TestCase):
+    REGISTRATION = {"full_name": "Hash", "age": 30, "address": "x", "preferred_berth": "any"}
+
+    def test_registration_hashes_on_the_pool_and_logins_verify_there(self):
+        for i, url in enumerate((reverse("register_user"), reverse("user_profile_list_create"))):
+            body = {**self.REGISTRATION, "username": f"hashed_{i}", "password": "s3cret-pass"}
+            self.assertEqual(self.client.post(url, body, content_type="application/json").status_code, 201)
+            user = User.objects.get(username=f"hashed_{i}")
+            self.assertTrue(user.password.startswith("md5$"))
+            self.assertEqual(authenticate(username=f"hashed_{i}", password="s3cret-pass"), user)
+            self.assertIsNone(authenticate(username=f"hashed_{i}", password="wrong"))
+        self.assertIsNone(authenticate(username="nobody", password="s3cret-pass"))
+
+    def test_login_upgrades_a_hash_from_an_older_hasher(self):
+        user = User.objects.create(username="legacy", password=hash_password("old-pass"))
+        with override_settings(PASSWORD_HASHERS=[
+            "django.contrib.auth.hashers.ScryptPasswordHasher", "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]):
+            self.assertEqual(pooled_check_password("old-pass", user.password), (True, True))
+            self.assertEqual(authenticate(username="legacy", password="old-pass"), user)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith("scrypt$"))
+            self.assertEqual(pooled_check_password("old-pass", user.password), (True, False))
+
+    def test_a_full_pool_sheds_load_with_503(self):
+        pool = HashingPool(workers=1, max_pending=1, wait=0.05)
+        try:
+            with ThreadPoolExecutor(max_workers=1) as runner:
+                busy = runner.submit(pool.run, time.sleep, 0.5)
+                time.sleep(0.1)
+                with self.assertRaises(HashingBusy):
+                    pool.run(time.sleep, 0)
+                busy.result()
+            self.assertIsNone(pool.run(time.sleep, 0))  # the slot is free again
+        finally:
+            pool.shutdown()
+        body = {**self.REGISTRATION, "username": "shed", "password": "s3cret-pass"}
+        with mock.patch("api.views.hash_password", side_effect=HashingBusy(wait=2)):
+            response = self.client.post(reverse("register_user"), body, content_type="application/json")
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "2"))
+        self.assertFalse(User.objects.filter(username="shed").exists())
+
+    def test_a_full_pool_fails_logins_outside_drf_instead_of_erroring(self):
+        User.objects.create_superuser(username="operator", password="s3cret-pass")
+        with mock.patch("api.backends.check_password", side_effect=HashingBusy(wait=2)):
+            admin_login = self.client.post(
+                "/admin/login/?next=/admin/", {"username": "operator", "password": "s3cret-pass"}
+            )
+            self.assertIsNone(authenticate(username="operator", password="s3cret-pass"))
+            basic = base64.b64encode(b"operator:s3cret-pass").decode()
+            api = self.client.get("/api/health/", HTTP_AUTHORIZATION=f"Basic {basic}")
+        self.assertEqual(admin_login.status_code, 200)  # the form again, with its login error
+        self.assertNotIn("_auth_user_id", self.client.session)
+        self.assertEqual((api.status_code, api["Retry-After"]), (503, "2"))
+
+    def test_hashing_workers_split_the_host_budget_across_web_workers(self):
+        script = "from django.conf import settings; print(settings.PASSWORD_HASHING_WORKERS)"
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings", "PASSWORD_HASHING_HOST_WORKERS": "8"}
+        env.pop("PASSWORD_HASHING_WORKERS", None)
+        for web_workers, expected in (("1", "8"), ("4", "2"), ("16", "1")):
+            env["WEB_CONCURRENCY"] = web_workers
+            run = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env,
+                                 capture_output=True, text=True)
+            self.assertEqual(run.stdout.strip(), expected, run.stderr)
+
+    def test_hasher_profile_setting(self):
+        script = "from django.conf import settings; print(settings.PASSWORD_HASHERS[0].rsplit('.', 1)[1])"
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings", "PASSWORD_HASHER_PROFILE": "scrypt"}
+        run = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertEqual(run.stdout.strip(), "ScryptPasswordHasher")
+        env["PASSWORD_HASHER_PROFILE"] = "md4"
+        run = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertNotEqual(run.returncode, 0)
+        self.assertIn("PASSWORD_HASHER_PROFILE must be one of", run.stderr)
+
+
+@override_settings(TATKAL_ADMISSION={"ENABLED": False})
+class BookingDraftTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="planner", password="x")
+        self.profile = UserProfile.objects.create(user=user, full_name="Planner", age=40, address="7 Window Rd")
+        self.profile.deposit_wallet("1000.00")
+        self.run = create_train_run("12953", "NDLS", "BCT", datetime.date(2026, 11, 1), coaches=1, berths_per_coach=8)
+
+    def _stage(self, passengers=2, fare_ceiling="300.00"):
+        return self.client.post("/api/drafts/", {
+            "user_profile_id": self.profile.pk, "source": "NDLS", "destination": "BCT",
+            "journey_date": "2026-11-01", "fare_ceiling": fare_ceiling,
+            "passengers": [
+                {"passenger_name": f"Member {i}", "passenger_age": 30 + i, "passenger_sex": "F",
+                 "preferred_berth": "lower"}
+                for i in range(passengers)
+            ],
+        }, format="json")
+
+    def _confirm(self, draft_id, body=None):
+        body = {"user_profile_id": self.profile.pk, **(body or {})}
+        return self.client.post(f"/api/drafts/{draft_id}/confirm/", body, format="json")
+
+    def test_staging_validates_every_passenger(self):
+        response = self.client.post("/api/drafts/", {
+            "user_profile_id": self.profile.pk, "source": "NDLS", "destination": "BCT",
+            "journey_date": "2026-11-01", "fare_ceiling": "300.00",
+            "passengers": [{"passenger_name": "Z", "passenger_age": 0, "passenger_sex": "F"}],
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._stage(passengers=7).status_code, 400)
+        self.assertEqual(self._stage(fare_ceiling="0.00").status_code, 400)
+        self.assertFalse(BookingDraft.objects.exists())
+
+    def test_confirm_books_allocates_and_debits_once_without_serializers(self):
+        draft_id = self._stage().data["id"]
+        with mock.patch.object(BookingDraftSerializer, "is_valid") as is_valid, \
+                mock.patch.object(BookingCreateSerializer, "is_valid") as create_is_valid:
+            response = self._confirm(draft_id, {"fare": "250.00"})
+        is_valid.assert_not_called()
+        create_is_valid.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data["wallet_auto_debited"])
+        self.assertEqual(
+            [(b["passenger_name"], b["booking_status"], b["paid"], b["fare"], b["coach"]) for b in response.data["bookings"]],
+            [("Member 0", "booked", True, "250.00", "S1"), ("Member 1", "booked", True, "250.00", "S1")],
+        )
+        self.assertEqual({b["berth_type"] for b in response.data["bookings"]}, {"lower"})
+        self.assertEqual(BookingDraft.objects.get(pk=draft_id).status, BookingDraft.STATUS_CONFIRMED)
+        debits = self.profile.wallet_entries.filter(kind=WalletLedgerEntry.KIND_DEBIT)
+        self.assertEqual(sorted(debits.values_list("booking_id", "amount")), [
+            (booking["id"], Decimal("-250.00")) for booking in sorted(response.data["bookings"], key=lambda b: b["id"])
+        ])
+
+    def test_confirm_without_fare_charges_the_ceiling(self):
+        response = self._confirm(self._stage(passengers=1).data["id"])
+        self.assertEqual(response.data["bookings"][0]["fare"], "300.00")
+
+    def test_fare_above_ceiling_books_nothing(self):
+        draft_id = self._stage().data["id"]
+        response = self._confirm(draft_id, {"fare": "300.01"})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(BookingDraft.objects.get(pk=draft_id).status, BookingDraft.STATUS_STAGED)
+        self.assertEqual(self._confirm(draft_id, {"fare": "abc"}).status_code, 400)
+
+    def test_confirm_is_idempotent(self):
+        draft_id = self._stage().data["id"]
+        first = self._confirm(draft_id)
+        again = self._confirm(draft_id)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data["bookings"], first.data["bookings"])
+        self.assertEqual(Booking.objects.count(), 2)
+        self.profile.refresh_wallet()
+        self.assertEqual(self.profile.available_wallet_balance, Decimal("400.00"))
+
+    def test_sold_out_confirm_rolls_back_and_keeps_draft_staged(self):
+        draft_id = self._stage(passengers=6).data["id"]
+        self.assertEqual(self._confirm(draft_id).status_code, 201)
+        second = self._stage(passengers=3).data["id"]
+        response = self._confirm(second)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 6)
+        self.assertEqual(BookingDraft.objects.get(pk=second).status, BookingDraft.STATUS_STAGED)
+
+    def test_insufficient_funds_books_unpaid(self):
+        response = self._confirm(self._stage(passengers=6).data["id"])
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.data["wallet_auto_debited"])
+        self.assertFalse(Booking.objects.filter(paid=True).exists())
+
+    def test_cancelled_draft_cannot_be_confirmed(self):
+        draft_id = self._stage().data["id"]
+        self.assertEqual(self.client.delete(f"/api/drafts/{draft_id}/").status_code, 204)
+        self.assertEqual(self.client.delete(f"/api/drafts/{draft_id}/").status_code, 409)
+        self.assertEqual(self._confirm(draft_id).status_code, 409)
+        self.assertEqual(self._confirm(draft_id + 1).status_code, 404)
+        other = self._stage().data["id"]
+        self.assertEqual(self._confirm(other, {"user_profile_id": self.profile.pk + 1}).status_code, 404)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_list_filters_by_profile_and_status(self):
+        staged, confirmed = self._stage().data["id"], self._stage(passengers=1).data["id"]
+        self._confirm(confirmed)
+        response = self.client.get(f"/api/drafts/?user_profile_id={self.profile.pk}&status=staged")
+        self.assertEqual([draft["id"] for draft in response.data], [staged])
+        self.assertEqual(len(self.client.get(f"/api/drafts/?user_profile_id={self.profile.pk}").data), 2)
+        self.assertEqual(self.client.get("/api/drafts/").status_code, 400)
+        detail = self.client.get(f"/api/drafts/{staged}/").data
+        self.assertEqual(detail["passengers"][1]["passenger_name"], "Member 1")
+
+
+class FakeClock:
+    """Scheduler clock that jumps forward instead of sleeping."""
+
+    def __init__(self, now):
+        self.current = now
+        self.slept = []
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.current += datetime.timedelta(seconds=seconds)
+
+
+@override_settings(TATKAL_ADMISSION={"ENABLED": False})
+class TatkalSchedulerTests(APITestCase):
+    journey_date = datetime.date(2026, 11, 1)
+
+    def setUp(self):
+        self.profiles = []
+        for name in ("alpha", "bravo", "charlie"):
+            user = User.objects.create_user(username=name, password="x")
+            profile = UserProfile.objects.create(user=user, full_name=name.title(), age=30, address="x")
+            profile.deposit_wallet("1000.00")
+            self.profiles.append(profile)
+        create_train_run("12955", "NDLS", "BCT", self.journey_date, coaches=1, berths_per_coach=3)
+        self.opens_at = window_opens_at(self.journey_date)
+
+    def _draft(self, profile, journey_date=None, **fields):
+        return BookingDraft.objects.create(
+            user_profile=profile, source="NDLS", destination="BCT", journey_date=journey_date or self.journey_date,
+            fare_ceiling=Decimal("100.00"), auto_confirm=True,
+            passengers=[{"passenger_name": profile.full_name, "passenger_age": 30, "passenger_sex": "F",
+                         "preferred_berth": "any"}],
+            **fields,
+        )
+
+    def test_window_opens_the_day_before_at_configured_time(self):
+        self.assertEqual(self.opens_at, datetime.datetime(2026, 10, 31, 4, 30, tzinfo=datetime.timezone.utc))
+
+    def test_fires_at_opening_in_fair_order_within_per_user_cap(self):
+        alpha, bravo, charlie = self.profiles
+        first, second, over_cap = self._draft(alpha), self._draft(alpha), self._draft(alpha)
+        others = [self._draft(bravo), self._draft(charlie)]
+        clock = FakeClock(self.opens_at - datetime.timedelta(seconds=100))
+        reports = []
+        TatkalScheduler(clock=clock, workers=0, max_per_user=2).run(
+            horizon=3600, poll=30, once=True, on_report=reports.append
+        )
+        self.assertEqual(clock.now(), self.opens_at)
+        self.assertEqual(clock.slept, [30, 30, 30, 10])
+        report, = reports
+        self.assertEqual(
+            (report.intents, report.booked, report.sold_out, report.capped, report.bookings), (4, 3, 1, 1, 3)
+        )
+        # Three berths: every user's first draft is booked before alpha's second.
+        confirmed = set(BookingDraft.objects.filter(status=BookingDraft.STATUS_CONFIRMED).values_list("id", flat=True))
+        self.assertEqual(confirmed, {first.pk, *(draft.pk for draft in others)})
+        self.assertEqual(BookingDraft.objects.get(pk=second.pk).status, BookingDraft.STATUS_STAGED)
+        self.assertEqual(BookingDraft.objects.get(pk=over_cap.pk).status, BookingDraft.STATUS_STAGED)
+        self.assertEqual(Booking.objects.filter(paid=True, paid_via_wallet=True).count(), 3)
+        self.assertEqual(
+            WalletLedgerEntry.objects.filter(kind=WalletLedgerEntry.KIND_DEBIT, booking__isnull=False).count(), 3
+        )
+
+    def test_heap_orders_rounds_and_skips_other_windows_and_cancelled_drafts(self):
+        alpha, bravo, _ = self.profiles
+        confirmed = self._draft(alpha, status=BookingDraft.STATUS_CONFIRMED)
+        alpha_next, alpha_over = self._draft(alpha), self._draft(alpha)
+        bravo_first, bravo_second = self._draft(bravo), self._draft(bravo)
+        self._draft(bravo, status=BookingDraft.STATUS_CANCELLED)
+        self._draft(bravo, journey_date=self.journey_date + datetime.timedelta(days=5))
+        scheduler = TatkalScheduler(clock=FakeClock(self.opens_at - datetime.timedelta(hours=1)), max_per_user=2)
+        self.assertEqual(scheduler.load(horizon=7200), 3)
+        intents = scheduler.pop_window()
+        self.assertEqual([intent.round for intent in intents], [0, 1, 1])
+        self.assertEqual(intents[0].draft_id, bravo_first.pk)
+        self.assertEqual({intent.draft_id for intent in intents[1:]}, {alpha_next.pk, bravo_second.pk})
+        self.assertNotIn(confirmed.pk, {intent.draft_id for intent in intents})
+        self.assertNotIn(alpha_over.pk, {intent.draft_id for intent in intents})
+        self.assertIsNone(scheduler.next_window())
+
+    def test_fired_window_is_not_fired_again(self):
+        self._draft(self.profiles[0])
+        scheduler = TatkalScheduler(clock=FakeClock(self.opens_at), workers=0)
+        self.assertEqual(scheduler.load(horizon=60), 1)
+        self.assertEqual(scheduler.fire_next_window().booked, 1)
+        self._draft(self.profiles[1])
+        self.assertEqual(scheduler.load(horizon=60), 0)
+
+    def test_staging_refuses_auto_confirm_drafts_beyond_the_cap(self):
+        body = {
+            "user_profile_id": self.profiles[0].pk, "source": "NDLS", "destination": "BCT",
+            "journey_date": str(self.journey_date), "fare_ceiling": "100.00", "auto_confirm": True,
+            "passengers": [{"passenger_name": "A", "passenger_age": 30, "passenger_sex": "F"}],
+        }
+        with override_settings(TATKAL_SCHEDULER={**settings.TATKAL_SCHEDULER, "MAX_PER_USER": 2}):
+            statuses = [self.client.post("/api/drafts/", body, format="json").status_code for _ in range(3)]
+        self.assertEqual(statuses, [201, 201, 400])
+
+    def test_command_fires_an_opened_window(self):
+        self._draft(self.profiles[0], journey_date=timezone.localdate())  # Its window opened yesterday.
+        out = StringIO()
+        with override_settings(TATKAL_SCHEDULER={**settings.TATKAL_SCHEDULER, "GRACE": 10 ** 9}):
+            call_command("run_tatkal_scheduler", "--once", "--horizon", "0", "--workers", "0", stdout=out)
+        self.assertIn("1 booked", out.getvalue())
+        self.assertIn("bookings committed", out.getvalue())
+
+
+class ConcurrentTatkalSchedulerTests(TransactionTestCase):
+    def test_worker_pool_books_each_berth_once(self):
+        journey_date = datetime.date(2026, 11, 3)
+        run = create_train_run("12957", "NDLS", "BCT", journey_date, coaches=1, berths_per_coach=10)
+        for i in range(12):
+            user = User.objects.create_user(username=f"rush{i}", password="x")
+            profile = UserProfile.objects.create(user=user, full_name=f"Rush {i}", age=30, address="x")
+            profile.deposit_wallet("100.00")
+            BookingDraft.objects.create(
+                user_profile=profile, source="NDLS", destination="BCT", journey_date=journey_date,
+                fare_ceiling=Decimal("100.00"), auto_confirm=True,
+                passengers=[{"passenger_name": f"Rush {i}", "passenger_age": 30, "passenger_sex": "M",
+                             "preferred_berth": "any"}],
+            )
+        scheduler = TatkalScheduler(clock=FakeClock(window_opens_at(journey_date)), workers=4)
+        self.assertEqual(scheduler.load(horizon=60), 12)
+        report = scheduler.fire_next_window()
+        self.assertEqual((report.booked, report.sold_out, report.failed, report.bookings), (10, 2, 0, 10))
+        self.assertFalse(Seat.objects.filter(run=run, booking__isnull=True).exists())
+        self.assertEqual(Booking.objects.filter(paid=True).count(), 10)
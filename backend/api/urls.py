@@ -1,11 +1,16 @@
 from django.urls import path
 
+from . import async_views
+
 from .views import (
     health,
+    metrics,
     user_profile_list_create,
     user_profile_detail,
+    user_profile_import,
     tatkal_booking_create,
     tatkal_booking_status,
+    tatkal_booking_poll,
     tatkal_booking_cancel,
     auto_fill_suggestions,
     payment_initiate,
@@ -15,8 +20,14 @@ from .views import (
     register_user,
     deposit_wallet,
     create_booking,
+    create_group_booking,
+    booking_draft_list_create,
+    booking_draft_detail,
+    booking_draft_confirm,
     get_profile,
-    get_bookings
+    get_bookings,
+    berth_availability,
+    berth_availability_cache_stats,
 )
 
 urlpatterns = [
@@ -24,18 +35,36 @@ urlpatterns = [
     path('register_user/', register_user, name='register_user'),
     path('deposit_wallet/', deposit_wallet, name='deposit_wallet'),
     path('create_booking/', create_booking, name='create_booking'),
+    path('create_group_booking/', create_group_booking, name='create_group_booking'),
+    path('drafts/', booking_draft_list_create, name='booking_draft_list_create'),
+    path('drafts/<int:draft_id>/', booking_draft_detail, name='booking_draft_detail'),
+    path('drafts/<int:draft_id>/confirm/', booking_draft_confirm, name='booking_draft_confirm'),
     path('get_profile/<int:user_id>/', get_profile, name='get_profile'),
     path('get_bookings/<int:user_id>/', get_bookings, name='get_bookings'),
+    path('availability/', berth_availability, name='berth_availability'),
+    path('availability/cache_stats/', berth_availability_cache_stats, name='berth_availability_cache_stats'),
 
     # Existing endpoints
     path('health/', health, name='Health'),
+    path('metrics/', metrics, name='metrics'),
     path('user_profiles/', user_profile_list_create, name='user_profile_list_create'),
+    path('user_profiles/import/', user_profile_import, name='user_profile_import'),
     path('user_profiles/<int:user_id>/', user_profile_detail, name='user_profile_detail'),
     path('auto_fill/<int:user_profile_id>/', auto_fill_suggestions, name='auto_fill_suggestions'),
     path('bookings/', tatkal_booking_create, name='tatkal_booking_create'),
     path('bookings/<int:booking_id>/', tatkal_booking_status, name='tatkal_booking_status'),
+    path('bookings/<int:booking_id>/status/', tatkal_booking_poll, name='tatkal_booking_poll'),
     path('bookings/<int:booking_id>/cancel/', tatkal_booking_cancel, name='tatkal_booking_cancel'),
     path('payment/initiate/', payment_initiate, name='payment_initiate'),
     path('payment/callback/', payment_callback, name='payment_callback'),
-    path('payment/<int:payment_transaction_id>/status/', payment_status, name='payment_status')
+    path('payment/<int:payment_transaction_id>/status/', payment_status, name='payment_status'),
+
+    # ASGI-native variants of the hot endpoints
+    path('async/create_booking/', async_views.create_booking, name='async_create_booking'),
+    path('async/deposit_wallet/', async_views.deposit_wallet, name='async_deposit_wallet'),
+    path('async/bookings/<int:booking_id>/', async_views.tatkal_booking_status, name='async_tatkal_booking_status'),
+    path('async/bookings/<int:booking_id>/status/', async_views.tatkal_booking_poll,
+         name='async_tatkal_booking_poll'),
+    path('async/bookings/<int:booking_id>/events/', async_views.booking_events, name='async_booking_events'),
+    path('async/payment/callback/', async_views.payment_callback, name='async_payment_callback'),
 ]
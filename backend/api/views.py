@@ -1,21 +1,67 @@
+import codecs
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status as drf_status
 from django.contrib.auth.models import User
-from .models import UserProfile, Booking, PaymentTransaction
+from .models import UserProfile, Booking, BookingDraft, PaymentTransaction
 from .serializers import (
     UserProfileSerializer, BookingSerializer, PaymentTransactionSerializer,
-    DepositWalletSerializer, BookingCreateSerializer
+    DepositWalletSerializer, BookingCreateSerializer, GroupBookingCreateSerializer, BookingDraftSerializer
+)
+from .wallet import pay_bookings_via_wallet
+from .inventory import (
+    allocate_berth, release_berth, segment_availability, NoBerthAvailable, AVAILABILITY_CACHE, BERTH_TYPES
 )
+from .services import create_and_pay_booking, initiate_payment, submit_payment_callback
+from .drafts import DraftNotConfirmable, cancel_draft, confirm_draft
+from .admission import admission_controlled
+from .metrics import REGISTRY as METRICS_REGISTRY, CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE
+from .pagination import KeysetPaginator, InvalidCursor, wants_stream, stream_ndjson
+from .status_poll import booking_status_body, status_response
+from .events import notify_booking_changed
+from .profile_cache import profile_data, profile_data_for_user
+from .profile_import import import_profiles, read_rows
+from .hashing import HashingBusy, hash_password
+from django.conf import settings
 from django.db import transaction
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_safe
+from django.utils.dateparse import parse_date
+
+# Streamed bulk-import bodies by content type; anything else is read as a JSON list of rows.
+PROFILE_IMPORT_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson"}
+
+# Statuses a booking can be cancelled from; failed and cancelled bookings hold no berth or payment.
+CANCELLABLE_STATUSES = ("booked", "initiated", "payment_pending")
 
-import random
-import string
+# Newest first; id breaks ties between bookings made in the same instant.
+BOOKING_HISTORY_PAGINATOR = KeysetPaginator(ordering=('-booking_time', '-id'))
+PROFILE_LIST_PAGINATOR = KeysetPaginator(ordering=('id',))
+
+
+def _paginated_response(paginator, queryset, request, serializer_class):
+    """Render one keyset page (or the NDJSON stream if requested) of `queryset`."""
+    if wants_stream(request):
+        return stream_ndjson(queryset.order_by(*paginator.ordering), serializer_class)
+    try:
+        rows, next_cursor = paginator.paginate(queryset, request)
+    except InvalidCursor as exc:
+        return Response({"error": str(exc)}, status=drf_status.HTTP_400_BAD_REQUEST)
+    response = Response(serializer_class(rows, many=True).data)
+    if next_cursor:
+        response["Link"] = paginator.link_header(request, next_cursor)
+    return response
 
-# Dummy Razorpay setup (Replace with real integration, fetch keys from env)
-RAZORPAY_MOCK_KEY = "rzp_test_mocked"
-RAZORPAY_MOCK_SECRET = "secret_key_mocked"
+
+def _hashing_busy_response(exc):
+    return Response(
+        {"error": str(exc.detail)}, status=exc.status_code, headers={"Retry-After": str(exc.wait)},
+    )
 
 # ----------------------------- Custom Core Tatkal Endpoints -----------------------------
 
@@ -35,7 +81,11 @@ def register_user(request):
     password = request.data["password"]
     if User.objects.filter(username=username).exists():
         return Response({"error": "Username already exists."}, status=drf_status.HTTP_400_BAD_REQUEST)
-    user = User.objects.create_user(username=username, password=password)
+    try:
+        encoded = hash_password(password)
+    except HashingBusy as exc:
+        return _hashing_busy_response(exc)
+    user = User.objects.create(username=User.normalize_username(username), password=encoded)
     # Create UserProfile
     profile = UserProfile.objects.create(
         user=user,
@@ -65,29 +115,139 @@ def deposit_wallet(request):
     amount = serializer.validated_data["amount"]
     profile.deposit_wallet(amount)
     return Response({
-        "wallet_balance": profile.wallet_balance,
+        "wallet_balance": profile.available_wallet_balance,
         "deposited": f"{amount}"
     })
 
 # PUBLIC_INTERFACE
 @api_view(['POST'])
+@admission_controlled
 def create_booking(request):
     """
-    Create a booking and auto-debit from wallet if enough funds. Expects all Booking fields + user_profile_id.
+    Create a booking, allocate a berth (when the train run has seat inventory) and
+    auto-debit from wallet if enough funds. Expects all Booking fields + user_profile_id.
     """
     serializer = BookingCreateSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=drf_status.HTTP_400_BAD_REQUEST)
-    with transaction.atomic():
-        booking = serializer.save()
-        # Try auto wallet debit
-        paid = booking.try_pay_via_wallet()
-        booking.refresh_from_db()  # For .paid values
-        data = BookingSerializer(booking).data
-        data["wallet_auto_debited"] = paid
-        if not paid:
-            data["error"] = "Booking created, but insufficient funds for auto payment. Please recharge wallet."
-        return Response(data, status=drf_status.HTTP_201_CREATED)
+    try:
+        booking, paid = create_and_pay_booking(serializer)
+    except NoBerthAvailable as exc:
+        return Response({"error": str(exc)}, status=drf_status.HTTP_409_CONFLICT)
+    data = BookingSerializer(booking).data
+    data["wallet_auto_debited"] = paid
+    if not paid:
+        data["error"] = "Booking created, but insufficient funds for auto payment. Please recharge wallet."
+    return Response(data, status=drf_status.HTTP_201_CREATED)
+
+# PUBLIC_INTERFACE
+@api_view(['POST'])
+def create_group_booking(request):
+    """
+    Create bookings for up to six passengers on one journey, allocate their berths and
+    auto-debit the combined fare from wallet. All passengers get berths or none are booked.
+    Expects: user_profile_id, source, destination, journey_date, passengers[] (passenger fields + berth + fare).
+    """
+    serializer = GroupBookingCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=drf_status.HTTP_400_BAD_REQUEST)
+    try:
+        with transaction.atomic():
+            bookings = serializer.save()
+            for booking in bookings:
+                allocate_berth(booking)
+            profile = serializer.validated_data["user_profile"]
+            paid = pay_bookings_via_wallet(profile.pk, bookings)
+    except NoBerthAvailable as exc:
+        return Response({"error": str(exc)}, status=drf_status.HTTP_409_CONFLICT)
+    profile.refresh_wallet()
+    data = {
+        "bookings": BookingSerializer(bookings, many=True).data,
+        "wallet_auto_debited": paid,
+    }
+    if not paid:
+        data["error"] = "Bookings created, but insufficient funds for auto payment. Please recharge wallet."
+    return Response(data, status=drf_status.HTTP_201_CREATED)
+
+# PUBLIC_INTERFACE
+@api_view(['GET', 'POST'])
+def booking_draft_list_create(request):
+    """
+    GET ?user_profile_id= lists that profile's booking drafts, newest first (?status= filters).
+    POST stages a draft: user_profile_id, source, destination, journey_date, fare_ceiling,
+    passengers[] (passenger_name, passenger_age, passenger_sex, preferred_berth), auto_confirm.
+    It is fully validated now, so confirming it when the Tatkal window opens is a single light
+    call. With auto_confirm the server confirms it itself at the opening instant.
+    """
+    if request.method == 'GET':
+        profile_id = request.query_params.get("user_profile_id")
+        if not profile_id or not profile_id.isdigit():
+            return Response({"error": "user_profile_id is required."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        drafts = BookingDraft.objects.filter(user_profile_id=profile_id).order_by('-id')
+        if request.query_params.get("status"):
+            drafts = drafts.filter(status=request.query_params["status"])
+        return Response(BookingDraftSerializer(drafts, many=True).data)
+    serializer = BookingDraftSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=drf_status.HTTP_400_BAD_REQUEST)
+    serializer.save()
+    return Response(serializer.data, status=drf_status.HTTP_201_CREATED)
+
+# PUBLIC_INTERFACE
+@api_view(['GET', 'DELETE'])
+def booking_draft_detail(request, draft_id):
+    """GET a booking draft; DELETE cancels it while it is still staged."""
+    if request.method == 'DELETE':
+        if cancel_draft(draft_id):
+            return Response(status=drf_status.HTTP_204_NO_CONTENT)
+        if BookingDraft.objects.filter(pk=draft_id).exists():
+            return Response({"error": "Only staged drafts can be cancelled."}, status=drf_status.HTTP_409_CONFLICT)
+        return Response({"error": "Booking draft not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+    try:
+        draft = BookingDraft.objects.get(pk=draft_id)
+    except BookingDraft.DoesNotExist:
+        return Response({"error": "Booking draft not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+    return Response(BookingDraftSerializer(draft).data)
+
+# PUBLIC_INTERFACE
+@api_view(['POST'])
+@admission_controlled
+def booking_draft_confirm(request, draft_id):
+    """
+    Turn a staged draft into bookings, allocate berths and auto-debit the combined fare from wallet.
+    Body: {user_profile_id, fare}. user_profile_id (the draft's owner) keys admission control like
+    other booking requests. fare, the per-passenger fare quoted now, must not exceed the draft's
+    fare_ceiling, which is charged when no fare is sent. 201 on confirmation; confirming an
+    already confirmed draft again returns its bookings with 200.
+    """
+    data = request.data if hasattr(request.data, "get") else {}
+    profile_id = data.get("user_profile_id")
+    if profile_id not in (None, ""):
+        if not str(profile_id).isdigit():
+            return Response({"error": "user_profile_id must be an id."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        profile_id = int(profile_id)
+    else:
+        profile_id = None
+    fare = data.get("fare")
+    if fare not in (None, ""):
+        try:
+            fare = Decimal(str(fare))
+        except InvalidOperation:
+            return Response({"error": "fare must be a decimal amount."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        if not fare.is_finite() or fare <= 0:
+            return Response({"error": "fare must be positive."}, status=drf_status.HTTP_400_BAD_REQUEST)
+    else:
+        fare = None
+    try:
+        bookings, paid, created = confirm_draft(draft_id, fare, profile_id)
+    except BookingDraft.DoesNotExist:
+        return Response({"error": "Booking draft not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+    except (DraftNotConfirmable, NoBerthAvailable) as exc:
+        return Response({"error": str(exc)}, status=drf_status.HTTP_409_CONFLICT)
+    data = {"draft_id": draft_id, "bookings": bookings, "wallet_auto_debited": paid}
+    if not paid:
+        data["error"] = "Bookings created, but insufficient funds for auto payment. Please recharge wallet."
+    return Response(data, status=drf_status.HTTP_201_CREATED if created else drf_status.HTTP_200_OK)
 
 # PUBLIC_INTERFACE
 @api_view(['GET'])
@@ -95,27 +255,63 @@ def get_profile(request, user_id):
     """
     Get UserProfile for a user by ID.
     """
-    try:
-        user = User.objects.get(id=user_id)
-        profile = user.profile
-        return Response(UserProfileSerializer(profile).data)
-    except Exception:
+    data = profile_data_for_user(user_id)
+    if data is None:
         return Response({"error": "Profile not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+    return Response(data)
 
 # PUBLIC_INTERFACE
 @api_view(['GET'])
 def get_bookings(request, user_id):
     """
-    Get all bookings for a UserProfile by user_id.
+    Get bookings for a UserProfile by user_id, newest first.
+
+    Keyset-paginated: ?limit= sets the page size and the next page URL is in the Link header.
+    ?stream=ndjson streams the full history as newline-delimited JSON instead.
     """
-    try:
-        user = User.objects.get(id=user_id)
-        profile = user.profile
-    except Exception:
+    profile_id = UserProfile.objects.filter(user_id=user_id).values_list('id', flat=True).first()
+    if profile_id is None:
         return Response({"error": "User Profile not found."}, status=drf_status.HTTP_404_NOT_FOUND)
-    bookings = Booking.objects.filter(user_profile=profile).order_by('-booking_time')
-    serializer = BookingSerializer(bookings, many=True)
-    return Response(serializer.data)
+    bookings = BookingSerializer.setup_eager_loading(Booking.objects.filter(user_profile_id=profile_id))
+    return _paginated_response(BOOKING_HISTORY_PAGINATOR, bookings, request, BookingSerializer)
+
+# PUBLIC_INTERFACE
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def berth_availability(request):
+    """
+    Unsold berths per berth type for a segment on a date, served from the availability cache.
+    Query params: source, destination, journey_date (YYYY-MM-DD), optional berth.
+    """
+    source = request.query_params.get("source")
+    destination = request.query_params.get("destination")
+    try:
+        journey_date = parse_date(request.query_params.get("journey_date") or "")
+    except ValueError:
+        journey_date = None
+    if not source or not destination or journey_date is None:
+        return Response(
+            {"error": "source, destination and journey_date (YYYY-MM-DD) are required."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    berth = request.query_params.get("berth")
+    if berth is not None and berth not in BERTH_TYPES:
+        return Response({"error": f"berth must be one of {', '.join(BERTH_TYPES)}."},
+                        status=drf_status.HTTP_400_BAD_REQUEST)
+    counts = segment_availability(source, destination, journey_date, (berth,) if berth else BERTH_TYPES)
+    return Response({
+        "source": source,
+        "destination": destination,
+        "journey_date": journey_date,
+        "availability": counts,
+    })
+
+# PUBLIC_INTERFACE
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def berth_availability_cache_stats(request):
+    """Hit/miss/eviction counters of this worker's availability cache."""
+    return Response(AVAILABILITY_CACHE.stats())
 
 # ---------------- Legacy endpoints for backwards compatibility -------------------------
 
@@ -124,6 +320,13 @@ def health(request):
     """API Health Check."""
     return Response({"message": "Server is up!"})
 
+# PUBLIC_INTERFACE
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def metrics(request):
+    """This worker's request metrics (latency, SQL, serializer time, response size) in Prometheus text format."""
+    return HttpResponse(METRICS_REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 # PUBLIC_INTERFACE
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
@@ -131,11 +334,12 @@ def user_profile_list_create(request):
     """
     Get all user profiles or create a new user profile.
 
+    GET is keyset-paginated by id (?limit=, ?cursor= via the Link header) or streamed with ?stream=ndjson.
     POST body: {username, password, full_name, age, address, preferred_berth, auto_fill_enabled}
     """
     if request.method == 'GET':
-        profiles = UserProfile.objects.all()
-        return Response(UserProfileSerializer(profiles, many=True).data)
+        profiles = UserProfileSerializer.setup_eager_loading(UserProfile.objects.all())
+        return _paginated_response(PROFILE_LIST_PAGINATOR, profiles, request, UserProfileSerializer)
 
     # Handle user registration ("sign up")
     required_fields = ['username', 'password', 'full_name', 'age', 'address', 'preferred_berth']
@@ -148,8 +352,11 @@ def user_profile_list_create(request):
 
     if User.objects.filter(username=username).exists():
         return Response({"error": "User already exists."}, status=drf_status.HTTP_400_BAD_REQUEST)
-    user = User(username=username)
-    user.set_password(password)
+    try:
+        encoded = hash_password(password)
+    except HashingBusy as exc:
+        return _hashing_busy_response(exc)
+    user = User(username=username, password=encoded)
     user.save()
 
     # Only use allowed fields for UserProfile creation
@@ -167,6 +374,39 @@ def user_profile_list_create(request):
     serializer = UserProfileSerializer(profile)
     return Response(serializer.data, status=drf_status.HTTP_201_CREATED)
 
+# PUBLIC_INTERFACE
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def user_profile_import(request):
+    """
+    Bulk-create travellers with their profiles and opening wallet deposits.
+    Body: CSV with a header row (Content-Type: text/csv), NDJSON (application/x-ndjson), or
+    JSON {"profiles": [...]}. Row fields: username, password, full_name, age, address,
+    preferred_berth, auto_fill_enabled, wallet_deposit. Invalid rows are skipped and listed
+    by line number in the returned report. A body of more than PROFILE_IMPORT_MAX_ROWS rows
+    gets 413 and imports nothing; larger files go through `manage.py import_profiles`.
+    """
+    fmt = PROFILE_IMPORT_FORMATS.get(request.content_type.split(";")[0].strip())
+    if fmt is not None:
+        rows = read_rows(codecs.iterdecode(request.stream or (), "utf-8-sig", errors="replace"), fmt)
+    else:
+        data = request.data.get("profiles") if isinstance(request.data, dict) else request.data
+        if not isinstance(data, list):
+            return Response(
+                {"error": "Send CSV (text/csv), NDJSON (application/x-ndjson) or JSON {\"profiles\": [...]}."},
+                status=drf_status.HTTP_400_BAD_REQUEST,
+            )
+        rows = ((number, row if isinstance(row, dict) else None) for number, row in enumerate(data, start=1))
+    # Read one row past the limit, so an oversized stream is refused before any of it is imported.
+    limit = settings.PROFILE_IMPORT_MAX_ROWS
+    rows = list(islice(rows, limit + 1))
+    if len(rows) > limit:
+        return Response(
+            {"error": f"At most {limit} rows per request. Import larger files with manage.py import_profiles."},
+            status=drf_status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    return Response(import_profiles(rows).as_dict())
+
 # PUBLIC_INTERFACE
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([AllowAny])
@@ -174,15 +414,18 @@ def user_profile_detail(request, user_id):
     """
     Retrieve, update, or delete a user profile.
     """
+    if request.method == 'GET':
+        data = profile_data_for_user(user_id)
+        if data is None:
+            return Response({"error": "User profile not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+        return Response(data)
     try:
         user = User.objects.get(id=user_id)
         profile = user.profile
     except Exception:
         return Response({"error": "User profile not found."}, status=drf_status.HTTP_404_NOT_FOUND)
-    
-    if request.method == 'GET':
-        return Response(UserProfileSerializer(profile).data)
-    elif request.method == 'PUT':
+
+    if request.method == 'PUT':
         serializer = UserProfileSerializer(profile, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -195,6 +438,7 @@ def user_profile_detail(request, user_id):
 # PUBLIC_INTERFACE
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@admission_controlled
 def tatkal_booking_create(request):
     """
     Initiate a fast Tatkal booking. Includes robust validation and status feedback.
@@ -206,7 +450,12 @@ def tatkal_booking_create(request):
     """
     serializer = BookingSerializer(data=request.data)
     if serializer.is_valid():
-        booking = serializer.save(booking_status="payment_pending")
+        try:
+            with transaction.atomic():
+                booking = serializer.save(booking_status="payment_pending")
+                allocate_berth(booking)
+        except NoBerthAvailable as exc:
+            return Response({"error": str(exc)}, status=drf_status.HTTP_409_CONFLICT)
         return Response(BookingSerializer(booking).data, status=drf_status.HTTP_201_CREATED)
     return Response(serializer.errors, status=drf_status.HTTP_400_BAD_REQUEST)
 
@@ -220,28 +469,52 @@ def tatkal_booking_status(request, booking_id):
     Params: booking_id
     """
     try:
-        booking = Booking.objects.get(id=booking_id)
+        booking = BookingSerializer.setup_eager_loading(Booking.objects.all()).get(id=booking_id)
         return Response(BookingSerializer(booking).data)
     except Booking.DoesNotExist:
         return Response({"error": "Booking not found."}, status=drf_status.HTTP_404_NOT_FOUND)
 
+# PUBLIC_INTERFACE
+@require_safe
+def tatkal_booking_poll(request, booking_id):
+    """
+    Compact booking status for polling clients: id, booking_status, pnr, paid,
+    paid_via_wallet and payment_time. Send the returned ETag as If-None-Match
+    to get 304 while nothing has changed. A plain Django view; see api/status_poll.py.
+    """
+    body = booking_status_body(booking_id)
+    if body is None:
+        return JsonResponse({"error": "Booking not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+    return status_response(request, body)
+
 # PUBLIC_INTERFACE
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def tatkal_booking_cancel(request, booking_id):
     """
-    Cancel an existing booking by ID.
+    Cancel an existing booking by ID. Its berth returns to the pool and
+    bookings paid via wallet are refunded to the wallet.
     """
-    try:
-        booking = Booking.objects.get(id=booking_id)
-        if booking.booking_status not in ["booked", "initiated", "payment_pending"]:
-            return Response({"error": "Cannot cancel this booking."}, status=drf_status.HTTP_400_BAD_REQUEST)
-        booking.booking_status = "cancelled"
-        booking.feedback = request.data.get("feedback", "")
-        booking.save()
+    with transaction.atomic():
+        # Conditional UPDATE: of concurrent cancels only one flips the status, releases and refunds.
+        cancelled = Booking.objects.filter(id=booking_id, booking_status__in=CANCELLABLE_STATUSES).update(
+            booking_status="cancelled", feedback=request.data.get("feedback", "")
+        )
+        if cancelled:
+            booking = Booking.objects.get(id=booking_id)
+            notify_booking_changed(booking.pk)
+            release_berth(booking)
+            booking.refund_to_wallet()
+    if cancelled:
         return Response({"success": "Booking cancelled."}, status=drf_status.HTTP_200_OK)
-    except Booking.DoesNotExist:
-        return Response({"error": "Booking not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+    if Booking.objects.filter(id=booking_id).exists():
+        return Response({"error": "Cannot cancel this booking."}, status=drf_status.HTTP_400_BAD_REQUEST)
+    return Response({"error": "Booking not found."}, status=drf_status.HTTP_404_NOT_FOUND)
+
+
+# Profile fields the booking form pre-fills (phone and preferred_payment_mode left the profile in 0002).
+AUTO_FILL_FIELDS = ('full_name', 'age', 'address', 'preferred_berth', 'auto_fill_enabled')
+
 
 # PUBLIC_INTERFACE
 @api_view(['GET', 'POST'])
@@ -252,18 +525,18 @@ def auto_fill_suggestions(request, user_profile_id):
     GET returns the profile data for pre-filling booking UI.
     POST updates the auto-fill setting for the profile.
     """
+    if request.method == 'GET':
+        data = profile_data(user_profile_id)
+        if data is None:
+            return Response({"error": "UserProfile not found"}, status=drf_status.HTTP_404_NOT_FOUND)
+        return Response({k: data[k] for k in AUTO_FILL_FIELDS})
     try:
         profile = UserProfile.objects.get(id=user_profile_id)
     except UserProfile.DoesNotExist:
         return Response({"error": "UserProfile not found"}, status=drf_status.HTTP_404_NOT_FOUND)
-    
-    if request.method == 'GET':
-        data = UserProfileSerializer(profile).data
-        return Response({k: data[k] for k in ['full_name', 'age', 'phone', 'preferred_payment_mode', 'auto_fill_enabled']})
-    elif request.method == 'POST':
-        profile.auto_fill_enabled = request.data.get('auto_fill_enabled', profile.auto_fill_enabled)
-        profile.save()
-        return Response({"auto_fill_enabled": profile.auto_fill_enabled})
+    profile.auto_fill_enabled = request.data.get('auto_fill_enabled', profile.auto_fill_enabled)
+    profile.save(update_fields=['auto_fill_enabled'])
+    return Response({"auto_fill_enabled": profile.auto_fill_enabled})
 
 # PUBLIC_INTERFACE
 @api_view(['POST'])
@@ -273,7 +546,8 @@ def payment_initiate(request):
     Initiates a payment session for a Tatkal booking.
     POST body: { booking_id, amount }
 
-    Simulates Razorpay payment initiation and returns order ID and payment link.
+    Returns 202 at once; the Razorpay order (order_id and payment_url) is created by a
+    payment worker and appears on the pollable status_url.
     """
     booking_id = request.data.get("booking_id")
     amount = request.data.get("amount")
@@ -282,20 +556,13 @@ def payment_initiate(request):
     except Booking.DoesNotExist:
         return Response({"error": "Booking not found."}, status=drf_status.HTTP_404_NOT_FOUND)
 
-    # Simulate creation of a Razorpay order
-    order_id = "order_" + ''.join(random.choices(string.ascii_lowercase + string.digits, k=10))
-    payment_txn = PaymentTransaction.objects.create(
-        booking=booking, order_id=order_id, status="pending", amount=amount
-    )
-    # This would be replaced by a real Razorpay payment_url
-    payment_url = f"https://checkout.razorpay.com/v1/checkout.js?order_id={order_id}&key_id={RAZORPAY_MOCK_KEY}"
-
+    payment_txn = initiate_payment(booking, amount)
     return Response({
         "success": True,
-        "order_id": order_id,
-        "payment_url": payment_url,
-        "payment_transaction_id": payment_txn.id
-    })
+        "status": payment_txn.status,
+        "payment_transaction_id": payment_txn.id,
+        "status_url": reverse("payment_status", args=[payment_txn.id]),
+    }, status=drf_status.HTTP_202_ACCEPTED)
 
 # PUBLIC_INTERFACE
 @api_view(['POST'])
@@ -304,27 +571,25 @@ def payment_callback(request):
     """
     Handles Razorpay payment callback (mocked for demo).
     POST body: { payment_transaction_id, payment_id, status }
+
+    Reconciliation and PNR issuance run on a payment worker: a new callback gets 202 and a
+    status_url to poll. Idempotent: a redelivered callback that has been processed gets the
+    stored response and changes nothing.
     """
     payment_transaction_id = request.data.get("payment_transaction_id")
-    payment_id = request.data.get("payment_id")
-    status_str = request.data.get("status", "success")
     try:
-        payment = PaymentTransaction.objects.get(id=payment_transaction_id)
+        stored, job = submit_payment_callback(
+            payment_transaction_id, request.data.get("payment_id"), request.data.get("status", "success")
+        )
     except PaymentTransaction.DoesNotExist:
         return Response({"error": "Payment transaction not found."}, status=drf_status.HTTP_404_NOT_FOUND)
-    payment.payment_id = payment_id
-    payment.status = "success" if status_str == "success" else "failed"
-    # Mark booking accordingly
-    booking = payment.booking
-    if payment.status == "success":
-        booking.booking_status = "booked"
-        # Generate dummy PNR
-        booking.pnr = ''.join(random.choices(string.digits, k=10))
-    else:
-        booking.booking_status = "failed"
-    booking.save()
-    payment.save()
-    return Response({"booking_status": booking.booking_status, "pnr": booking.pnr})
+    if stored is not None:
+        return Response(stored)
+    return Response({
+        "status": job.status,
+        "payment_transaction_id": job.payment_transaction_id,
+        "status_url": reverse("payment_status", args=[job.payment_transaction_id]),
+    }, status=drf_status.HTTP_202_ACCEPTED)
 
 # PUBLIC_INTERFACE
 @api_view(['GET'])
@@ -334,7 +599,9 @@ def payment_status(request, payment_transaction_id):
     Returns status on payment transaction for a booking.
     """
     try:
-        payment = PaymentTransaction.objects.get(id=payment_transaction_id)
+        payment = PaymentTransactionSerializer.setup_eager_loading(
+            PaymentTransaction.objects.all()
+        ).get(id=payment_transaction_id)
         return Response(PaymentTransactionSerializer(payment).data)
     except PaymentTransaction.DoesNotExist:
         return Response({"error": "Payment transaction not found."}, status=drf_status.HTTP_404_NOT_FOUND)
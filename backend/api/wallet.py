@@ -0,0 +1,278 @@
+"""
+Wallet debit engine and append-only wallet ledger.
+
+Every wallet movement is appended to `WalletLedgerEntry`. Credits (deposits,
+refunds) are plain inserts and never touch the profile row. Debits must be
+guarded against overdraft, so they are applied to the profile snapshot as a
+single conditional UPDATE and recorded in the ledger in the same transaction.
+Two fallbacks are available for backends or call sites that need them: a
+pessimistic `select_for_update` path and an optimistic version check.
+
+The spendable balance is `UserProfile.wallet_balance` (the snapshot) plus the
+credits appended after `wallet_snapshot_through`. `compact_wallet` folds those
+credits into the snapshot so the delta stays small.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import BigIntegerField, DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .events import notify_booking_changed
+from .models import Booking, UserProfile, WalletLedgerEntry
+
+STRATEGY_ATOMIC = "atomic"
+STRATEGY_LOCKED = "locked"
+STRATEGY_OPTIMISTIC = "optimistic"
+
+# Retries before an optimistic debit gives up and falls back to row locking.
+OPTIMISTIC_MAX_RETRIES = 5
+
+# Entries younger than this are left out of compaction, so a credit whose transaction
+# commits after a higher-id entry is never skipped by the snapshot pointer.
+SNAPSHOT_GRACE = timedelta(seconds=30)
+
+ZERO = Decimal("0.00")
+_MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+
+# PUBLIC_INTERFACE
+def pending_credit_expression():
+    """Expression for credits appended after the snapshot, usable in UserProfile annotations."""
+    credits = (
+        WalletLedgerEntry.objects
+        .filter(profile=OuterRef("pk"), id__gt=OuterRef("wallet_snapshot_through"), amount__gt=0)
+        .order_by()
+        .values("profile")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    return Coalesce(Subquery(credits), Value(ZERO), output_field=_MONEY)
+
+
+# PUBLIC_INTERFACE
+def pending_wallet_credit(profile_id, snapshot_through) -> Decimal:
+    """Sum of credits appended after `snapshot_through` for one profile."""
+    total = WalletLedgerEntry.objects.filter(
+        profile_id=profile_id, id__gt=snapshot_through, amount__gt=0
+    ).aggregate(total=Sum("amount"))["total"]
+    return total or ZERO
+
+
+# PUBLIC_INTERFACE
+def debit_wallet(profile_id, amount, strategy=STRATEGY_ATOMIC, booking=None) -> bool:
+    """
+    Debit `amount` from the profile wallet if the balance covers it.
+    Returns True if the debit was applied, False on insufficient funds.
+    """
+    amt = Decimal(amount)
+    if amt <= 0:
+        return False
+    if strategy == STRATEGY_ATOMIC:
+        apply = _debit_atomic
+    elif strategy == STRATEGY_LOCKED:
+        apply = _debit_locked
+    elif strategy == STRATEGY_OPTIMISTIC:
+        apply = _debit_optimistic
+    else:
+        raise ValueError(f"Unknown wallet debit strategy: {strategy}")
+    with transaction.atomic():
+        if not apply(profile_id, amt):
+            return False
+        WalletLedgerEntry.objects.create(
+            profile_id=profile_id, kind=WalletLedgerEntry.KIND_DEBIT, amount=-amt, booking=booking
+        )
+    return True
+
+
+# PUBLIC_INTERFACE
+def pay_bookings_via_wallet(profile_id, bookings) -> bool:
+    """
+    Pay several unpaid bookings of one profile with a single combined wallet debit.
+    Either every booking is marked paid or none is. Returns True on success.
+    The ledger gets one debit entry per booking, so refunds and debits line up by booking.
+    """
+    unpaid = [booking for booking in bookings if not booking.paid]
+    total = sum((booking.fare for booking in unpaid), ZERO)
+    if not unpaid or total <= 0:
+        return False
+    with transaction.atomic():
+        # One conditional UPDATE for the total: the balance must cover every booking or none is paid.
+        if not _debit_atomic(profile_id, total):
+            return False
+        for booking in unpaid:
+            WalletLedgerEntry.objects.create(
+                profile_id=profile_id, kind=WalletLedgerEntry.KIND_DEBIT, amount=-booking.fare, booking=booking
+            )
+        Booking.objects.filter(pk__in=[booking.pk for booking in unpaid]).update(
+            paid=True, paid_via_wallet=True, booking_status="booked"
+        )
+        notify_booking_changed(*[booking.pk for booking in unpaid])
+    for booking in unpaid:
+        booking.paid = True
+        booking.paid_via_wallet = True
+        booking.booking_status = "booked"
+    return True
+
+
+# PUBLIC_INTERFACE
+def credit_wallet(profile_id, amount, kind=WalletLedgerEntry.KIND_DEPOSIT, booking=None) -> WalletLedgerEntry:
+    """Append a credit to the wallet ledger. Does not write the profile row."""
+    return WalletLedgerEntry.objects.create(
+        profile_id=profile_id, kind=kind, amount=Decimal(amount), booking=booking
+    )
+
+
+# PUBLIC_INTERFACE
+async def acredit_wallet(profile_id, amount, kind=WalletLedgerEntry.KIND_DEPOSIT, booking=None) -> WalletLedgerEntry:
+    """Async credit_wallet: a single INSERT, safe to run on the event loop via the async ORM."""
+    return await WalletLedgerEntry.objects.acreate(
+        profile_id=profile_id, kind=kind, amount=Decimal(amount), booking=booking
+    )
+
+
+# PUBLIC_INTERFACE
+async def aavailable_balance(profile_id) -> Decimal:
+    """Async read of snapshot balance plus pending credits in one query."""
+    return await (
+        UserProfile.objects.filter(pk=profile_id)
+        .annotate(available=F("wallet_balance") + pending_credit_expression())
+        .values_list("available", flat=True)
+        .aget()
+    )
+
+
+# PUBLIC_INTERFACE
+def compact_wallet(profile_id, now=None) -> bool:
+    """
+    Fold settled ledger credits into the profile snapshot.
+    Returns True if the snapshot moved forward.
+    """
+    horizon = (now or timezone.now()) - SNAPSHOT_GRACE
+    with transaction.atomic():
+        through = (
+            UserProfile.objects.select_for_update()
+            .values_list("wallet_snapshot_through", flat=True)
+            .get(pk=profile_id)
+        )
+        last = WalletLedgerEntry.objects.filter(
+            profile_id=profile_id, id__gt=through, created_at__lt=horizon
+        ).aggregate(last=Max("id"))["last"]
+        if last is None:
+            return False
+        credits = WalletLedgerEntry.objects.filter(
+            profile_id=profile_id, id__gt=through, id__lte=last, amount__gt=0
+        ).aggregate(total=Sum("amount"))["total"] or ZERO
+        UserProfile.objects.filter(pk=profile_id).update(
+            wallet_balance=F("wallet_balance") + credits,
+            wallet_snapshot_through=last,
+            wallet_version=F("wallet_version") + 1,
+        )
+    return True
+
+
+# PUBLIC_INTERFACE
+def rebuild_snapshots(profile_ids, now=None) -> int:
+    """
+    Recompute the snapshot of each profile from its full ledger history in bulk.
+    Returns the number of profiles rewritten.
+    """
+    horizon = (now or timezone.now()) - SNAPSHOT_GRACE
+    entries = WalletLedgerEntry.objects.filter(profile=OuterRef("pk")).order_by().values("profile")
+    settled = entries.filter(created_at__lt=horizon).annotate(last=Max("id")).values("last")
+    debits = entries.filter(amount__lt=0).annotate(total=Sum("amount")).values("total")
+    credits = entries.filter(amount__gt=0, id__lte=OuterRef("settled")).annotate(total=Sum("amount")).values("total")
+    with transaction.atomic():
+        profiles = list(
+            UserProfile.objects.select_for_update()
+            .filter(pk__in=profile_ids)
+            .only("id", "wallet_balance", "wallet_snapshot_through", "wallet_version")
+            .annotate(settled=Coalesce(Subquery(settled), Value(0), output_field=BigIntegerField()))
+            .annotate(
+                debits=Coalesce(Subquery(debits), Value(ZERO), output_field=_MONEY),
+                credits=Coalesce(Subquery(credits), Value(ZERO), output_field=_MONEY),
+            )
+        )
+        for profile in profiles:
+            profile.wallet_balance = profile.debits + profile.credits
+            profile.wallet_snapshot_through = profile.settled
+            profile.wallet_version += 1
+        UserProfile.objects.bulk_update(
+            profiles, ["wallet_balance", "wallet_snapshot_through", "wallet_version"]
+        )
+        # bulk_update sends no post_save, so the cached profiles are dropped here.
+        from .profile_cache import invalidate_profiles
+        invalidate_profiles([profile.pk for profile in profiles])
+    return len(profiles)
+
+
+# PUBLIC_INTERFACE
+def verify_snapshots(profile_ids):
+    """
+    Compare each profile's snapshot-derived balance against its full ledger sum.
+    Returns a list of (profile_id, derived_balance, ledger_balance) for mismatches.
+    """
+    ledger = (
+        WalletLedgerEntry.objects.filter(profile=OuterRef("pk"))
+        .order_by()
+        .values("profile")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    rows = (
+        UserProfile.objects.filter(pk__in=profile_ids)
+        .annotate(
+            derived=F("wallet_balance") + pending_credit_expression(),
+            ledger=Coalesce(Subquery(ledger), Value(ZERO), output_field=_MONEY),
+        )
+        .values_list("pk", "derived", "ledger")
+    )
+    return [(pk, derived, total) for pk, derived, total in rows if derived != total]
+
+
+def _debit_atomic(profile_id, amt) -> bool:
+    # UPDATE ... SET wallet_balance = wallet_balance - amt
+    # WHERE id = ? AND wallet_balance + <credits since snapshot> >= amt
+    updated = (
+        UserProfile.objects.filter(pk=profile_id)
+        .alias(available=F("wallet_balance") + pending_credit_expression())
+        .filter(available__gte=amt)
+        .update(
+            wallet_balance=F("wallet_balance") - amt,
+            wallet_version=F("wallet_version") + 1,
+        )
+    )
+    return updated == 1
+
+
+def _debit_locked(profile_id, amt) -> bool:
+    with transaction.atomic():
+        profile = (
+            UserProfile.objects.select_for_update()
+            .only("id", "wallet_balance", "wallet_snapshot_through", "wallet_version")
+            .get(pk=profile_id)
+        )
+        if profile.available_wallet_balance < amt:
+            return False
+        profile.wallet_balance -= amt
+        profile.wallet_version += 1
+        profile.save(update_fields=["wallet_balance", "wallet_version"])
+        return True
+
+
+def _debit_optimistic(profile_id, amt) -> bool:
+    for _ in range(OPTIMISTIC_MAX_RETRIES):
+        balance, through, version = UserProfile.objects.filter(pk=profile_id).values_list(
+            "wallet_balance", "wallet_snapshot_through", "wallet_version"
+        ).get()
+        if balance + pending_wallet_credit(profile_id, through) < amt:
+            return False
+        updated = UserProfile.objects.filter(pk=profile_id, wallet_version=version).update(
+            wallet_balance=balance - amt,
+            wallet_version=version + 1,
+        )
+        if updated == 1:
+            return True
+    return _debit_locked(profile_id, amt)
@@ -0,0 +1,10 @@
+"""
+End-to-end API benchmark suite.
+
+- factories: seeds a tagged, realistic dataset (users, wallets, bookings, payments, a train run).
+- scenarios: one request recipe per route in api/urls.py.
+- runner: drives scenarios through the Django test client or a real WSGI or ASGI server, records
+  throughput and latency percentiles as JSON, and compares two result files.
+
+Run with `manage.py run_benchmarks`; gate with `manage.py compare_benchmarks`.
+"""
@@ -0,0 +1,193 @@
+"""
+Bulk factories for benchmark data.
+
+Everything is created with bulk_create in chunks, so a million bookings seed in
+about a minute on SQLite. Rows belong to users named `bench_<tag>_<n>`, which
+is how a dataset is found again (`load_dataset`) and removed (`teardown`).
+"""
+import datetime
+import random
+import threading
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from api.ids import new_order_id, new_pnr
+from api.inventory import create_train_run
+from api.models import Booking, BookingDraft, PaymentTransaction, TrainRun, UserProfile, WalletLedgerEntry
+
+SEGMENTS = (("NDLS", "BCT"), ("MAS", "SBC"), ("HWH", "NDLS"), ("CSMT", "MAO"), ("SBC", "MYS"))
+INVENTORY_SEGMENT = ("BENCH_SRC", "BENCH_DST")
+POOL_LIMIT = 50000  # consumable rows loaded per pool
+
+
+def _username(tag, index):
+    return f"bench_{tag}_{index}"
+
+
+# PUBLIC_INTERFACE
+@dataclass
+class Dataset:
+    """Ids a benchmark needs, plus pools of rows that scenarios consume (each row used once)."""
+    tag: str
+    user_ids: list
+    profile_ids: list
+    booking_ids: list
+    payment_ids: list
+    journey_date: datetime.date
+    settled_booking_ids: list = field(default_factory=list)
+    draft_ids: list = field(default_factory=list)
+    pools: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def pick(self, ids, i):
+        """A deterministic, well-spread row for request number `i`."""
+        return ids[(i * 7919) % len(ids)]
+
+    def consume(self, pool):
+        """Next unused id from `pool` (bookings that can take a payment, pending payments...)."""
+        with self._lock:
+            if not self.pools.get(pool):
+                raise LookupError(f"Benchmark pool {pool!r} is exhausted; seed a larger dataset.")
+            return self.pools[pool].pop()
+
+    @property
+    def train_number(self):
+        return f"B{self.tag}"[:10]
+
+    @property
+    def sizes(self):
+        return {"users": len(self.user_ids), "bookings_sampled": len(self.booking_ids),
+                **{f"pool_{name}": len(ids) for name, ids in self.pools.items()}}
+
+
+# PUBLIC_INTERFACE
+def seed(tag, users=10000, bookings=1000000, payments=100000, chunk_size=10000, log=lambda message: None):
+    """
+    Create a dataset: `users` users with profiles, a funded wallet and one staged booking
+    draft, `bookings` bookings spread across them (70% booked with a PNR, 20% payment pending,
+    10% cancelled), `payments` payment transactions (half settled, half awaiting a callback)
+    and one inventory-managed train run. Returns the loaded Dataset.
+    """
+    rng = random.Random(tag)
+    password = make_password("bench")  # hashed once; hashing per user would dominate seeding
+    journey_date = datetime.date.today() + datetime.timedelta(days=30)
+
+    for start in range(0, users, chunk_size):
+        with transaction.atomic():
+            created = User.objects.bulk_create(
+                User(username=_username(tag, i), password=password) for i in range(start, min(users, start + chunk_size))
+            )
+            profiles = UserProfile.objects.bulk_create(
+                UserProfile(user=user, full_name=f"Bench User {user.username}", age=rng.randint(18, 80),
+                            address="1 Benchmark Rd", preferred_berth=rng.choice(("lower", "upper", "any")))
+                for user in created
+            )
+            WalletLedgerEntry.objects.bulk_create(
+                WalletLedgerEntry(profile=profile, kind=WalletLedgerEntry.KIND_DEPOSIT, amount=Decimal("100000.00"))
+                for profile in profiles
+            )
+            BookingDraft.objects.bulk_create(
+                BookingDraft(
+                    user_profile=profile, source="NDLS", destination="BCT", journey_date=journey_date,
+                    fare_ceiling=Decimal("1500.00"), passengers=[{
+                        "passenger_name": profile.full_name, "passenger_age": profile.age,
+                        "passenger_sex": rng.choice(("M", "F")), "preferred_berth": profile.preferred_berth,
+                    }],
+                )
+                for profile in profiles
+            )
+    log(f"Seeded {users} users with wallets and booking drafts")
+
+    profile_ids = list(
+        UserProfile.objects.filter(user__username__startswith=f"bench_{tag}_").values_list("id", flat=True)
+    )
+    settled = pending = 0
+    for start in range(0, bookings, chunk_size):
+        rows = []
+        for i in range(start, min(bookings, start + chunk_size)):
+            source, destination = SEGMENTS[i % len(SEGMENTS)]
+            roll = rng.random()
+            status = "booked" if roll < 0.7 else "payment_pending" if roll < 0.9 else "cancelled"
+            rows.append(Booking(
+                user_profile_id=profile_ids[i % len(profile_ids)], source=source, destination=destination,
+                journey_date=journey_date + datetime.timedelta(days=i % 60), passenger_name=f"Passenger {i}",
+                passenger_age=rng.randint(5, 90), passenger_sex=rng.choice(("M", "F")),
+                fare=Decimal(rng.randint(200, 4000)), booking_status=status,
+                pnr=new_pnr() if status == "booked" else None, paid=status == "booked",
+            ))
+        with transaction.atomic():
+            created = Booking.objects.bulk_create(rows)
+            payment_rows = []
+            for booking in created:
+                if booking.booking_status == "booked" and settled < payments // 2:
+                    settled += 1
+                    payment_rows.append(PaymentTransaction(
+                        booking=booking, order_id=new_order_id(), payment_id=f"pay_{booking.pnr}",
+                        status="success", amount=booking.fare,
+                    ))
+                elif booking.booking_status == "payment_pending" and pending < payments - payments // 2:
+                    pending += 1
+                    payment_rows.append(PaymentTransaction(
+                        booking=booking, order_id=new_order_id(), status="pending", amount=booking.fare,
+                    ))
+            PaymentTransaction.objects.bulk_create(payment_rows)
+        if (start // chunk_size) % 10 == 9:
+            log(f"Seeded {start + len(rows)} bookings")
+    log(f"Seeded {bookings} bookings and {settled + pending} payments")
+
+    create_train_run(f"B{tag}"[:10], *INVENTORY_SEGMENT, journey_date, coaches=20)
+    return load_dataset(tag)
+
+
+# PUBLIC_INTERFACE
+def load_dataset(tag):
+    """The Dataset of an already-seeded tag (pools reflect what earlier runs consumed). None if absent."""
+    profiles = UserProfile.objects.filter(user__username__startswith=f"bench_{tag}_")
+    rows = list(profiles.values_list("user_id", "id"))
+    if not rows:
+        return None
+    run = TrainRun.objects.filter(train_number=f"B{tag}"[:10]).order_by("-id").first()
+    bookings = Booking.objects.filter(user_profile__in=profiles)
+    payments = PaymentTransaction.objects.filter(booking__in=bookings)
+    drafts = BookingDraft.objects.filter(user_profile__in=profiles)
+    booking_ids = list(bookings.values_list("id", flat=True))
+    return Dataset(
+        tag=tag,
+        user_ids=[user_id for user_id, _ in rows],
+        profile_ids=[profile_id for _, profile_id in rows],
+        booking_ids=random.Random(tag).sample(booking_ids, min(len(booking_ids), POOL_LIMIT)),
+        payment_ids=list(payments.filter(status="success").values_list("id", flat=True)[:POOL_LIMIT]),
+        journey_date=run.journey_date if run else datetime.date.today() + datetime.timedelta(days=30),
+        # Booked: their status stream sends one event and ends.
+        settled_booking_ids=list(bookings.filter(booking_status="booked").values_list("id", flat=True)[:POOL_LIMIT]),
+        draft_ids=list(drafts.values_list("id", flat=True)[:POOL_LIMIT]),
+        pools={
+            # Pending bookings with no payment yet: can be paid for or cancelled exactly once.
+            "unpaid_bookings": list(
+                bookings.filter(booking_status="payment_pending", payment__isnull=True)
+                .values_list("id", flat=True)[:POOL_LIMIT]
+            ),
+            # (draft id, profile id) of drafts not yet confirmed or cancelled.
+            "staged_drafts": list(
+                drafts.filter(status=BookingDraft.STATUS_STAGED).values_list("id", "user_profile_id")[:POOL_LIMIT]
+            ),
+            # Payments still waiting for their first gateway callback.
+            "pending_payments": list(
+                payments.filter(status="pending", callback_receipts__isnull=True, jobs__isnull=True)
+                .values_list("id", flat=True)[:POOL_LIMIT]
+            ),
+        },
+    )
+
+
+# PUBLIC_INTERFACE
+def teardown(tag):
+    """Delete every row of a dataset, including rows the benchmark itself created for it."""
+    TrainRun.objects.filter(train_number=f"B{tag}"[:10]).delete()
+    users = User.objects.filter(username__startswith=f"bench_{tag}_")
+    Booking.objects.filter(user_profile__user__in=users).delete()
+    users.delete()
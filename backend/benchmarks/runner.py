@@ -0,0 +1,292 @@
+"""
+Benchmark runner, result files and regression comparison.
+
+Three transports drive the scenarios:
+- "client" uses the Django test client in this process. It measures the
+  full Django and DRF stack without any network.
+- "wsgi" starts Django's threaded WSGI server in a subprocess against the
+  same database and sends it real HTTP requests.
+- "asgi" does the same with uvicorn serving config.asgi (uvicorn is not in
+  requirements.txt; install it to use this transport).
+
+Admission control is switched off for benchmark traffic, since one client
+hammering one route would otherwise be measuring the rate limiter.
+"""
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+
+from api.bench import percentile
+
+RESULT_VERSION = 1
+# Lower-is-better latency metrics and the higher-is-better rate compared between runs.
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+RATE_METRIC = "throughput_rps"
+
+
+class _ClientTransport:
+    name = "client"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False)
+        if method == "GET":
+            return client.get(path).status_code
+        return client.generic(method, path, json.dumps(body or {}), content_type="application/json").status_code
+
+    def close_thread(self):
+        connection.close()
+
+
+# Django's threaded WSGI server (what runserver uses), with DEBUG off so per-query logging
+# and debug pages do not skew the numbers.
+_SERVE_WSGI = (
+    "import django; django.setup(); from django.conf import settings; settings.DEBUG = False; "
+    "from django.core.servers.basehttp import run; from django.core.wsgi import get_wsgi_application; "
+    "run('127.0.0.1', {port}, get_wsgi_application(), threading=True)"
+)
+# uvicorn on one event loop, serving the same application an ASGI deployment runs.
+# Django's ASGIHandler does not implement the lifespan protocol.
+_SERVE_ASGI = (
+    "import uvicorn; from django.conf import settings; from config.asgi import application; "
+    "settings.DEBUG = False; "
+    "uvicorn.run(application, host='127.0.0.1', port={port}, log_level='warning', access_log=False, lifespan='off')"
+)
+
+
+class _ServerTransport:
+    """A real HTTP server in a subprocess against the same database."""
+    name = None
+    serve = None
+
+    def __init__(self, port=None):
+        self.port = port or _free_port()
+        self._server = None
+
+    def __enter__(self):
+        env = {
+            **os.environ, "TATKAL_ADMISSION_ENABLED": "0",
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"),
+        }
+        self._server = subprocess.Popen(
+            [sys.executable, "-c", self.serve.format(port=self.port)], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if self.request("GET", "/api/health/", None) == 200:
+                    return self
+            except OSError:
+                if self._server.poll() is not None:
+                    break
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"{self.name.upper()} server did not start within 30s.")
+
+    def __exit__(self, *exc):
+        if self._server is not None:
+            self._server.terminate()
+            self._server.wait(timeout=10)
+
+    def request(self, method, path, body):
+        # One connection per request: Django's server writes headers and body separately, and on a
+        # kept-alive socket Nagle plus delayed ACKs would add a flat ~40ms to every response.
+        payload = None if method == "GET" else json.dumps(body or {})
+        headers = {"Connection": "close"}
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+    def close_thread(self):
+        pass
+
+
+class _WsgiServerTransport(_ServerTransport):
+    name = "wsgi"
+    serve = _SERVE_WSGI
+
+
+class _AsgiServerTransport(_ServerTransport):
+    name = "asgi"
+    serve = _SERVE_ASGI
+
+    def __enter__(self):
+        if importlib.util.find_spec("uvicorn") is None:
+            raise RuntimeError("The asgi transport needs uvicorn: pip install uvicorn.")
+        return super().__enter__()
+
+
+SERVER_TRANSPORTS = {transport.name: transport for transport in (_WsgiServerTransport, _AsgiServerTransport)}
+
+
+# PUBLIC_INTERFACE
+def server_transport(name, port=None):
+    """A context manager that starts the "wsgi" or "asgi" server and yields a transport for run_scenario."""
+    return SERVER_TRANSPORTS[name](port)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# PUBLIC_INTERFACE
+def run_scenario(scenario, dataset, transport, requests=200, warmup=20, concurrency=1):
+    """
+    Send `warmup` unrecorded requests, then `requests` recorded ones from `concurrency` threads.
+    Returns a result dict: counts, throughput and latency percentiles in milliseconds.
+    """
+    def send(i):
+        path, body = scenario.build(dataset, i)
+        start = time.perf_counter()
+        status = transport.request(scenario.method, path, body)
+        return status, time.perf_counter() - start
+
+    def warm():
+        try:
+            for i in range(warmup):
+                send(i)
+        finally:
+            transport.close_thread()
+
+    def worker(offset):
+        samples = []
+        try:
+            for i in range(warmup + offset, warmup + requests, concurrency):
+                samples.append(send(i))
+        finally:
+            transport.close_thread()
+        return samples
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(warm).result()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for batch in pool.map(worker, range(concurrency)) for sample in batch]
+    elapsed = time.perf_counter() - start
+    latencies = [seconds for _, seconds in samples]
+    errors = [status for status, _ in samples if status not in scenario.expected]
+    return {
+        "transport": transport.name,
+        "route": scenario.route,
+        "method": scenario.method,
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "error_statuses": sorted(set(errors)),
+        "seconds": round(elapsed, 4),
+        RATE_METRIC: round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        **{name: round(percentile(latencies, pct) * 1000, 3) for name, pct in zip(LATENCY_METRICS, (50, 95, 99))},
+    }
+
+
+# PUBLIC_INTERFACE
+def run_suite(scenarios, dataset, transports=("client",), requests=200, warmup=20, concurrency=1,
+              log=lambda message: None):
+    """Run every scenario on every transport. Returns the JSON-ready result document."""
+    results = {}
+    with override_settings(TATKAL_ADMISSION={**settings.TATKAL_ADMISSION, "ENABLED": False}):
+        for transport_name in transports:
+            if transport_name in SERVER_TRANSPORTS:
+                with server_transport(transport_name) as transport:
+                    results.update(_run_all(scenarios, dataset, transport, requests, warmup, concurrency, log))
+            else:
+                results.update(
+                    _run_all(scenarios, dataset, _ClientTransport(), requests, warmup, concurrency, log)
+                )
+    return {"version": RESULT_VERSION, "meta": environment(dataset), "results": results}
+
+
+def _run_all(scenarios, dataset, transport, requests, warmup, concurrency, log):
+    results = {}
+    for scenario in scenarios:
+        result = run_scenario(scenario, dataset, transport, requests, warmup, concurrency)
+        key = f"{transport.name}/{scenario.route}"
+        results[key] = result
+        log(
+            f"{key:<45} {result[RATE_METRIC]:>9.1f} req/s  p50={result['p50_ms']:.2f}ms "
+            f"p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms errors={result['errors']}"
+        )
+    return results
+
+
+# PUBLIC_INTERFACE
+def environment(dataset=None):
+    """What a result was measured on, so comparisons between unlike runs can be spotted."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "dataset": dataset.sizes if dataset is not None else {},
+    }
+
+
+# PUBLIC_INTERFACE
+def write_results(document, path):
+    Path(path).write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+
+
+# PUBLIC_INTERFACE
+def read_results(path):
+    document = json.loads(Path(path).read_text())
+    if document.get("version") != RESULT_VERSION:
+        raise ValueError(f"{path}: unsupported benchmark result version {document.get('version')!r}.")
+    return document
+
+
+# PUBLIC_INTERFACE
+def compare(baseline, current, threshold=10.0):
+    """
+    Compare two result documents. Returns rows of
+    (key, metric, baseline value, current value, percent change, regressed). A metric
+    regresses when it is worse than the baseline by more than `threshold` percent; a
+    scenario regresses when it starts returning errors.
+    """
+    rows = []
+    for key in sorted(set(baseline["results"]) & set(current["results"])):
+        before, after = baseline["results"][key], current["results"][key]
+        for metric in (RATE_METRIC,) + LATENCY_METRICS:
+            old, new = before[metric], after[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = -change if metric == RATE_METRIC else change
+            rows.append((key, metric, old, new, round(change, 1), worse > threshold))
+        if after["errors"] and not before["errors"]:
+            rows.append((key, "errors", before["errors"], after["errors"], 0.0, True))
+    return rows
@@ -0,0 +1,130 @@
+"""
+One benchmark scenario per route in api/urls.py.
+
+A scenario turns (dataset, request number) into a request and lists the
+status codes that count as success. Write scenarios that must not repeat a
+row (paying for a booking, a first gateway callback) take it from a dataset
+pool.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from django.urls import reverse
+
+from .factories import INVENTORY_SEGMENT
+
+
+# PUBLIC_INTERFACE
+@dataclass(frozen=True)
+class Scenario:
+    """`build(dataset, i)` returns (path, json_body or None) for request number i."""
+    route: str
+    method: str
+    build: Callable
+    expected: tuple = (200,)
+
+
+def _booking_body(ds, i, profile_key="user_profile_id"):
+    return {
+        profile_key: ds.pick(ds.profile_ids, i), "source": "NDLS", "destination": "BCT",
+        "journey_date": str(ds.journey_date), "passenger_name": f"Bench {i}", "passenger_age": 30,
+        "passenger_sex": "F", "preferred_berth": "lower", "fare": "500.00",
+    }
+
+
+def _callback(ds, i):
+    return {"payment_transaction_id": ds.consume("pending_payments"), "payment_id": f"pay_bench_{time.time_ns()}_{i}"}
+
+
+def _draft_confirm(draft_id, profile_id):
+    return reverse("booking_draft_confirm", args=[draft_id]), {"user_profile_id": profile_id, "fare": "500.00"}
+
+
+SCENARIOS = (
+    Scenario("Health", "GET", lambda ds, i: (reverse("Health"), None)),
+    Scenario("metrics", "GET", lambda ds, i: (reverse("metrics"), None)),
+    Scenario("register_user", "POST", lambda ds, i: (reverse("register_user"), {
+        "username": f"bench_{ds.tag}_reg_{time.time_ns()}_{i}", "password": "bench-password",
+        "full_name": "Bench Registrant", "age": 30, "address": "1 Benchmark Rd", "preferred_berth": "any",
+    }), (201,)),
+    Scenario("deposit_wallet", "POST", lambda ds, i: (reverse("deposit_wallet"), {
+        "user_id": ds.pick(ds.user_ids, i), "amount": "10.00",
+    })),
+    Scenario("create_booking", "POST", lambda ds, i: (reverse("create_booking"), _booking_body(ds, i)), (201,)),
+    Scenario("create_group_booking", "POST", lambda ds, i: (reverse("create_group_booking"), {
+        "user_profile_id": ds.pick(ds.profile_ids, i), "source": "MAS", "destination": "SBC",
+        "journey_date": str(ds.journey_date),
+        "passengers": [
+            {"passenger_name": f"Group {i} {n}", "passenger_age": 30 + n, "passenger_sex": "M", "fare": "300.00"}
+            for n in range(4)
+        ],
+    }), (201,)),
+    Scenario("booking_draft_list_create", "GET", lambda ds, i: (
+        reverse("booking_draft_list_create") + f"?user_profile_id={ds.pick(ds.profile_ids, i)}", None,
+    )),
+    Scenario("booking_draft_detail", "GET", lambda ds, i: (
+        reverse("booking_draft_detail", args=[ds.pick(ds.draft_ids, i)]), None,
+    )),
+    Scenario("booking_draft_confirm", "POST", lambda ds, i: _draft_confirm(*ds.consume("staged_drafts")), (201,)),
+    Scenario("get_profile", "GET", lambda ds, i: (reverse("get_profile", args=[ds.pick(ds.user_ids, i)]), None)),
+    Scenario("get_bookings", "GET", lambda ds, i: (reverse("get_bookings", args=[ds.pick(ds.user_ids, i)]), None)),
+    Scenario("berth_availability", "GET", lambda ds, i: (
+        f"{reverse('berth_availability')}?source={INVENTORY_SEGMENT[0]}&destination={INVENTORY_SEGMENT[1]}"
+        f"&journey_date={ds.journey_date}", None,
+    )),
+    Scenario("berth_availability_cache_stats", "GET", lambda ds, i: (reverse("berth_availability_cache_stats"), None)),
+    Scenario("user_profile_list_create", "GET", lambda ds, i: (reverse("user_profile_list_create"), None)),
+    Scenario("user_profile_import", "POST", lambda ds, i: (reverse("user_profile_import"), {"profiles": [{
+        "username": f"bench_{ds.tag}_imp_{time.time_ns()}_{i}", "password": "bench-password",
+        "full_name": "Bench Import", "age": 30, "address": "1 Benchmark Rd", "wallet_deposit": "100.00",
+    }]})),
+    Scenario("user_profile_detail", "GET", lambda ds, i: (
+        reverse("user_profile_detail", args=[ds.pick(ds.user_ids, i)]), None,
+    )),
+    Scenario("auto_fill_suggestions", "GET", lambda ds, i: (
+        reverse("auto_fill_suggestions", args=[ds.pick(ds.profile_ids, i)]), None,
+    )),
+    Scenario("tatkal_booking_create", "POST", lambda ds, i: (reverse("tatkal_booking_create"), _booking_body(ds, i)),
+             (201,)),
+    Scenario("tatkal_booking_status", "GET", lambda ds, i: (
+        reverse("tatkal_booking_status", args=[ds.pick(ds.booking_ids, i)]), None,
+    )),
+    Scenario("tatkal_booking_poll", "GET", lambda ds, i: (
+        reverse("tatkal_booking_poll", args=[ds.pick(ds.booking_ids, i)]), None,
+    )),
+    Scenario("tatkal_booking_cancel", "POST", lambda ds, i: (
+        reverse("tatkal_booking_cancel", args=[ds.consume("unpaid_bookings")]), {},
+    )),
+    Scenario("payment_initiate", "POST", lambda ds, i: (reverse("payment_initiate"), {
+        "booking_id": ds.consume("unpaid_bookings"), "amount": "500.00",
+    }), (202,)),
+    Scenario("payment_callback", "POST", lambda ds, i: (reverse("payment_callback"), _callback(ds, i)), (202,)),
+    Scenario("payment_status", "GET", lambda ds, i: (
+        reverse("payment_status", args=[ds.pick(ds.payment_ids, i)]), None,
+    )),
+    Scenario("async_create_booking", "POST", lambda ds, i: (reverse("async_create_booking"), _booking_body(ds, i)),
+             (201,)),
+    Scenario("async_deposit_wallet", "POST", lambda ds, i: (reverse("async_deposit_wallet"), {
+        "user_id": ds.pick(ds.user_ids, i), "amount": "10.00",
+    })),
+    Scenario("async_tatkal_booking_status", "GET", lambda ds, i: (
+        reverse("async_tatkal_booking_status", args=[ds.pick(ds.booking_ids, i)]), None,
+    )),
+    Scenario("async_tatkal_booking_poll", "GET", lambda ds, i: (
+        reverse("async_tatkal_booking_poll", args=[ds.pick(ds.booking_ids, i)]), None,
+    )),
+    Scenario("async_booking_events", "GET", lambda ds, i: (
+        reverse("async_booking_events", args=[ds.pick(ds.settled_booking_ids, i)]), None,
+    )),
+    Scenario("async_payment_callback", "POST", lambda ds, i: (reverse("async_payment_callback"), _callback(ds, i)),
+             (202,)),
+)
+
+
+# PUBLIC_INTERFACE
+def missing_routes(scenarios=SCENARIOS):
+    """Names of routes in api/urls.py that no scenario covers."""
+    from api.urls import urlpatterns
+
+    return sorted({pattern.name for pattern in urlpatterns} - {scenario.route for scenario in scenarios})
@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+# get_asgi_application(), with a handler that keeps open long polls and event streams
+# from holding a thread each (see api/async_views.py).
+django.setup(set_prefix=False)
+
+from api.async_views import PushASGIHandler  # noqa: E402
+
+application = PushASGIHandler()
+
+# In the 'full' role, build the OpenAPI document before the first docs request, and
+# before a preforking server forks so workers share it. API-only workers skip the docs stack.
+from django.conf import settings  # noqa: E402
+
+if settings.SERVER_ROLE == 'full':
+    from config.schema import preload
+
+    preload()
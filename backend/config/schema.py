@@ -0,0 +1,172 @@
+"""
+OpenAPI document built once per process and served from memory.
+
+The schema only changes when the code does. It is either loaded from the
+artifact written by `manage.py generate_openapi` (settings.OPENAPI_SCHEMA_FILE)
+or generated on first use. Only the host-dependent `host` and `schemes` fields
+are filled in per request. Each variant is encoded, gzipped and hashed once, so
+later requests are a dictionary lookup. ETags let browsers revalidate the
+document with a 304 instead of downloading it again.
+
+The docs pages (/docs/, /redoc/) are drf_yasg's UI views, which render a page
+without generating the schema. When the UI fetches the schema from
+`?format=openapi`, that request is answered from here. config/urls.py imports
+this module on the first docs request, and SERVER_ROLE='api' workers never
+import it.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+from api.caching import LocalLRU
+
+API_INFO = openapi.Info(
+    title="My API",
+    default_version='v1',
+    description="API Docs",
+)
+
+# Formats answered from the cached document; anything else (yaml) falls through to drf_yasg.
+CACHED_FORMATS = {
+    "openapi": "application/openapi+json; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+
+
+# PUBLIC_INTERFACE
+def generate_document() -> dict:
+    """Generate the schema from the URLconf, without any host (what generate_openapi writes)."""
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    return json.loads(OpenAPICodecJson(validators=[]).encode(schema))
+
+
+class _Encoded:
+    __slots__ = ("body", "gzipped", "etag")
+
+    def __init__(self, document):
+        self.body = json.dumps(document, separators=(",", ":")).encode()
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = '"%s"' % hashlib.blake2b(self.body, digest_size=16).hexdigest()
+
+
+# PUBLIC_INTERFACE
+class CachedSchema:
+    """The process's OpenAPI document plus its encoded variants, one per scheme and host."""
+
+    def __init__(self, path=None, max_hosts=64):
+        self.path = path
+        self._document = None
+        self._lock = threading.Lock()
+        # Host comes from the request, so bound the variants kept.
+        self._encoded = LocalLRU(max_hosts, ttl=float("inf"))
+
+    def document(self) -> dict:
+        """The host-independent document, loaded or generated on first call."""
+        if self._document is None:
+            with self._lock:
+                if self._document is None:
+                    path = settings.OPENAPI_SCHEMA_FILE if self.path is None else self.path
+                    if path and Path(path).is_file():
+                        document = json.loads(Path(path).read_text())
+                    else:
+                        document = generate_document()
+                    # The artifact may carry the host it was generated on; that is patched per request.
+                    document.pop("host", None)
+                    document.pop("schemes", None)
+                    self._document = document
+        return self._document
+
+    def encoded(self, scheme, host) -> _Encoded:
+        key = (scheme, host)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = _Encoded({**self.document(), "host": host, "schemes": [scheme]})
+            self._encoded.set(key, encoded)
+        return encoded
+
+    def reset(self):
+        with self._lock:
+            self._document = None
+        self._encoded.clear()
+
+
+SCHEMA = CachedSchema()
+
+
+# PUBLIC_INTERFACE
+def preload():
+    """Load or build the document now, so the first docs request does not pay for it."""
+    SCHEMA.document()
+
+
+def _host(request):
+    host = request.get_host()
+    forwarded_port = request.META.get("HTTP_X_FORWARDED_PORT")
+    if ':' not in host and forwarded_port:
+        host = f"{host}:{forwarded_port}"
+    return host
+
+
+def _accepts_gzip(request):
+    return any(
+        token.split(";")[0].strip() == "gzip" and not token.replace(" ", "").endswith(";q=0")
+        for token in request.META.get("HTTP_ACCEPT_ENCODING", "").split(",")
+    )
+
+
+# PUBLIC_INTERFACE
+def schema_response(request, content_type=CACHED_FORMATS["json"]):
+    """The cached document for this request's scheme and host, with ETag and optional gzip."""
+    encoded = SCHEMA.encoded(request.scheme, _host(request))
+    gzip_etag = encoded.etag[:-1] + '-gzip"'
+    use_gzip = _accepts_gzip(request)
+    etag = gzip_etag if use_gzip else encoded.etag
+    if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    if "*" in if_none_match or encoded.etag in if_none_match or gzip_etag in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(encoded.gzipped if use_gzip else encoded.body, content_type=content_type)
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    # Cacheable, but revalidated each time so a deploy is picked up at once.
+    response["Cache-Control"] = "public, no-cache"
+    return response
+
+
+# PUBLIC_INTERFACE
+@csrf_exempt
+def schema_json_view(request):
+    return schema_response(request)
+
+
+# PUBLIC_INTERFACE
+def docs_view(page_view):
+    """Wrap a drf_yasg UI view so its `?format=openapi` schema fetches are served from the cache."""
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        content_type = CACHED_FORMATS.get(request.GET.get("format"))
+        if content_type is not None and request.method in ("GET", "HEAD"):
+            return schema_response(request, content_type)
+        return page_view(request, *args, **kwargs)
+    return view
+
+
+# PUBLIC_INTERFACE
+def ui_view(renderer):
+    """The docs page for drf_yasg UI `renderer` ('swagger' or 'redoc')."""
+    schema_view = get_schema_view(API_INFO, public=True, permission_classes=(permissions.AllowAny,))
+    return docs_view(schema_view.with_ui(renderer, cache_timeout=0))
@@ -10,8 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import database_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,7 +29,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-0ku_as45vs5isd^px=t#m8g#^*x7f=w#gw-xb^t@^-pom)r^t6'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     '.kavia.ai',
@@ -48,7 +54,21 @@ INSTALLED_APPS = [
     'api'
 ]
 
+# What this process serves. 'full' (the default) serves the API, /admin/ and the docs.
+# 'api' is for autoscaled API workers. It leaves out the admin and drf_yasg apps and
+# routes with config/urls_api.py, so neither stack is imported and cold starts are
+# faster. Serve admin and docs from a separate 'full' deployment.
+# `manage.py profile_startup` measures both roles.
+SERVER_ROLE = os.environ.get('SERVER_ROLE', 'full')
+if SERVER_ROLE not in ('full', 'api'):
+    raise ImproperlyConfigured(f"SERVER_ROLE must be 'full' or 'api', not {SERVER_ROLE!r}.")
+API_ONLY_EXCLUDED_APPS = ('django.contrib.admin', 'drf_yasg')
+if SERVER_ROLE == 'api':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_ONLY_EXCLUDED_APPS]
+
 MIDDLEWARE = [
+    # Outermost, so its latency covers the whole middleware stack; see api/metrics.py.
+    'api.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -60,7 +80,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+ROOT_URLCONF = 'config.urls_api' if SERVER_ROLE == 'api' else 'config.urls'
 
 TEMPLATES = [
     {
@@ -83,13 +103,92 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Selected by DB_ENGINE (sqlite | postgresql); see config/database.py for the tuning knobs.
 DATABASES = {
+    'default': database_from_env(BASE_DIR),
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'shared' is the cross-worker tier behind the in-process LRUs in api/caching.py.
+# Point SHARED_CACHE_BACKEND/SHARED_CACHE_LOCATION at Redis or Memcached in production;
+# the locmem default keeps development and tests self-contained.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': os.environ.get('SHARED_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'quickbook-shared'),
+    },
+}
+
+
+# Worker id (0-1023) of this process's PNR/order-id generator (api/ids.py). Must differ
+# between processes that write to the same database; with a preforking server, assign it
+# per worker (e.g. from gunicorn's post_fork hook). Required unless DEBUG; in development
+# unset falls back to pid % 1024, which can collide and logs a warning.
+# Plan the ids across hosts and roles: `run_payment_workers --processes` gives its processes
+# --worker-id-base .. --worker-id-base + workers - 1, and no web worker, other worker host or
+# scheduler may use an id in that range. Overlapping ids produce duplicate PNRs.
+ID_WORKER_ID = os.environ.get('ID_WORKER_ID')
+if not DEBUG and ID_WORKER_ID in (None, ''):
+    raise ImproperlyConfigured("ID_WORKER_ID must be set when DEBUG is off; see api/ids.py.")
+
+
+# Admission control in front of the booking endpoints (api/admission.py). Rates are per
+# process; size GLOBAL_RATE as the database's sustainable booking rate / worker count.
+TATKAL_ADMISSION = {
+    'ENABLED': os.environ.get('TATKAL_ADMISSION_ENABLED', '1') == '1',
+    'GLOBAL_RATE': float(os.environ.get('TATKAL_GLOBAL_RATE', '200')),
+    'GLOBAL_BURST': int(os.environ.get('TATKAL_GLOBAL_BURST', '400')),
+    'USER_RATE': float(os.environ.get('TATKAL_USER_RATE', '1')),
+    'USER_BURST': int(os.environ.get('TATKAL_USER_BURST', '5')),
+    # User buckets are per client address. Set to the number of reverse proxies in front of
+    # this server; 0 ignores X-Forwarded-For, which the client can write.
+    'TRUSTED_PROXIES': int(os.environ.get('TATKAL_TRUSTED_PROXIES', '0')),
+    'WAITING_ROOM': int(os.environ.get('TATKAL_WAITING_ROOM', '5000')),
+    'TICKET_TTL': float(os.environ.get('TATKAL_TICKET_TTL', '30')),
+    'HEAD_GRACE': float(os.environ.get('TATKAL_HEAD_GRACE', '2')),
+}
+
+# Hot-profile cache (api/profile_cache.py). LOCAL_TTL bounds how long another worker may
+# serve a profile after a write here; SHARED_ALIAS='' keeps the cache per process.
+PROFILE_CACHE = {
+    'MAX_SIZE': int(os.environ.get('PROFILE_CACHE_MAX_SIZE', '50000')),
+    'LOCAL_TTL': float(os.environ.get('PROFILE_CACHE_LOCAL_TTL', '2')),
+    'SHARED_TTL': int(os.environ.get('PROFILE_CACHE_SHARED_TTL', '300')),
+    'SHARED_ALIAS': os.environ.get('PROFILE_CACHE_SHARED_ALIAS', 'shared'),
 }
 
+# Tatkal window scheduler (api/scheduler.py, `manage.py run_tatkal_scheduler`). A journey
+# date's window opens at OPENS_AT (in TIME_ZONE) the day before. Each user gets at most
+# MAX_PER_USER auto-confirmed drafts per window; a window missed by less than GRACE seconds
+# (a restart) still fires.
+TATKAL_SCHEDULER = {
+    'OPENS_AT': os.environ.get('TATKAL_OPENS_AT', '10:00'),
+    'TIME_ZONE': os.environ.get('TATKAL_TIME_ZONE', 'Asia/Kolkata'),
+    'WORKERS': int(os.environ.get('TATKAL_SCHEDULER_WORKERS', '4')),
+    'MAX_PER_USER': int(os.environ.get('TATKAL_MAX_PER_USER', '2')),
+    'GRACE': float(os.environ.get('TATKAL_SCHEDULER_GRACE', '300')),
+}
+
+# Fan-out for booking status push (api/events.py). The default delivers within one process
+# only. With several ASGI workers, point this at a class whose publish() reaches every
+# worker, such as Redis pub/sub.
+BOOKING_EVENTS_FANOUT = os.environ.get('BOOKING_EVENTS_FANOUT', 'api.events.LocalFanout')
+
+# Threads per process for the status re-reads of open long polls and event streams
+# (api/status_poll.py); 0 reads on each request's own thread, which it then holds.
+BOOKING_STATUS_READ_THREADS = int(os.environ.get('BOOKING_STATUS_READ_THREADS', '4'))
+
+# OpenAPI document served by /swagger.json and the docs pages (config/schema.py). When this
+# file exists (write it with `manage.py generate_openapi` at build time) it is served as-is;
+# otherwise the schema is generated once per process. Set it to '' to always generate.
+OPENAPI_SCHEMA_FILE = os.environ.get('OPENAPI_SCHEMA_FILE', str(BASE_DIR / 'interfaces' / 'openapi.json'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -110,6 +209,50 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hasher profile. The first hasher encodes new passwords; the rest still verify
+# existing hashes, which are re-encoded with the first on the next successful login.
+_DJANGO_HASHERS = 'django.contrib.auth.hashers.'
+PASSWORD_HASHER_PROFILES = {
+    # Django's default: PBKDF2-SHA256, no extra dependency.
+    'pbkdf2': ('PBKDF2PasswordHasher', 'PBKDF2SHA1PasswordHasher', 'ScryptPasswordHasher'),
+    # Memory-hard, from the standard library (OpenSSL scrypt).
+    'scrypt': ('ScryptPasswordHasher', 'PBKDF2PasswordHasher', 'PBKDF2SHA1PasswordHasher'),
+    # Memory-hard and cheaper in CPU per hash than PBKDF2; needs the argon2-cffi package.
+    'argon2': ('Argon2PasswordHasher', 'PBKDF2PasswordHasher', 'PBKDF2SHA1PasswordHasher', 'ScryptPasswordHasher'),
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+if PASSWORD_HASHER_PROFILE not in PASSWORD_HASHER_PROFILES:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER_PROFILE must be one of {', '.join(PASSWORD_HASHER_PROFILES)}, not {PASSWORD_HASHER_PROFILE!r}."
+    )
+if PASSWORD_HASHER_PROFILE == 'argon2' and importlib.util.find_spec('argon2') is None:
+    raise ImproperlyConfigured("PASSWORD_HASHER_PROFILE='argon2' requires the argon2-cffi package.")
+PASSWORD_HASHERS = [_DJANGO_HASHERS + name for name in PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]]
+
+# Password hashing and verification run on a process pool (api/hashing.py) that caps the
+# CPU they can take from request traffic. Each web worker process has its own pool, so the
+# host budget HOST_WORKERS (default half the CPUs) is split across the WEB_CONCURRENCY web
+# workers, at least one hashing process each; WORKERS overrides the per-process count, and
+# 0 hashes inline. MAX_PENDING is per process too: at most that many passwords are queued or
+# hashing, and a request that cannot get a slot within WAIT seconds gets 503 with Retry-After.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+PASSWORD_HASHING_HOST_WORKERS = int(
+    os.environ.get('PASSWORD_HASHING_HOST_WORKERS', str(max(1, (os.cpu_count() or 1) // 2)))
+)
+PASSWORD_HASHING_WORKERS = int(
+    os.environ.get('PASSWORD_HASHING_WORKERS', str(max(1, PASSWORD_HASHING_HOST_WORKERS // WEB_CONCURRENCY)))
+)
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', '32'))
+PASSWORD_HASHING_WAIT = float(os.environ.get('PASSWORD_HASHING_WAIT', '2'))
+
+AUTHENTICATION_BACKENDS = ['api.backends.PooledPasswordBackend']
+
+# Rows one POST /api/user_profiles/import/ may carry. The import runs on the request thread
+# and hashes on the pool logins and registrations share, so bulk files go through
+# `manage.py import_profiles` instead; past this the API answers 413.
+PROFILE_IMPORT_MAX_ROWS = int(os.environ.get('PROFILE_IMPORT_MAX_ROWS', '200'))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
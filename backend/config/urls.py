@@ -16,9 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from django.utils.module_loading import import_string
 from django.views.decorators.csrf import csrf_exempt
 
 urlpatterns = [
@@ -26,42 +24,28 @@ urlpatterns = [
     path('api/', include('api.urls')),
 ]
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="My API",
-      default_version='v1',
-      description="Test description",
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
 
-def get_full_url(request):
-    scheme = request.scheme
-    host = request.get_host()
-    forwarded_port = request.META.get("HTTP_X_FORWARDED_PORT")
+def _lazy_view(dotted_path, *factory_args):
+    """
+    A view imported on its first request, so loading the URLconf does not import the docs
+    stack (drf_yasg). With factory_args, `dotted_path` is a factory called with them.
+    """
+    view = None
 
-    if ':' not in host and forwarded_port:
-        host = f"{host}:{forwarded_port}"
+    @csrf_exempt
+    def lazy_view(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            target = import_string(dotted_path)
+            view = target(*factory_args) if factory_args else target
+        return view(request, *args, **kwargs)
+    return lazy_view
 
-    return f"{scheme}://{host}"
-
-@csrf_exempt
-def dynamic_schema_view(request, *args, **kwargs):
-    url = get_full_url(request)
-    view = get_schema_view(
-        openapi.Info(
-            title="My API",
-            default_version='v1',
-            description="API Docs",
-        ),
-        public=True,
-        url=url,
-    )
-    return view.with_ui('swagger', cache_timeout=0)(request)
 
+# The schema itself is served from memory by config/schema.py. API-only workers use
+# config/urls_api.py instead (SERVER_ROLE='api').
 urlpatterns += [
-    re_path(r'^docs/$', dynamic_schema_view, name='schema-swagger-ui'),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    re_path(r'^swagger\.json$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-]
\ No newline at end of file
+    re_path(r'^docs/$', _lazy_view('config.schema.ui_view', 'swagger'), name='schema-swagger-ui'),
+    re_path(r'^redoc/$', _lazy_view('config.schema.ui_view', 'redoc'), name='schema-redoc'),
+    re_path(r'^swagger\.json$', _lazy_view('config.schema.schema_json_view'), name='schema-json'),
+]
@@ -0,0 +1,12 @@
+"""
+URLconf for SERVER_ROLE='api' workers: the API only.
+
+Admin and the docs pages are served by 'full' role processes (config/urls.py).
+Leaving them out here means API workers never import django.contrib.admin or
+drf_yasg, which speeds up their cold start.
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    path('api/', include('api.urls')),
+]
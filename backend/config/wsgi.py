@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# In the 'full' role, build the OpenAPI document before the first docs request, and
+# before a preforking server forks so workers share it. API-only workers skip the docs stack.
+from django.conf import settings  # noqa: E402
+
+if settings.SERVER_ROLE == 'full':
+    from config.schema import preload
+
+    preload()